@@ -0,0 +1,88 @@
+"""
+Micro-benchmark de extract_companies_detailed sobre las fixtures guardadas.
+Compara la implementación lxml con la anterior (BeautifulSoup) y verifica
+que la salida sea idéntica.
+
+    python -m benchmarks.bench_extractor [--seconds 2]
+"""
+
+import re
+import time
+import json
+import argparse
+from typing import Dict, List
+
+from bs4 import BeautifulSoup
+from lxml import etree
+
+from scraper.driver_factory import BASE_URL
+from scraper.extractor import extract_companies_detailed
+from benchmarks.fixtures import load
+
+
+def extract_companies_detailed_legacy(html: str, sub_industry: str) -> List[Dict[str, str]]:
+    """
+    Implementación anterior de scraper.extractor (BeautifulSoup + re-parseo
+    de cada bloque): referencia de este benchmark y del test de equivalencia.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    data: List[Dict] = []
+    for blk in soup.find_all("div", class_=re.compile(r"col-md-12 data")):
+        try:
+            root = etree.HTML(str(blk))
+            name_el = root.xpath('.//div[@class="col-md-6"]/a')
+            comp = name_el[0].text.strip() if name_el else "N/A"
+            href = name_el[0].get("href") if name_el else ""
+            locs = [
+                text.strip().replace("\xa0", " ")
+                for text in root.xpath('.//div[@class="col-md-4"]/text()')
+            ]
+            rev_el = root.xpath('.//div[@class="col-md-2 last"]/text()') or []
+            rev = rev_el[-1].strip() if rev_el else "N/A"
+            data.append(
+                {
+                    "company_name": comp,
+                    "company_link": BASE_URL + href,
+                    "location": locs,
+                    "revenue": rev,
+                    "sub_industry": sub_industry,
+                }
+            )
+        except Exception:
+            continue
+    return data
+
+
+def pages_per_second(fn, pages, seconds: float) -> float:
+    """Ejecuta `fn` sobre las páginas en bucle durante ~`seconds` segundos."""
+    n = 0
+    t0 = time.perf_counter()
+    while True:
+        for html in pages:
+            fn(html, "retail")
+        n += len(pages)
+        elapsed = time.perf_counter() - t0
+        if elapsed >= seconds:
+            return n / elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args(argv)
+
+    pages = load("listing_")
+    for html in pages:
+        new = json.dumps(extract_companies_detailed(html, "retail"), ensure_ascii=False)
+        old = json.dumps(extract_companies_detailed_legacy(html, "retail"), ensure_ascii=False)
+        assert new == old, "la salida difiere de la implementación anterior"
+
+    legacy = pages_per_second(extract_companies_detailed_legacy, pages, args.seconds)
+    fast = pages_per_second(extract_companies_detailed, pages, args.seconds)
+    print(f"fixtures: {len(pages)} páginas de listado (salida idéntica)")
+    print(f"legacy (bs4 + re-parseo): {legacy:8.1f} páginas/s")
+    print(f"lxml (un solo parseo):    {fast:8.1f} páginas/s  (x{fast / legacy:.1f})")
+
+
+if __name__ == "__main__":
+    main()
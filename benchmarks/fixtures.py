@@ -0,0 +1,194 @@
+"""
+Generador de páginas de prueba con la estructura de los listados de dnb.com.
+Los HTML se guardan en benchmarks/fixtures/ para que los benchmarks sean
+reproducibles; regenerarlos con:
+
+    python -m benchmarks.fixtures
+"""
+
+import os
+import random
+from typing import Dict, List
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+_WORDS = [
+    "Andina",
+    "Pacífico",
+    "Global",
+    "Servicios",
+    "Comercial",
+    "Grupo",
+    "Industrial",
+    "Norte",
+    "Sur",
+    "Tech",
+    "Foods",
+    "Logística",
+    "Holding",
+    "Café",
+    "Minera",
+    "Constructora",
+    "Distribuidora",
+    "Inversiones",
+    "Agro",
+    "Textil",
+]
+_CITIES = [
+    ("Lima", "Lima"),
+    ("Arequipa", "Arequipa"),
+    ("Cusco", "Cusco"),
+    ("Trujillo", "La Libertad"),
+    ("Piura", "Piura"),
+    ("Chiclayo", "Lambayeque"),
+]
+_SUFFIX = ["S.A.", "S.A.C.", "E.I.R.L.", "S.R.L.", "Inc.", "& Cía."]
+
+
+def _page(title: str, body: str, rng: random.Random) -> str:
+    """Envuelve el contenido con cabecera, scripts y pie como la web real."""
+    blocks = []
+    for i in range(30):
+        key = f"{rng.random():.8f}"
+        values = ",".join(str(rng.randint(0, 999)) for _ in range(40))
+        blocks.append(f"<script>window.__dnb_{i} = {{'k': '{key}', 'v': [{values}]}};</script>")
+    scripts = "\n".join(blocks)
+    nav = "\n".join(
+        f'<li><a href="/business-directory/industry-analysis.sector_{i}.html">Sector {i}</a></li>'
+        for i in range(60)
+    )
+    footer = "\n".join(f'<a href="/legal/{i}.html">Legal {i}</a>' for i in range(40))
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title} | Dun &amp; Bradstreet</title>
+<style>.col-md-12.data{{padding:4px}} .alpha-pagination a{{margin:2px}}</style>
+{scripts}
+</head>
+<body>
+<header><nav><ul class="menu">{nav}</ul></nav></header>
+<div class="container">
+{body}
+</div>
+<footer>{footer}</footer>
+</body>
+</html>
+"""
+
+
+def _company(rng: random.Random, idx: int) -> str:
+    name = f"{rng.choice(_WORDS)} {rng.choice(_WORDS)} {rng.choice(_SUFFIX)}"
+    slug = f"{name.lower().replace(' ', '_')}.{rng.getrandbits(40):010x}"
+    city, region = rng.choice(_CITIES)
+    revenue = rng.choice(
+        [
+            f"${rng.uniform(0.1, 999):.2f}M",
+            f"${rng.uniform(1, 50):.1f}B",
+            f"${rng.randint(50, 999)}K",
+        ]
+    )
+    name_html = name.replace("&", "&amp;")
+    rev_html = (
+        f'<div class="col-md-2 last"><span class="label">Revenue:</span>{revenue}</div>'
+        if idx % 17
+        else '<div class="col-md-2 last"></div>'
+    )
+    profile = f"/business-directory/company-profiles.{slug}.html"
+    return f"""<div class="col-md-12 data">
+  <div class="col-md-6"><a href="{profile}">{name_html}</a></div>
+  <div class="col-md-4"><span class="label">Location:</span>{city},&nbsp;{region}<br/>Peru</div>
+  {rev_html}
+</div>"""
+
+
+def listing_page(n: int = 50, seed: int = 0, alpha: bool = True) -> str:
+    """Página de resultados con `n` empresas y paginación A→Z opcional."""
+    rng = random.Random(seed)
+    alpha_html = ""
+    if alpha:
+        alpha_html = (
+            '<ul class="alpha-pagination">'
+            + "".join(
+                f'<li><a href="/business-directory/company-information.retail.pe.html?alpha={c}">'
+                f"{c.upper()}</a></li>"
+                for c in "abcdefghijklmnopqrstuvwxyz"
+            )
+            + "</ul>"
+        )
+    header = (
+        '<div class="col-md-12 data-header"><div class="col-md-6">Company Name</div>'
+        '<div class="col-md-4">Location</div><div class="col-md-2 last">Revenue</div></div>'
+    )
+    rows = "\n".join(_company(rng, i) for i in range(n))
+    return _page("Retail Companies in Peru", alpha_html + header + rows, rng)
+
+
+def industry_page(n: int = 300, seed: int = 0) -> str:
+    """Página industry-analysis con `n` enlaces a sub‑industrias por país."""
+    rng = random.Random(seed)
+    cells = []
+    for i in range(n):
+        sub = f"{rng.choice(_WORDS).lower()}_{rng.choice(_WORDS).lower()}_{i}"
+        code = rng.choice(["pe", "cl", "co", "mx", "ar", "us", "es"])
+        cells.append(
+            f'<div class="col-md-6 col-xs-6 data"><a href="/business-directory/'
+            f'company-information.{sub}.{code}.html">{sub.replace("_", " ").title()} '
+            f"({rng.randint(1, 9999)})</a></div>"
+        )
+    body = '<div class="row">' + "\n".join(cells) + "</div>"
+    return _page("Industry Analysis", body, rng)
+
+
+def block_pages(seed: int = 0) -> Dict[str, str]:
+    """Páginas de challenge, Access Denied, error 500 y sin empresas."""
+    rng = random.Random(seed)
+    return {
+        "block_challenge.html": _page(
+            "Security check",
+            '<div id="sec-if-cpt-container"><iframe id="sec-cpt-if" src="/cpt"></iframe></div>',
+            rng,
+        ),
+        "block_denied.html": _page(
+            "Access Denied",
+            "<h1>Access Denied</h1><p>You don't have permission to access this server.</p>",
+            rng,
+        ),
+        "block_500.html": _page("Error", "<h2>500 Error</h2><p>Internal server error</p>", rng),
+        "block_no_companies.html": _page(
+            "Retail Companies in Peru",
+            '<div class="candidatesMatchedQuantityIsNullOrZeroWrapper">'
+            "No companies match your search</div>",
+            rng,
+        ),
+    }
+
+
+def build_all() -> Dict[str, str]:
+    """Todas las fixtures por nombre de fichero."""
+    return {
+        "listing_50_a.html": listing_page(50, seed=1),
+        "listing_50_b.html": listing_page(50, seed=2),
+        "listing_50_c.html": listing_page(50, seed=3, alpha=False),
+        "industry_300.html": industry_page(300, seed=4),
+        "industry_800.html": industry_page(800, seed=5),
+        **block_pages(seed=6),
+    }
+
+
+def load(prefix: str = "") -> List[str]:
+    """Carga las fixtures guardadas cuyo nombre empieza por `prefix`."""
+    names = sorted(f for f in os.listdir(FIXTURES_DIR) if f.startswith(prefix))
+    out = []
+    for name in names:
+        with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as f:
+            out.append(f.read())
+    return out
+
+
+if __name__ == "__main__":
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    for name, html in build_all().items():
+        with open(os.path.join(FIXTURES_DIR, name), "w", encoding="utf-8") as f:
+            f.write(html)
+        print(f"{name}: {len(html)} bytes")
@@ -0,0 +1,219 @@
+"""
+Suite de benchmarks del scraper sobre fixtures guardadas y snapshots
+sintéticos. Escribe un informe JSON para comparar commits:
+
+    python -m benchmarks.run [--companies 1000000] [--output FILE]
+    python -m benchmarks.run --compare benchmarks/reports/<a>.json benchmarks/reports/<b>.json
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from typing import Callable, Dict, List
+
+from scraper.diff import _columnar, compute_diff
+from scraper.driver_factory import BASE_URL
+from scraper.extractor import (
+    classify_page,
+    extract_companies_detailed,
+    extract_subindustries,
+)
+from scraper.utils import load_json, save_json
+from benchmarks.fixtures import load
+
+REPORTS_DIR = os.path.join(os.path.dirname(__file__), "reports")
+
+
+def timeit(fn: Callable[[], int], min_seconds: float = 1.0, max_runs: int = 1000) -> Dict:
+    """
+    Ejecuta `fn` (que devuelve el número de elementos procesados) al menos
+    una vez y hasta acumular `min_seconds`.
+    Devuelve el mejor tiempo y la tasa de elementos/s.
+    """
+    times: List[float] = []
+    items = 0
+    total = 0.0
+    while not times or (total < min_seconds and len(times) < max_runs):
+        t0 = time.perf_counter()
+        items = fn()
+        dt = time.perf_counter() - t0
+        times.append(dt)
+        total += dt
+    best = min(times)
+    return {
+        "runs": len(times),
+        "best_s": round(best, 6),
+        "mean_s": round(total / len(times), 6),
+        "items": items,
+        "items_per_s": round(items / best, 1) if best else None,
+    }
+
+
+def synthetic_snapshot(n: int, seed: int = 0) -> List[Dict]:
+    """Snapshot con `n` empresas con la forma de OUTPUT_DIR_1/{country}.json."""
+    rng = random.Random(seed)
+    subs = [f"sub_{i}" for i in range(200)]
+    out = []
+    for i in range(n):
+        sub = subs[i % len(subs)]
+        out.append(
+            {
+                "page": 1 + (i // 50) % 20,
+                "link": f"/business-directory/company-information.{sub}.pe.html",
+                "country": "Peru",
+                "sub_industry": sub,
+                "code": "pe",
+                "company_name": f"Company {i}",
+                "company_link": f"{BASE_URL}/business-directory/company-profiles.c{i}.html",
+                "location": ["", f"City {rng.randint(0, 99)}, Region", "Peru"],
+                "revenue": f"${rng.uniform(0.1, 999):.2f}M",
+            }
+        )
+    return out
+
+
+def mutate_snapshot(old: List[Dict], rate: float = 0.05, seed: int = 1) -> List[Dict]:
+    """Nuevo snapshot: elimina, añade y modifica ~`rate` de las empresas."""
+    rng = random.Random(seed)
+    new = []
+    for rec in old:
+        r = rng.random()
+        if r < rate:
+            continue  # eliminada
+        if r < 2 * rate:
+            rec = {**rec, "revenue": f"${rng.uniform(0.1, 999):.2f}M"}
+        new.append(rec)
+    extra = int(len(old) * rate)
+    for i in range(extra):
+        new.append({**old[i % len(old)], "company_link": f"https://www.dnb.com/new/{i}.html"})
+    return new
+
+
+def bench_pages(min_seconds: float) -> Dict:
+    listings = load("listing_")
+    industries = load("industry_")
+    blocks = load("block_")
+    every = listings + industries + blocks
+    return {
+        "extract_companies_detailed": timeit(
+            lambda: sum(1 for h in listings if extract_companies_detailed(h, "x") is not None),
+            min_seconds,
+        ),
+        "extract_subindustries": timeit(
+            lambda: sum(1 for h in industries if extract_subindustries(h) is not None),
+            min_seconds,
+        ),
+        "classify_page": timeit(
+            lambda: sum(1 for h in every if classify_page(h) is not None),
+            min_seconds,
+        ),
+    }
+
+
+def _bench_persistence(n: int, old_dir: str, new_dir: str) -> Dict:
+    """Escribe los dos snapshots midiendo save_json/load_json sobre el antiguo."""
+    old = synthetic_snapshot(n)
+    path = os.path.join(old_dir, "Peru.json")
+    res = {
+        "save_json": timeit(lambda: (save_json(path, old), len(old))[1], 0, max_runs=1),
+    }
+    res["save_json"]["bytes"] = os.path.getsize(path)
+    res["load_json"] = timeit(lambda: len(load_json(path, [])), 0, max_runs=1)
+    save_json(os.path.join(new_dir, "Peru.json"), mutate_snapshot(old))
+    return res
+
+
+def bench_snapshots(n: int, workdir: str) -> Dict:
+    old_dir = os.path.join(workdir, "old")
+    new_dir = os.path.join(workdir, "new")
+    # los snapshots en memoria se liberan antes de medir compute_diff
+    res = _bench_persistence(n, old_dir, new_dir)
+
+    report_dir = os.path.join(workdir, "reports")
+    engines = ["stream"] + (["numpy"] if _columnar() is not None else [])
+    for engine in engines:
+        res[f"compute_diff_{engine}"] = timeit(
+            lambda: (compute_diff("Peru", old_dir, new_dir, report_dir, engine=engine), n)[1],
+            0,
+            max_runs=1,
+        )
+    return res
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(a_path: str, b_path: str) -> None:
+    """Imprime la variación de tiempos entre dos informes."""
+    a = load_json(a_path, {})
+    b = load_json(b_path, {})
+    print(f"{a.get('commit')} → {b.get('commit')}")
+    for name, ra in a.get("results", {}).items():
+        rb = b.get("results", {}).get(name)
+        if not rb:
+            continue
+        delta = (rb["best_s"] - ra["best_s"]) / ra["best_s"] * 100 if ra["best_s"] else 0
+        print(f"  {name:28s} {ra['best_s']:10.4f}s → {rb['best_s']:10.4f}s  ({delta:+.1f}%)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks del scraper DnB")
+    parser.add_argument(
+        "--companies",
+        type=int,
+        default=1_000_000,
+        help="Tamaño de los snapshots sintéticos (diff y persistencia)",
+    )
+    parser.add_argument(
+        "--seconds", type=float, default=1.0, help="Tiempo mínimo por benchmark de páginas"
+    )
+    parser.add_argument("--output", help="Fichero del informe JSON")
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("OLD", "NEW"),
+        help="Compara dos informes en lugar de ejecutar",
+    )
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    commit = git_commit()
+    results = bench_pages(args.seconds)
+    workdir = tempfile.mkdtemp(prefix="dnb_bench_")
+    try:
+        results.update(bench_snapshots(args.companies, workdir))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "companies": args.companies,
+        "results": results,
+    }
+    output = args.output or os.path.join(REPORTS_DIR, f"{commit}.json")
+    save_json(output, report)
+    for name, r in results.items():
+        print(f"{name:28s} best {r['best_s']:.4f}s  {r['items_per_s']} items/s")
+    print(f"informe: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import os
+import gzip
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .config import (
+    PAGE_CACHE_DIR,
+    PAGE_CACHE_TTL,
+    PAGE_CACHE_MAX_BYTES,
+    PAGE_CACHE_EVICT_EVERY,
+)
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url         TEXT PRIMARY KEY,
+    sha         TEXT NOT NULL,
+    size        INTEGER NOT NULL,  -- bytes del blob comprimido
+    fetched_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    country     TEXT,
+    base_link   TEXT,
+    vertical    TEXT,
+    page        INTEGER
+);
+CREATE INDEX IF NOT EXISTS pages_country ON pages (country, base_link, vertical, page);
+CREATE INDEX IF NOT EXISTS pages_sha ON pages (sha);
+CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed_at);
+"""
+
+
+class PageCache:
+    """
+    Caché en disco del HTML crudo de cada URL paginada.
+    - Contenido direccionado por sha256: objects/ab/abcd….gz (gzip); dos
+      URLs con el mismo HTML comparten blob.
+    - Índice SQLite (index.sqlite) con url, sha, tamaños, fechas y la
+      posición de la página (país, base_link, vertical, página).
+    - Caducidad por `ttl` y desalojo LRU (accessed_at) cuando los blobs
+      superan `max_bytes`.
+    Es seguro compartirlo entre hilos.
+    """
+
+    def __init__(
+        self,
+        root: str = PAGE_CACHE_DIR,
+        ttl: float = PAGE_CACHE_TTL,
+        max_bytes: int = PAGE_CACHE_MAX_BYTES,
+        evict_every: int = PAGE_CACHE_EVICT_EVERY,
+        clock=time.time,
+    ):
+        self.root = root
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.evict_every = evict_every
+        self._clock = clock
+        self._puts = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self._db = sqlite3.connect(
+            os.path.join(root, "index.sqlite"), check_same_thread=False, isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def _blob_path(self, sha: str) -> str:
+        return os.path.join(self.root, "objects", sha[:2], f"{sha}.gz")
+
+    def _expired(self, fetched_at: float) -> bool:
+        return bool(self.ttl) and fetched_at < self._clock() - self.ttl
+
+    def put(
+        self,
+        url: str,
+        html: str,
+        country: Optional[str] = None,
+        base_link: Optional[str] = None,
+        vertical: Optional[str] = None,
+        page: Optional[int] = None,
+    ) -> str:
+        """Guarda el HTML de `url` y devuelve su sha256."""
+        data = html.encode("utf-8")
+        sha = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(sha)
+        blob = None if os.path.exists(path) else gzip.compress(data, compresslevel=6)
+        now = self._clock()
+        # blob e índice bajo el lock: un desalojo concurrente no puede
+        # borrar el blob entre su escritura y el INSERT
+        with self._lock:
+            if blob is not None and not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(blob)
+                os.replace(tmp, path)
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, sha, os.path.getsize(path), now, now, country, base_link, vertical, page),
+            )
+            self._puts += 1
+            evict = self.evict_every and self._puts % self.evict_every == 0
+        if evict:
+            self.evict()
+        return sha
+
+    def read(self, sha: str) -> str:
+        """HTML de un blob."""
+        with open(self._blob_path(sha), "rb") as f:
+            return gzip.decompress(f.read()).decode("utf-8")
+
+    def get(self, url: str) -> Optional[str]:
+        """HTML cacheado de `url`, o None si no está o ha caducado."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT sha, fetched_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None or self._expired(row[1]):
+                return None
+            self._db.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (self._clock(), url))
+        try:
+            return self.read(row[0])
+        except FileNotFoundError:
+            return None
+
+    def countries(self) -> List[str]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT DISTINCT country FROM pages WHERE country IS NOT NULL ORDER BY country"
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def pages(self, country: str) -> Iterator[Tuple[str, str, str, int, str]]:
+        """
+        Páginas vigentes de un país como (base_link, vertical, url, page, sha),
+        ordenadas por base_link, vertical y página.
+        """
+        min_fetched = self._clock() - self.ttl if self.ttl else 0
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT base_link, vertical, url, page, sha FROM pages "
+                "WHERE country = ? AND fetched_at >= ? ORDER BY base_link, vertical, page",
+                (country, min_fetched),
+            ).fetchall()
+        return iter(rows)
+
+    def _delete(self, urls: List[str]) -> int:
+        """Borra filas del índice y los blobs que queden sin referencias."""
+        freed = 0
+        for url in urls:
+            row = self._db.execute("SELECT sha FROM pages WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                continue
+            self._db.execute("DELETE FROM pages WHERE url = ?", (url,))
+            shared = self._db.execute(
+                "SELECT 1 FROM pages WHERE sha = ? LIMIT 1", (row[0],)
+            ).fetchone()
+            if shared is None:
+                path = self._blob_path(row[0])
+                try:
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        return freed
+
+    def total_bytes(self) -> int:
+        """Tamaño de los blobs referenciados (cada sha cuenta una vez)."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT sha, size FROM pages)"
+            ).fetchone()
+        return row[0]
+
+    def evict(self) -> int:
+        """
+        Elimina las entradas caducadas y, si los blobs superan `max_bytes`,
+        las menos usadas recientemente. Devuelve los bytes liberados.
+        """
+        freed = 0
+        with self._lock:
+            if self.ttl:
+                expired = [
+                    r[0]
+                    for r in self._db.execute(
+                        "SELECT url FROM pages WHERE fetched_at < ?", (self._clock() - self.ttl,)
+                    ).fetchall()
+                ]
+                freed += self._delete(expired)
+        excess = self.total_bytes() - self.max_bytes
+        if excess > 0:
+            with self._lock:
+                lru = self._db.execute(
+                    "SELECT url, size FROM pages ORDER BY accessed_at, url"
+                ).fetchall()
+                victims, planned = [], 0
+                for url, size in lru:
+                    if planned >= excess:
+                        break
+                    victims.append(url)
+                    planned += size
+                freed += self._delete(victims)
+        if freed:
+            logger.info(f"[cache] desalojados {freed / 1024 ** 2:.1f} MB")
+        return freed
+
+    def stats(self) -> Dict:
+        with self._lock:
+            pages, blobs = self._db.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT sha) FROM pages"
+            ).fetchone()
+        return {"pages": pages, "blobs": blobs, "bytes": self.total_bytes()}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
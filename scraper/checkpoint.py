@@ -0,0 +1,188 @@
+import os
+import time
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .config import CHECKPOINT_FLUSH_EVERY, CHECKPOINT_FLUSH_INTERVAL
+from .store import Store
+from .utils import load_json, save_json_atomic
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointManager:
+    """
+    Progreso de un país (CONFIG_DIR/{country}.json) con escrituras por lotes.
+    - Las actualizaciones se acumulan y se escriben cada `flush_every`
+      cambios o `flush_interval` segundos, siempre con temp-file + rename.
+    - base_links_completados se guarda en memoria como conjunto ordenado.
+    - Si hay un `sink` de resultados asociado, cada escritura registra su
+      offset (results_offset) tras hacer fsync del sink, de modo que al
+      reanudar se pueda descartar lo escrito después del último checkpoint.
+    - `on_flush`, si se fija, se llama tras cada escritura (lo registrado
+      hasta entonces ya sobrevive a un corte).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        flush_every: int = CHECKPOINT_FLUSH_EVERY,
+        flush_interval: float = CHECKPOINT_FLUSH_INTERVAL,
+    ):
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        data = load_json(path, {})
+        self.config: Dict = {"enlaces": data.get("enlaces", {})}
+        # dict como conjunto con orden de inserción
+        self._completed: Dict[str, None] = dict.fromkeys(data.get("base_links_completados", []))
+        self.results_offset: Optional[int] = data.get("results_offset")
+        self.sink = None
+        self.on_flush: Optional[Callable[[], None]] = None
+        self.lock = threading.RLock()
+        self._dirty = 0
+        self._last_flush = time.monotonic()
+
+    @property
+    def enlaces(self) -> Dict:
+        return self.config["enlaces"]
+
+    def is_completed(self, base_link: str) -> bool:
+        return base_link in self._completed
+
+    @property
+    def completed(self) -> Iterable[str]:
+        return self._completed.keys()
+
+    def bind_sink(self, sink_path: str) -> None:
+        """
+        Alinea el fichero de resultados con el último checkpoint: trunca lo
+        escrito después de results_offset (páginas que se volverán a pedir).
+        Debe llamarse antes de abrir el writer sobre `sink_path`.
+        """
+        if self.results_offset is None or not os.path.exists(sink_path):
+            return
+        size = os.path.getsize(sink_path)
+        if size > self.results_offset:
+            logger.warning(
+                f"{sink_path}: descarto {size - self.results_offset} bytes "
+                f"posteriores al último checkpoint"
+            )
+            os.truncate(sink_path, self.results_offset)
+        elif size < self.results_offset:
+            logger.warning(f"{sink_path}: más corto que el checkpoint, ignoro el offset")
+            self.results_offset = None
+
+    def touch(self, n: int = 1) -> None:
+        """Registra `n` cambios y escribe si se alcanza algún umbral."""
+        with self.lock:
+            self._dirty += n
+            if (
+                self._dirty >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            ):
+                self.flush()
+
+    def commit(self, records: List[dict]) -> None:
+        """Añade los resultados de una página al sink y cuenta el cambio."""
+        with self.lock:
+            self.sink.write(records)
+            self.touch()
+
+    def complete(self, base_link: str) -> None:
+        with self.lock:
+            self._completed[base_link] = None
+            self.flush()
+
+    def to_dict(self) -> Dict:
+        data = {
+            "enlaces": self.enlaces,
+            "base_links_completados": list(self._completed),
+        }
+        if self.results_offset is not None:
+            data["results_offset"] = self.results_offset
+        return data
+
+    def flush(self) -> None:
+        """Escribe el checkpoint (primero fsync de los resultados)."""
+        with self.lock:
+            if self.sink is not None:
+                self.sink.sync()
+                self.results_offset = self.sink.tell()
+            save_json_atomic(self.path, self.to_dict())
+            self._dirty = 0
+            self._last_flush = time.monotonic()
+            if self.on_flush is not None:
+                self.on_flush()
+
+
+class StoreCheckpoint:
+    """
+    Progreso de un país en el Store SQLite, con la misma interfaz que
+    CheckpointManager. Cada página se registra con commit(): sus empresas
+    y las entradas de progreso modificadas van en una misma transacción,
+    así que no hace falta sink ni results_offset para reanudar.
+    """
+
+    def __init__(self, store: Store, country: str):
+        self.store = store
+        self.country = country
+        data = store.load_progress(country)
+        self.config: Dict = {"enlaces": data["enlaces"]}
+        self._completed: Dict[str, None] = dict.fromkeys(data["base_links_completados"])
+        self._written = {link: self._key(e) for link, e in self.enlaces.items()}
+        self.results_offset = None
+        self.sink = None
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def _key(entry: Dict) -> Tuple:
+        return entry["start_page"], entry["end_page"], entry["current_page"]
+
+    @property
+    def enlaces(self) -> Dict:
+        return self.config["enlaces"]
+
+    def is_completed(self, base_link: str) -> bool:
+        return base_link in self._completed
+
+    @property
+    def completed(self) -> Iterable[str]:
+        return self._completed.keys()
+
+    def bind_sink(self, sink_path: str) -> None:
+        pass
+
+    def _dirty(self) -> Dict[str, Dict]:
+        return {
+            link: e for link, e in self.enlaces.items() if self._written.get(link) != self._key(e)
+        }
+
+    def _mark_written(self, entries: Dict[str, Dict]) -> None:
+        for link, e in entries.items():
+            self._written[link] = self._key(e)
+
+    def touch(self, n: int = 1) -> None:
+        self.flush()
+
+    def commit(self, records: List[dict]) -> Tuple[int, int]:
+        """Empresas de una página + progreso pendiente, en una transacción."""
+        with self.lock:
+            dirty = self._dirty()
+            counts = self.store.commit_page(self.country, records, dirty)
+            self._mark_written(dirty)
+            return counts
+
+    def complete(self, base_link: str) -> None:
+        with self.lock:
+            self.flush()
+            self._completed[base_link] = None
+            self.store.complete(self.country, base_link)
+
+    def flush(self) -> None:
+        with self.lock:
+            dirty = self._dirty()
+            if dirty:
+                self.store.save_links(self.country, dirty)
+                self._mark_written(dirty)
@@ -21,3 +21,121 @@ MAX_RETRIES = 3
 INITIAL_BACKOFF = 5  # segundos
 BACKOFF_FACTOR = 2
 DEFAULT_END_PAGE = 20
+
+# pool de sesiones de navegador
+POOL_MAX_PAGES_PER_SESSION = 50  # páginas antes de reciclar una sesión
+POOL_MAX_SESSION_AGE = 15 * 60  # segundos de vida máxima de una sesión
+
+# capa de descarga: "auto" (HTTP con fallback a navegador), "http" o "browser"
+FETCH_BACKEND = "auto"
+HTTP_TIMEOUT = 20  # segundos
+HTTP_POOL_MAXSIZE = 4  # conexiones keep-alive por host
+
+# step0 asíncrono
+STEP0_CONCURRENCY = 4  # descargas simultáneas (la cortesía por host es la del scheduler)
+
+# resultados en streaming (JSONL append-only)
+RESULTS_FSYNC_EVERY = 500  # registros entre fsync
+RESULTS_FSYNC_INTERVAL = 5.0  # segundos máximos entre fsync
+RESULTS_COMPACT_ON_FINISH = True  # regenerar el JSON por país al terminar
+
+# checkpoints de progreso (config_companies/*.json)
+CHECKPOINT_FLUSH_EVERY = 10  # actualizaciones entre escrituras
+CHECKPOINT_FLUSH_INTERVAL = 30.0  # segundos máximos entre escrituras
+
+# planificador adaptativo de cortesía (AIMD por proxy y por host)
+SCHED_INITIAL_DELAY = 3.0  # segundos entre peticiones al arrancar
+SCHED_PROXY_MIN_DELAY = 1.0
+SCHED_PROXY_MAX_DELAY = 120.0
+SCHED_HOST_MIN_DELAY = 0.1
+SCHED_HOST_MAX_DELAY = 60.0
+SCHED_RATE_INCREASE = 0.05  # peticiones/s que se suman por página ok
+SCHED_BLOCK_DECREASE = 0.25  # factor de la tasa tras challenge/denied
+SCHED_ERROR_DECREASE = 0.5  # factor de la tasa tras 5xx/conexión perdida
+SCHED_JITTER = 0.2  # variación aleatoria relativa de cada espera
+
+# salud de proxies (puntuación y cuarentena)
+PROXY_HEALTH_FILE = os.path.join("data", "proxy_health.json")
+PROXY_QUARANTINE_BASE = 60.0  # segundos de la primera cuarentena
+PROXY_QUARANTINE_MAX = 6 * 3600.0  # tope de cuarentena (crece x2 por fallo)
+PROXY_SCORE_ALPHA = 0.3  # peso de la última observación en las medias móviles
+PROXY_LATENCY_REF = 5.0  # segundos de latencia que reducen la puntuación a la mitad
+PROXY_HEALTH_SAVE_EVERY = 20  # observaciones entre guardados a disco
+
+# pre‑validación de proxies
+VALID_PROXY_LIST_FILE = "proxies_valid.txt"  # proxies viables, de mejor a peor
+PROXY_STATS_FILE = os.path.join("data", "proxy_stats.json")
+PROXY_CHECK_URL = "https://www.dnb.com/business-directory.html"
+PROXY_CHECK_TIMEOUT = 15  # segundos
+PROXY_CHECK_CONCURRENCY = 32  # sondeos simultáneos
+
+# caché de páginas (HTML crudo comprimido, para replay y re‑extracción)
+PAGE_CACHE_ENABLED = True
+PAGE_CACHE_DIR = os.path.join("data", "page_cache")
+PAGE_CACHE_TTL = 90 * 24 * 3600  # segundos; 0 = sin caducidad
+PAGE_CACHE_MAX_BYTES = 20 * 1024 ** 3  # tamaño máximo de los blobs (LRU)
+PAGE_CACHE_EVICT_EVERY = 500  # escrituras entre pasadas de desalojo
+
+# diff: campos comparados y motor
+DIFF_FIELDS = ("revenue", "location")  # también: company_name, sub_industry, page
+DIFF_REVENUE_THRESHOLD = 0.0  # cambio relativo mínimo de revenue (0.10 = 10%); 0 = cualquier cambio
+DIFF_ENGINE = "auto"  # "numpy" (columnar en memoria), "stream" (SQLite, memoria acotada) o "auto"
+# en "auto", tamaño máximo en disco de los dos snapshots para numpy: se cargan enteros en
+# memoria (varias veces su tamaño); por encima, diff en streaming con memoria acotada
+DIFF_COLUMNAR_MAX_BYTES = 64 * 1024 ** 2
+# diff en streaming (índice temporal SQLite en disco)
+DIFF_BATCH_SIZE = 5000  # registros por inserción
+DIFF_SQLITE_CACHE_MB = 64  # memoria máxima de páginas SQLite
+DIFF_TOP_MOVERS = 20  # empresas con mayor cambio de revenue en el resumen
+DIFF_SUMMARY_FILE = "summary.json"  # dentro del directorio de informes
+DIFF_STATE_FILE = "diff_state.json"  # tamaño/mtime/hash de las fuentes ya comparadas
+DIFF_COLUMNS = None  # columnas de los registros en el informe; None = registro completo
+
+# deduplicación de empresas (por company_link) durante el scraping
+DEDUP_ENABLED = True
+
+# exportación columnar (Parquet particionado por país y sub_industry; requiere pyarrow)
+PARQUET_DIR = os.path.join("data", "parquet")
+PARQUET_BATCH_SIZE = 50_000  # registros por lote convertido a Arrow
+PARQUET_COMPRESSION = "zstd"
+
+# backend de persistencia: "json" (ficheros) o "sqlite" (STORE_PATH, modo WAL)
+STORAGE_BACKEND = "json"
+STORE_PATH = os.path.join("data", "scraper.sqlite")
+STORE_CACHE_MB = 64  # memoria máxima de páginas SQLite
+STORE_KEEP_SNAPSHOTS = 3  # snapshots por país que se conservan (el diff usa los dos últimos)
+
+# refresco incremental (--refresh)
+FINGERPRINT_DIR = os.path.join("data", "fingerprints")  # huella por página listada
+REFRESH_SAMPLE_PAGES = 3  # páginas muestreadas por vertical además de la 1
+REFRESH_STOP_AFTER = 3  # páginas seguidas iguales al snapshot anterior para cortar
+
+# índice de verticales A→Z por base_link (descubrimiento en paralelo)
+VERTICALS_DIR = os.path.join("data", "verticals")
+VERTICALS_TTL = 30 * 24 * 3600  # segundos; 0 = sin caducidad
+VERTICALS_WORKERS = 8  # descargas simultáneas de páginas base
+
+# estimación del end_page exacto de cada vertical antes de recorrerla
+PAGE_ESTIMATE_ENABLED = True
+PAGE_PROBE_ENABLED = True  # sin contador de resultados: búsqueda exponencial + binaria
+
+# cola persistente de tareas (una por base_link, vertical y URL paginada)
+TASKQUEUE_PATH = os.path.join("data", "tasks.sqlite")
+TASK_LEASE_SECONDS = 900  # concesión de una tarea en curso; caducada, se reparte de nuevo
+TASK_RENEW_INTERVAL = 300  # un worker renueva la concesión mientras ejecuta la tarea
+TASK_MAX_ATTEMPTS = 5  # intentos antes de marcarla como failed
+TASK_RETRY_DELAY = 60  # segundos × intentos antes de reintentar una tarea fallida
+TASK_POLL_INTERVAL = 1.0  # espera de un worker sin tareas listas (reintentos diferidos)
+
+# modo distribuido (--coordinator / --worker URL)
+COORDINATOR_HOST = "127.0.0.1"  # "0.0.0.0" para aceptar workers de otras máquinas
+COORDINATOR_PORT = 8765
+COORDINATOR_RETRIES = 5  # fallos de conexión seguidos tras los que un worker se detiene
+COORDINATOR_BACKOFF = 1.0  # segundos (×2 por intento) entre reintentos de una llamada
+COORDINATOR_LINGER = 5.0  # segundos que sigue sirviendo tras terminar (avisa a los workers)
+
+# métricas (tiempos por fase, contadores y throughput)
+METRICS_ENABLED = True
+METRICS_DIR = os.path.join("data", "metrics")  # {nombre}.prom (textfile de Prometheus) y .json
+METRICS_INTERVAL = 60.0  # segundos entre líneas de throughput y exportaciones
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)  # segundos
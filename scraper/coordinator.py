@@ -0,0 +1,298 @@
+"""
+Modo distribuido: un coordinador y N workers en otras máquinas (o procesos).
+- El coordinador es dueño de la cola de tareas (scraper.taskqueue) y del
+  estado de cada país, construidos a partir de INPUT_DIR_1, y los sirve por
+  HTTP/JSON (stdlib, sin dependencias):
+      POST /lease     {"worker"}                    → {"task", "payload", "finished"}
+      POST /complete  {"worker", "task_id", "outcome"} → {"ok"}
+      POST /fail      {"worker", "task_id", "error"}   → {"ok"}
+      POST /renew     {"worker", "task_id"}            → {"ok"}
+      GET  /status                                   → {país: {estado: tareas}}
+- Cada worker ejecuta la parte de red de las tareas (workers.execute) con
+  sus propios proxies y devuelve las empresas extraídas al coordinador,
+  que las registra. Una concesión perdida (worker caído o lento) caduca y
+  la tarea se reparte de nuevo; un resultado tardío de una concesión que
+  ya no es suya se rechaza (409). Mientras ejecuta una tarea larga, el
+  worker renueva su concesión (/renew).
+"""
+
+import os
+import json
+import time
+import socket
+import logging
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+from .cache import PageCache
+from .config import (
+    COORDINATOR_BACKOFF,
+    COORDINATOR_HOST,
+    COORDINATOR_LINGER,
+    COORDINATOR_PORT,
+    COORDINATOR_RETRIES,
+    FETCH_BACKEND,
+    PAGE_CACHE_ENABLED,
+    TASK_POLL_INTERVAL,
+)
+from .fetcher import make_fetcher
+from .metrics import ThroughputReporter
+from .proxies import ProxyManager, load_proxies
+from .ratelimit import AdaptiveScheduler
+from .taskqueue import Task, TaskQueue
+from .workers import Dispatcher, WorkerEngine
+
+logger = logging.getLogger(__name__)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "dnb-coordinator/1"
+
+    def log_message(self, fmt, *args):
+        logger.debug("[coord] " + fmt % args)
+
+    def _reply(self, code: int, body) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        coord: Coordinator = self.server.coordinator
+        if self.path == "/status":
+            self._reply(200, coord.tasks.counts(coord.dispatcher.countries))
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        coord: Coordinator = self.server.coordinator
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+            code, reply = coord.handle(self.path, body)
+        except Exception as e:
+            logger.exception(f"[coord] error en {self.path}")
+            code, reply = 500, {"error": str(e)}
+        self._reply(code, reply)
+
+
+class Coordinator:
+    """Servidor HTTP de reparto de tareas sobre un Dispatcher local."""
+
+    def __init__(
+        self,
+        countries: List[str],
+        host: str = COORDINATOR_HOST,
+        port: int = COORDINATOR_PORT,
+        reset: bool = False,
+        tasks: Optional[TaskQueue] = None,
+        cache: Optional[PageCache] = None,
+    ):
+        self.tasks = tasks if tasks is not None else TaskQueue()
+        self.dispatcher = Dispatcher(self.tasks)
+        self.dispatcher.open_countries(countries, reset=reset, cache=cache)
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.coordinator = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def handle(self, path: str, body: Dict) -> Tuple[int, Dict]:
+        worker = str(body.get("worker", "?"))
+        if path == "/lease":
+            leased = self.dispatcher.lease(worker)
+            if leased is None:
+                return 200, {"task": None, "finished": self.dispatcher.finished()}
+            task, payload = leased
+            return 200, {"task": task._asdict(), "payload": payload, "finished": False}
+        if path in ("/complete", "/fail", "/renew"):
+            task = self.tasks.get(int(body["task_id"]))
+            if task is None or self.tasks.holder(task.id) != worker:
+                return 409, {"ok": False, "error": "concesión perdida"}
+            if path == "/renew":
+                return 200, {"ok": self.dispatcher.renew(task, worker)}
+            if path == "/fail":
+                self.dispatcher.fail(task, str(body.get("error", "")), worker)
+                return 200, {"ok": True}
+            outcome = body.get("outcome") or {}
+            return 200, {"ok": self.dispatcher.complete(task, outcome, worker)}
+        return 404, {"error": "not found"}
+
+    def start(self) -> "Coordinator":
+        self._thread = threading.Thread(
+            target=self.server.serve_forever, name="coordinator", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"[coord] escuchando en {self.url}")
+        return self
+
+    def wait(self, poll: float = TASK_POLL_INTERVAL, linger: float = COORDINATOR_LINGER) -> None:
+        """
+        Espera a que no queden tareas abiertas; mantiene el servidor `linger`
+        segundos más para que los workers sepan que han terminado.
+        """
+        while not self.dispatcher.finished():
+            time.sleep(poll)
+        time.sleep(linger)
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        self.dispatcher.close()
+
+
+def run_coordinator(
+    countries: List[str],
+    host: str = COORDINATOR_HOST,
+    port: int = COORDINATOR_PORT,
+    reset: bool = False,
+) -> Dict[str, Dict[str, int]]:
+    """Sirve las tareas de `countries` hasta terminarlas; devuelve el progreso final."""
+    tasks = TaskQueue()
+    coord = Coordinator(countries, host, port, reset=reset, tasks=tasks).start()
+    try:
+        # aquí solo se registran resultados (persist); el resto, en los workers
+        with ThroughputReporter("coordinator"):
+            coord.wait()
+        return tasks.counts(countries)
+    finally:
+        coord.close()
+        tasks.close()
+
+
+class RemoteDispatcher:
+    """
+    Dispatcher de un coordinador remoto, para WorkerEngine. Un fallo de red
+    o una respuesta ilegible al entregar un resultado se reintenta `retries`
+    veces con espera creciente; agotados, el resultado se descarta y la
+    tarea se repite cuando caduque su concesión.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        retries: int = COORDINATOR_RETRIES,
+        timeout: float = 60,
+        backoff: float = COORDINATOR_BACKOFF,
+    ):
+        self.url = url.rstrip("/")
+        self.retries = retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self._finished = False
+        self._errors = 0
+
+    def _post(self, path: str, body: Dict) -> Dict:
+        req = urllib.request.Request(
+            self.url + path,
+            data=json.dumps(body, ensure_ascii=False).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return json.loads(resp.read())
+        except urllib.error.HTTPError as e:
+            if e.code >= 500:
+                raise  # error del coordinador: se reintenta
+            try:
+                return json.loads(e.read() or b"{}")
+            except ValueError:
+                return {"ok": False, "error": f"HTTP {e.code}"}
+
+    def _call(self, path: str, body: Dict) -> Optional[Dict]:
+        """_post con reintentos y espera creciente; None si se agotan."""
+        for attempt in range(1, self.retries + 1):
+            try:
+                return self._post(path, body)
+            except (urllib.error.URLError, OSError, ValueError) as e:
+                logger.warning(f"[worker] {path} falló ({e}), intento {attempt}/{self.retries}")
+                if attempt < self.retries:
+                    time.sleep(self.backoff * 2 ** (attempt - 1))
+        return None
+
+    def lease(self, worker: str) -> Optional[Tuple[Task, Dict]]:
+        try:
+            reply = self._post("/lease", {"worker": worker})
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            # coordinador caído o ya cerrado: se reintenta unas cuantas veces
+            self._errors += 1
+            logger.warning(
+                f"[worker] coordinador no disponible ({e}), {self._errors}/{self.retries}"
+            )
+            self._finished = self._errors >= self.retries
+            return None
+        self._errors = 0
+        self._finished = reply.get("finished", False)
+        if reply.get("task") is None:
+            return None
+        return Task(**reply["task"]), reply["payload"]
+
+    def finished(self) -> bool:
+        return self._finished
+
+    def complete(self, task: Task, outcome: Dict, worker: str) -> bool:
+        reply = self._call("/complete", {"worker": worker, "task_id": task.id, "outcome": outcome})
+        if reply is None:
+            logger.error(f"[worker] coordinador sin respuesta, descarto el resultado de {task.id}")
+            return False
+        if not reply.get("ok"):
+            logger.warning(f"[worker] resultado de la tarea {task.id} rechazado: {reply}")
+        return bool(reply.get("ok"))
+
+    def fail(self, task: Task, error: str, worker: str) -> None:
+        if self._call("/fail", {"worker": worker, "task_id": task.id, "error": error}) is None:
+            logger.error(f"[worker] coordinador sin respuesta, no informé del fallo de {task.id}")
+
+    def renew(self, task: Task, worker: str) -> bool:
+        try:
+            reply = self._post("/renew", {"worker": worker, "task_id": task.id})
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            logger.warning(f"[worker] no se pudo renovar la tarea {task.id}: {e}")
+            return False
+        return bool(reply.get("ok"))
+
+
+def run_remote_workers(
+    url: str,
+    workers: int = 1,
+    backend: str = FETCH_BACKEND,
+    fetcher_factory=None,
+    poll: float = TASK_POLL_INTERVAL,
+) -> Dict[int, int]:
+    """
+    Worker del modo distribuido: `workers` hilos que piden tareas al
+    coordinador de `url` hasta que no quede ninguna. Devuelve las tareas
+    hechas por hilo.
+    """
+    if fetcher_factory is None:
+        scheduler = AdaptiveScheduler()
+        health = ProxyManager()
+
+        def fetcher_factory(proxies):
+            return make_fetcher(proxies, backend, scheduler=scheduler, health=health)
+
+    cache = PageCache() if PAGE_CACHE_ENABLED else None
+    engine = WorkerEngine(
+        workers,
+        load_proxies(),
+        fetcher_factory=fetcher_factory,
+        poll=poll,
+        dispatcher=RemoteDispatcher(url),
+        cache=cache,
+    )
+    try:
+        with ThroughputReporter(f"worker-{socket.gethostname()}-{os.getpid()}"):
+            engine.run()
+    finally:
+        if cache is not None:
+            cache.close()
+    return engine.processed
@@ -1,29 +1,34 @@
 import os
-import time
-import random
 import logging
-from selenium.webdriver.common.by import By
+from itertools import chain, groupby
+from typing import Dict, Iterable, Iterator, Optional, Set, Tuple
 
 from .config import (
     DEFAULT_END_PAGE,
     OUTPUT_DIR_1,
     INPUT_DIR_1,
     CONFIG_DIR,
-    PROXY_LIST_FILE,
-    INITIAL_BACKOFF,
-    MAX_RETRIES,
-    BACKOFF_FACTOR,
+    FETCH_BACKEND,
+    DEDUP_ENABLED,
 )
-from .driver_factory import init_driver, BASE_URL
-from .extractor import (
-    bypass_challenge,
-    is_access_denied,
-    is_error_500,
-    is_connection_lost,
-    extract_companies_detailed,
-    is_no_companies_message,
+from .cache import PageCache
+from .extractor import PageStatus, classify_page, extract_companies_detailed
+from .checkpoint import CheckpointManager, StoreCheckpoint
+from .dedup import DedupIndex
+from .fingerprints import PageFingerprints
+from .metrics import timed
+from .store import get_store, process_pool, use_sqlite
+from .verticals import VerticalIndex
+from .utils import (
+    chunked,
+    load_json,
+    read_jsonl,
+    read_results_jsonl,
+    iter_json_array,
+    JsonlWriter,
+    compact_jsonl,
+    write_json_array,
 )
-from .utils import cargar_proxies, load_json, save_json
 
 logger = logging.getLogger(__name__)
 
@@ -59,156 +64,433 @@ def get_next_page(entry: dict) -> int:
     )
 
 
-def scrape_country(country: str, reset: bool = False):
+class CountryState:
     """
-    Hace scraping completo (o re‑scrape si reset=True) para un país.
-    - Carga/crea CONFIG_DIR/{country}.json
-    - Itera cada base_link, vertical y página
-    - Persiste progreso y resultados en OUTPUT_DIR_1/{country}.json
+    Estado de scraping de un país: checkpoint de progreso y resultados.
+    Las mutaciones pasan por `lock` para poder compartirlo entre workers.
+    Los resultados de una página y el avance de su current_page se
+    registran juntos, de modo que el checkpoint y el stream de resultados
+    nunca discrepan tras un corte.
+    Con `cache`, el HTML de cada página descargada se guarda para replay.
+    Con DEDUP_ENABLED, cada empresa se escribe una sola vez; las apariciones
+    en otras sub‑industrias quedan como pertenencias (ver scraper.dedup).
+    Con el backend "sqlite", progreso y resultados viven en el Store: cada
+    página es una transacción y la deduplicación es la clave primaria.
     """
-    # directorios
-    os.makedirs(OUTPUT_DIR_1, exist_ok=True)
-    os.makedirs(CONFIG_DIR, exist_ok=True)
 
-    cfg_path = os.path.join(CONFIG_DIR, f"{country}.json")
-    if reset and os.path.exists(cfg_path):
-        os.remove(cfg_path)  # fuerza re‑inicio
-    config = load_json(cfg_path, {"enlaces": {}, "base_links_completados": []})
-    config.setdefault("enlaces", {})
-    config.setdefault("base_links_completados", [])
-
-    # proxies y lista de sub‑industrias
-    proxies = cargar_proxies(PROXY_LIST_FILE)
-    entries = load_json(os.path.join(INPUT_DIR_1, f"{country}.json"), [])
-    out_file = os.path.join(OUTPUT_DIR_1, f"{country}.json")
-    results = load_json(out_file, [])
+    def __init__(self, country: str, reset: bool = False, cache: Optional[PageCache] = None):
+        os.makedirs(OUTPUT_DIR_1, exist_ok=True)
+        os.makedirs(CONFIG_DIR, exist_ok=True)
+
+        self.country = country
+        self.cache = cache
+        self.cfg_path = os.path.join(CONFIG_DIR, f"{country}.json")
+        # lista de sub‑industrias
+        self.entries = load_json(os.path.join(INPUT_DIR_1, f"{country}.json"), [])
+        self.out_file = os.path.join(OUTPUT_DIR_1, f"{country}.json")
+        self.results_path = os.path.join(OUTPUT_DIR_1, f"{country}.jsonl")
+        # huellas de las páginas listadas, para --refresh
+        self.fingerprints = PageFingerprints(country)
+        # verticales A→Z ya descubiertas de cada base_link
+        self.verticals = VerticalIndex(country)
+
+        self.store = get_store() if use_sqlite() else None
+        if self.store is not None:
+            if reset:
+                self.store.reset_country(country)  # fuerza re‑inicio
+            self.ckpt = StoreCheckpoint(self.store, country)
+            self.config = self.ckpt.config
+            # un país ya completo al abrirlo no genera un snapshot nuevo al cerrar
+            self._complete_at_open = not self.pending_entries()
+            self.sink = self.dedup = None
+            self.lock = self.ckpt.lock
+            return
+
+        if reset and os.path.exists(self.cfg_path):
+            os.remove(self.cfg_path)  # fuerza re‑inicio
+        self.ckpt = CheckpointManager(self.cfg_path)
+        self.config = self.ckpt.config
+
+        # resultados: stream JSONL append-only; el JSON se compacta al final
+        if not os.path.exists(self.results_path) and os.path.exists(self.out_file):
+            # migrar un snapshot JSON previo al formato JSONL
+            with JsonlWriter(self.results_path) as w:
+                w.write(load_json(self.out_file, []))
+        self.ckpt.bind_sink(self.results_path)
+        # el índice se reconstruye tras truncar al checkpoint: sobrevive al resume
+        # (en un re‑scrape se empieza vacío: las empresas se vuelven a escribir)
+        self.dedup = None
+        if DEDUP_ENABLED:
+            self.dedup = DedupIndex() if reset else DedupIndex.from_jsonl(self.results_path)
+        self.sink = JsonlWriter(self.results_path)
+        self.ckpt.sink = self.sink
+        self.lock = self.ckpt.lock
+
+    def pending_entries(self) -> list:
+        """Registros de sub‑industria cuyo base_link aún no está completado."""
+        out = []
+        for rec in self.entries:
+            if self.ckpt.is_completed(rec["link"]):
+                logger.info(f"[{self.country}] {rec['link']} ya completado, salto…")
+                continue
+            out.append(rec)
+        return out
+
+    def init_link(self, vlink: str) -> dict:
+        with self.lock:
+            new = vlink not in self.ckpt.enlaces
+            entry = init_link_cfg(vlink, self.config)
+            if new:
+                self.ckpt.touch()
+            return entry
+
+    def flush(self) -> None:
+        """Escribe ya el checkpoint (y hace fsync de los resultados)."""
+        with self.lock, timed("persist"):
+            self.ckpt.flush()
+
+    def update_link(self, entry: dict, **changes) -> None:
+        with self.lock:
+            entry.update(changes)
+            self.ckpt.touch()
+
+    def commit_page(self, entry: dict, records: list, **changes) -> None:
+        """Añade los resultados de una página y avanza su progreso, de forma atómica."""
+        with self.lock, timed("persist"):
+            if self.dedup is not None:
+                records = self.dedup.filter(records)
+            entry.update(changes)
+            self.ckpt.commit(records)
+
+    def close(self, compact: bool = True) -> None:
+        """
+        Escribe el checkpoint, cierra el stream y, opcionalmente, compacta el
+        JSON. Con el Store se guarda un snapshot de los resultados solo si
+        el país se completó en esta ejecución: una pasada interrumpida o
+        parcial no debe aparecer en el diff como empresas eliminadas.
+        """
+        with self.lock:
+            self.ckpt.flush()
+            self.fingerprints.save()
+            self.verticals.save()
+            if self.store is not None:
+                if compact and not self._complete_at_open and not self.pending_entries():
+                    sid = self.store.take_snapshot(self.country)
+                    logger.info(f"[{self.country}] snapshot {sid} guardado en {self.store.path}")
+                return
+            self.ckpt.sink = None
+            self.sink.close()
+            if self.dedup is not None:
+                logger.info(f"[{self.country}] dedup: {self.dedup.stats()}")
+            if compact:
+                n = compact_jsonl(self.results_path, self.out_file)
+                logger.info(f"[{self.country}] {n} registros compactados en {self.out_file}")
+
+    def complete_base_link(self, base_link: str, verticals: list) -> bool:
+        """Marca el base_link como completado si todas sus verticales terminaron."""
+        with self.lock:
+            enlaces = self.ckpt.enlaces
+            if not all(v in enlaces and get_next_page(enlaces[v]) is None for v in verticals):
+                return False
+            self.ckpt.complete(base_link)
+        logger.info(f"[{self.country}] base_link completado: {base_link}")
+        return True
+
+
+def fetch_listing(
+    rec: dict, vlink: str, page: int, fetcher, cache: Optional[PageCache] = None, country: str = ""
+) -> list:
+    """
+    Descarga y extrae una página listada (sin tocar el estado del país):
+    lista de empresas, vacía si la página no trae ninguna. Un bloqueo o
+    error se propaga para que la cola reintente la tarea más tarde.
+    """
+    paged = f"{vlink}?page={page}"
+    logger.info(f"[{country}] GET {paged}…")
+    res = fetcher.fetch(paged)
+    status = res.page_status
+    if cache is not None and not status.blocked:
+        cache.put(paged, res.html, country, base_link=rec["link"], vertical=vlink, page=page)
+    if status.blocked:
+        raise Exception(f"Bloqueo: {status.value} ({res.backend}, HTTP {res.status})")
+    if status == PageStatus.NO_COMPANIES:
+        return []
+    return extract_companies_detailed(res.html, rec["sub_industry"])
+
+
+def walk_vertical(
+    rec: dict,
+    vlink: str,
+    start: int,
+    end: int,
+    fetcher,
+    first_sig: Optional[list] = None,
+    cache: Optional[PageCache] = None,
+    country: str = "",
+) -> Dict:
+    """
+    Recorre en orden las páginas start..end de una vertical sin estimar
+    (tareas "vertical"), con los cortes de record_page, y devuelve
+    {"pages": {página: empresas}, "end_page": fin detectado o None}; si una
+    página falla, lo recorrido hasta ahí y "error".
+    """
+    out: Dict = {"pages": {}, "end_page": None}
+    sig = set(first_sig) if first_sig else None
+    for page in range(start, end + 1):
+        try:
+            comps = fetch_listing(rec, vlink, page, fetcher, cache, country)
+        except Exception as e:
+            out["error"] = str(e)
+            return out
+        links = {c["company_link"] for c in comps}
+        if not comps or (page > 1 and links == sig):
+            out["end_page"] = max(page - 1, 1)
+            return out
+        if page == 1:
+            sig = links
+        out["pages"][page] = comps
+    return out
+
+
+def record_page(state: CountryState, rec: dict, vlink: str, page: int, comps: list, **changes):
+    """
+    Registra una página ya extraída (tareas de la cola). Si no trae
+    empresas o repite la página 1, la vertical terminó antes: ajusta
+    end_page y lo devuelve. El checkpoint se escribe por lotes
+    (CHECKPOINT_FLUSH_EVERY); la cola repite las tareas que no llegaron a él.
+    """
+    entry = state.init_link(vlink)
+    first = state.fingerprints.get(rec["link"], vlink, 1)
+    if not comps or (
+        page > 1 and first and set(first["links"]) == {c["company_link"] for c in comps}
+    ):
+        new_end = max(page - 1, 1)
+        if new_end < entry["end_page"]:
+            state.update_link(entry, end_page=new_end)
+            state.fingerprints.truncate(rec["link"], vlink, new_end)
+            logger.info(f"[{state.country}] {vlink}: página {page} vacía, end_page={new_end}")
+        return new_end
+
+    state.fingerprints.put(rec["link"], vlink, page, comps)
+    state.commit_page(entry, [{**rec, **c, "page": page} for c in comps], **changes)
+    return None
+
+
+def compact_results(country: str) -> int:
+    """
+    Regenera OUTPUT_DIR_1/{country}.json (array JSON) a partir del stream
+    OUTPUT_DIR_1/{country}.jsonl o, con el backend "sqlite", de la tabla
+    de empresas. Devuelve el número de registros.
+    """
+    if use_sqlite():
+        return write_json_array(
+            get_store().iter_companies(country), os.path.join(OUTPUT_DIR_1, f"{country}.json")
+        )
+    return compact_jsonl(
+        os.path.join(OUTPUT_DIR_1, f"{country}.jsonl"),
+        os.path.join(OUTPUT_DIR_1, f"{country}.json"),
+    )
+
+
+def scrape_countries(
+    countries: list[str],
+    reset: bool = False,
+    workers: int = 1,
+    backend: str = FETCH_BACKEND,
+):
+    """
+    Para un listado de países:
+     - si reset=True, borra su cfg individual (y sus tareas) antes de scrapear
+     - encola su trabajo en la cola persistente de tareas (una por
+       base_link, vertical y URL paginada) y la consume con `workers`
+       workers; las páginas que fallan se reintentan más tarde sin detener
+       el resto (ver scraper.workers)
+    """
+    from .workers import run_workers
+
+    run_workers(countries, max(workers, 1), reset=reset, backend=backend)
+
 
-    for rec in entries:
-        base_link = rec["link"]
-        if base_link in config["base_links_completados"]:
-            logger.info(f"[{country}] {base_link} ya completado, salto…")
-            continue
+def previous_records(country: str) -> Iterator[Dict]:
+    """Resultados actuales del país (Store, stream JSONL o JSON compactado)."""
+    if use_sqlite():
+        return get_store().iter_companies(country)
+    results_path = os.path.join(OUTPUT_DIR_1, f"{country}.jsonl")
+    if os.path.exists(results_path):
+        return read_results_jsonl(results_path)
+    return iter_json_array(os.path.join(OUTPUT_DIR_1, f"{country}.json"))
 
-        full_base = BASE_URL + base_link
-        # obtener A→Z verticales
-        drv0 = init_driver(random.choice(proxies) if proxies else None)
+
+def expand_sightings(records: Iterable[Dict]) -> Iterator[Dict]:
+    """
+    Un registro por aparición de cada empresa: las pertenencias de los
+    registros deduplicados se expanden a su propia sub‑industria.
+    """
+    for rec in records:
+        base = {k: v for k, v in rec.items() if k != "memberships"}
+        yield base
+        for m in rec.get("memberships") or []:
+            yield {**base, **{k: m[k] for k in ("sub_industry", "link", "page")}}
+
+
+def replay_vertical(
+    cache: PageCache, rec: dict, rows: list, end_page: Optional[int] = None
+) -> Tuple[list, bool]:
+    """
+    Re‑extrae las páginas cacheadas de una vertical (ordenadas por página)
+    con los mismos cortes que walk_vertical: mensaje sin empresas o
+    firma de la primera página repetida. Devuelve (registros, completa):
+    la vertical está completa si las páginas van seguidas desde la 1, sin
+    bloqueos, y llegan a un corte o a `end_page`.
+    """
+    out = []
+    first_sig = None
+    for i, (_, _, url, page, sha) in enumerate(rows):
+        if page != i + 1:
+            return out, False  # hueco: página caducada o nunca descargada
+        html = cache.read(sha)
+        status = classify_page(html)
+        if status == PageStatus.NO_COMPANIES:
+            return out, True
+        if status.blocked:
+            logger.warning(f"[replay] página bloqueada en caché: {url}")
+            return out, False
+        comps = extract_companies_detailed(html, rec["sub_industry"])
+        sig = {c["company_link"] for c in comps}
+        if i == 0:
+            first_sig = sig
+        elif sig == first_sig:
+            return out, True
+        out.extend({**rec, **c, "page": page} for c in comps)
+    return out, bool(rows) and end_page is not None and len(rows) >= end_page
+
+
+def rewrite_results(country: str, batches: Iterable[list], label: str = "rewrite") -> int:
+    """
+    Sustituye todos los resultados de un país por los lotes de `batches`
+    (deduplicados igual que al scrapear). En JSON se escribe un JSONL nuevo
+    que reemplaza al anterior, se alinea el checkpoint con él y se compacta;
+    con el backend "sqlite" los lotes se vuelcan primero a un JSONL temporal
+    (la generación puede ser lenta: red, parseo) y luego se reemplazan las
+    empresas del país en el Store en una transacción y se guarda un
+    snapshot. Devuelve cuántos registros.
+    """
+    results_path = os.path.join(OUTPUT_DIR_1, f"{country}.jsonl")
+    if use_sqlite():
+        tmp = f"{results_path}.{label}"
+        with JsonlWriter(tmp) as w:
+            for records in batches:
+                w.write(records)
         try:
-            drv0.get(full_base)
-            time.sleep(random.uniform(2, 4))
-            verticals = [
-                e.get_attribute("href")
-                for e in drv0.find_elements(By.CSS_SELECTOR, ".alpha-pagination a[href]")
-            ]
-        except Exception:
-            verticals = []
+            store = get_store()
+            n = store.replace_companies(country, chunked(read_jsonl(tmp), 1000))
+            store.take_snapshot(country)
         finally:
-            drv0.quit()
-
-        verticals = [
-            v if v.startswith("http") else BASE_URL + v for v in verticals
-        ] or [full_base]
-        errores = False
-
-        # loop verticales → páginas
-        for vlink in verticals:
-            entry_cfg = init_link_cfg(vlink, config)
-            save_json(cfg_path, config)
-
-            start_page = entry_cfg["start_page"]
-            page = get_next_page(entry_cfg)
-            first_sig = None
-
-            while page:
-                paged = f"{vlink}?page={page}"
-                logger.info(f"[{country}] GET {paged}…")
-                success = False
-                backoff = INITIAL_BACKOFF
-
-                for attempt in range(1, MAX_RETRIES + 1):
-                    drv = init_driver(random.choice(proxies) if proxies else None)
-                    try:
-                        drv.get(paged)
-                        time.sleep(random.uniform(2, 4))
-
-                        # sin empresas?
-                        if is_no_companies_message(drv):
-                            new_end = max(page - 1, 1)
-                            entry_cfg.update({"end_page": new_end, "current_page": new_end + 1})
-                            save_json(cfg_path, config)
-                            success = True
-                            break
-
-                        # bloqueos?
-                        if any([bypass_challenge(drv),
-                                is_access_denied(drv),
-                                is_error_500(drv),
-                                is_connection_lost(drv)]):
-                            raise Exception("Bloqueo")
-
-                        comps = extract_companies_detailed(drv.page_source, rec["sub_industry"])
-
-                        # firma de la página 1
-                        if page == start_page:
-                            first_sig = {c["company_link"] for c in comps}
-                        # si repite la firma, cortamos
-                        elif first_sig is not None and {
-                            c["company_link"] for c in comps
-                        } == first_sig:
-                            new_end = max(page - 1, start_page)
-                            entry_cfg.update({"end_page": new_end, "current_page": new_end + 1})
-                            save_json(cfg_path, config)
-                            logger.info(f"[{country}] firma repetida en {paged}, ajustado end_page={new_end}")
-                            success = True
-                            break
-
-                        if not comps:
-                            success = True
-                            break
-
-                        # guardar resultados
-                        for c in comps:
-                            results.append({**rec, **c, "page": page})
-                        save_json(out_file, results)
-
-                        # avanzar
-                        entry_cfg["current_page"] += 1
-                        save_json(cfg_path, config)
-                        success = True
-                        break
-
-                    except Exception as e:
-                        logger.warning(f"[{country}] error {paged}: {e}, retry {attempt}/{MAX_RETRIES}")
-                        time.sleep(backoff + random.random())
-                        backoff *= BACKOFF_FACTOR
-                    finally:
-                        drv.quit()
-
-                if not success:
-                    logger.error(f"[{country}] fallo persistente en {paged}, dejo pendiente.")
-                    errores = True
-                    break
-
-                page = get_next_page(entry_cfg)
-
-        # si no hubo errores y todo paginado terminó:
-        if not errores and all(get_next_page(
-            config["enlaces"].get(v, {})
-        ) is None for v in verticals):
-            config["base_links_completados"].append(base_link)
-            save_json(cfg_path, config)
-            logger.info(f"[{country}] base_link completado: {base_link}")
-
-    logger.info(f"[{country}] Scraping completado.")
-
-
-def scrape_countries(countries: list[str], reset: bool = False):
+            os.remove(tmp)
+        return n
+    out_file = os.path.join(OUTPUT_DIR_1, f"{country}.json")
+    os.makedirs(OUTPUT_DIR_1, exist_ok=True)
+    tmp = f"{results_path}.{label}"
+    dedup = DedupIndex() if DEDUP_ENABLED else None
+    n = 0
+    with JsonlWriter(tmp) as w:
+        for records in batches:
+            if dedup is not None:
+                records = dedup.filter(records)
+            w.write(records)
+            n += len(records)
+    os.replace(tmp, results_path)
+
+    cfg_path = os.path.join(CONFIG_DIR, f"{country}.json")
+    if os.path.exists(cfg_path):
+        ckpt = CheckpointManager(cfg_path)
+        ckpt.results_offset = os.path.getsize(results_path)
+        ckpt.flush()
+    compact_jsonl(results_path, out_file)
+    return n
+
+
+def _replay_base_links(
+    country: str, cache: PageCache, entries: Dict[str, dict], tmp: str
+) -> Tuple[Set[str], Set[str]]:
     """
-    Para un listado de países:
-     - si reset=True, borra su cfg individual antes de scrapear
-     - llama a scrape_country por cada uno
+    Re‑extrae de la caché los base_links cuyas verticales están todas
+    completas y escribe sus registros en `tmp`. Devuelve los base_links
+    reconstruidos y los que no se pudieron reconstruir.
+    """
+    if use_sqlite():
+        enlaces = StoreCheckpoint(get_store(), country).enlaces
+    else:
+        enlaces = load_json(os.path.join(CONFIG_DIR, f"{country}.json"), {}).get("enlaces", {})
+    index = VerticalIndex(country, ttl=0)
+    rebuilt: Set[str] = set()
+    with JsonlWriter(tmp) as w:
+        for base_link, rows in groupby(cache.pages(country), key=lambda r: r[0]):
+            if base_link not in entries:
+                continue
+            by_vertical = {v: list(vrows) for v, vrows in groupby(rows, key=lambda r: r[1])}
+            records, complete = [], True
+            for vlink in index.get(base_link) or list(by_vertical):
+                end = enlaces.get(vlink, {}).get("end_page")
+                recs, ok = replay_vertical(
+                    cache, entries[base_link], by_vertical.get(vlink, []), end
+                )
+                records.extend(recs)
+                complete = complete and ok
+            if complete:
+                w.write(records)
+                rebuilt.add(base_link)
+    return rebuilt, set(entries) - rebuilt
+
+
+def replay_country(country: str, cache: Optional[PageCache] = None) -> int:
     """
-    for c in countries:
-        scrape_country(c, reset=reset)
+    Reconstruye OUTPUT_DIR_1/{country}.jsonl y .json (o las empresas del
+    Store) a partir de la caché de páginas, sin red, vía rewrite_results.
+    Solo se sustituyen los base_links con todas sus páginas en caché; el
+    resto conserva sus registros actuales. Si la caché no cubre ningún
+    base_link no se reescribe nada. Devuelve el número de registros.
+    """
+    own_cache = cache is None
+    if own_cache:
+        cache = PageCache()
+    tmp = os.path.join(OUTPUT_DIR_1, f"{country}.jsonl.cached")
+    os.makedirs(OUTPUT_DIR_1, exist_ok=True)
+    try:
+        entries = {
+            rec["link"]: rec
+            for rec in load_json(os.path.join(INPUT_DIR_1, f"{country}.json"), [])
+        }
+        rebuilt, missing = _replay_base_links(country, cache, entries, tmp)
+        if not rebuilt:
+            logger.warning(f"[{country}] replay: ningún base_link completo en caché, no reescribo")
+            return 0
+        if missing:
+            logger.warning(
+                f"[{country}] replay: {len(missing)} base_links sin caché completa, "
+                f"conservo sus registros actuales"
+            )
+        kept = (
+            r for r in expand_sightings(previous_records(country)) if r.get("link") not in rebuilt
+        )
+        n = rewrite_results(
+            country, chain(chunked(read_jsonl(tmp), 1000), chunked(kept, 1000)), label="replay"
+        )
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        if own_cache:
+            cache.close()
+    logger.info(f"[{country}] replay: {n} registros ({len(rebuilt)} base_links desde caché)")
+    return n
+
+
+def replay_countries(countries: list[str], workers: int = 1) -> Dict[str, int]:
+    """Replay de varios países; con workers>1, un proceso por país."""
+    if workers <= 1:
+        return {c: replay_country(c) for c in countries}
+    with process_pool(workers) as pool:
+        return dict(zip(countries, pool.map(replay_country, countries)))
 
 
 # Modo standalone: batch A→Z
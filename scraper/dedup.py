@@ -0,0 +1,152 @@
+import hashlib
+import logging
+from array import array
+from typing import Dict, Iterable, List
+
+from .utils import MEMBER_KEY, read_jsonl
+
+logger = logging.getLogger(__name__)
+
+
+def key64(*parts: str) -> int:
+    """Hash de 64 bits (blake2b) de una o varias cadenas; nunca devuelve 0."""
+    digest = hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+class HashSet64:
+    """
+    Conjunto compacto de enteros de 64 bits: direccionamiento abierto con
+    sondeo lineal sobre un array('Q') (8 bytes por hueco, carga ≤ 0.6).
+    El 0 marca hueco vacío, así que las claves deben ser distintas de 0.
+    """
+
+    MAX_LOAD = 0.6
+
+    def __init__(self, capacity: int = 1024):
+        size = 1
+        while size < capacity:
+            size <<= 1
+        self._slots = array("Q", bytes(8 * size))
+        self._mask = size - 1
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._slots) * self._slots.itemsize
+
+    def _find(self, key: int) -> int:
+        slots, mask = self._slots, self._mask
+        i = key & mask
+        while True:
+            cur = slots[i]
+            if cur == 0 or cur == key:
+                return i
+            i = (i + 1) & mask
+
+    def __contains__(self, key: int) -> bool:
+        return self._slots[self._find(key)] == key
+
+    def add(self, key: int) -> bool:
+        """Añade `key`; devuelve True si no estaba."""
+        i = self._find(key)
+        if self._slots[i] == key:
+            return False
+        self._slots[i] = key
+        self._len += 1
+        if self._len > self.MAX_LOAD * len(self._slots):
+            self._grow()
+        return True
+
+    def _grow(self) -> None:
+        old = self._slots
+        self._slots = array("Q", bytes(16 * len(old)))
+        self._mask = len(self._slots) - 1
+        for key in old:
+            if key:
+                self._slots[self._find(key)] = key
+
+
+def membership(rec: Dict) -> Dict:
+    """Registro de pertenencia: una empresa ya vista, listada en otra sub‑industria."""
+    return {
+        "company_link": rec["company_link"],
+        MEMBER_KEY: {
+            "sub_industry": rec.get("sub_industry"),
+            "link": rec.get("link"),
+            "page": rec.get("page"),
+        },
+    }
+
+
+class DedupIndex:
+    """
+    Índice de empresas ya escritas en el stream de resultados de un país.
+    - Empresa nueva (company_link): se escribe el registro completo.
+    - Empresa vista en otra sub‑industria: solo un registro de pertenencia
+      ({"company_link", "member_of": {...}}), que se fusiona al compactar.
+    - Misma empresa y misma sub‑industria (p. ej. página repetida tras un
+      corte): se descarta.
+    Se reconstruye leyendo el JSONL al reanudar.
+    Guarda hashes de 64 bits (key64), no los company_link: dos enlaces
+    distintos con el mismo hash se tomarían por la misma empresa (la
+    segunda quedaría como pertenencia o se descartaría). Con n empresas
+    la probabilidad es de ~n²/2⁶⁵ (≈3·10⁻⁶ para 10 millones); a cambio, la
+    memoria no depende de la longitud de los enlaces.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.companies = HashSet64(capacity)
+        self.sightings = HashSet64(capacity)
+        self.memberships = 0
+        self.dropped = 0
+
+    def _sighting(self, rec: Dict) -> int:
+        return key64(rec["company_link"], rec.get("link") or "")
+
+    def filter(self, records: Iterable[Dict]) -> List[Dict]:
+        """Registros a escribir para `records`, ya deduplicados."""
+        out = []
+        for rec in records:
+            if not self.sightings.add(self._sighting(rec)):
+                self.dropped += 1
+                continue
+            if self.companies.add(key64(rec["company_link"])):
+                out.append(rec)
+            else:
+                self.memberships += 1
+                out.append(membership(rec))
+        return out
+
+    def observe(self, line: Dict) -> None:
+        """Registra una línea ya escrita (registro completo o pertenencia)."""
+        member = line.get(MEMBER_KEY)
+        self.companies.add(key64(line["company_link"]))
+        self.sightings.add(key64(line["company_link"], (member or line).get("link") or ""))
+        if member is not None:
+            self.memberships += 1
+
+    @classmethod
+    def from_jsonl(cls, path: str) -> "DedupIndex":
+        index = cls()
+        n = 0
+        for line in read_jsonl(path):
+            index.observe(line)
+            n += 1
+        if n:
+            logger.info(
+                f"[dedup] índice reconstruido desde {path}: {len(index.companies)} empresas, "
+                f"{index.memberships} pertenencias"
+            )
+        return index
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "companies": len(self.companies),
+            "memberships": self.memberships,
+            "dropped": self.dropped,
+            "bytes": self.companies.nbytes + self.sightings.nbytes,
+        }
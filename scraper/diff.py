@@ -1,20 +1,384 @@
 import os
+import re
 import json
-from typing import Any, Dict, List, Tuple
+import heapq
+import hashlib
+import logging
+import sqlite3
+from collections import defaultdict
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .config import (
+    DIFF_FIELDS,
+    DIFF_REVENUE_THRESHOLD,
+    DIFF_ENGINE,
+    DIFF_COLUMNAR_MAX_BYTES,
+    DIFF_BATCH_SIZE,
+    DIFF_SQLITE_CACHE_MB,
+    DIFF_TOP_MOVERS,
+    DIFF_SUMMARY_FILE,
+    DIFF_STATE_FILE,
+    DIFF_COLUMNS,
+)
+from .store import get_store, process_pool, use_sqlite
+from .utils import iter_json_array, load_json, read_results_jsonl, save_json_atomic
+
+logger = logging.getLogger(__name__)
+
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+_REVENUE_RE = re.compile(r"([-+]?\d[\d,]*(?:\.\d+)?)\s*([KMBT])?", re.I)
+_REVENUE_SCALE = {"K": 1e3, "M": 1e6, "B": 1e9, "T": 1e12}
+
+
+def parse_revenue(value: Any) -> Optional[float]:
+    """
+    Convierte un revenue de dnb.com ("$1.2M", "$850K", "$3.4B") a número.
+    Devuelve None si no hay cifra.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not value:
+        return None
+    m = _REVENUE_RE.search(str(value))
+    if not m:
+        return None
+    num = float(m.group(1).replace(",", ""))
+    return num * _REVENUE_SCALE.get((m.group(2) or "").upper(), 1.0)
+
+
+def revenue_changed(old: Any, new: Any, threshold: float = DIFF_REVENUE_THRESHOLD) -> bool:
+    """
+    ¿Cambió el revenue? Con `threshold` > 0 solo cuentan variaciones
+    relativas mayores (0.10 = 10%); si alguno no es numérico se compara
+    el texto.
+    """
+    if old == new:
+        return False
+    if threshold <= 0:
+        return True
+    a, b = parse_revenue(old), parse_revenue(new)
+    if a is None or b is None:
+        return True
+    if a == 0:
+        return b != 0
+    return abs(b - a) / abs(a) > threshold
+
+
+def _columnar():
+    """Motor numpy si está instalado (extra "fast"), si no None."""
+    try:
+        from . import columnar
+    except ImportError:
+        return None
+    return columnar
+
+
+def _parquet():
+    """Lector Parquet si pyarrow está instalado (extra "parquet"), si no None."""
+    try:
+        from . import export
+    except ImportError:
+        return None
+    return export
+
+
+def _parquet_source(country: str, input_dir: str):
+    """Módulo de exportación si `input_dir` tiene el país en Parquet, si no None."""
+    export = _parquet()
+    return export if export is not None and export.has_country(country, input_dir) else None
+
+
+def _project(records: Iterable[Dict[str, Any]], columns: Optional[Sequence[str]]):
+    if columns is None:
+        return records
+    return ({k: rec[k] for k in columns if k in rec} for rec in records)
 
 
 def load_results(
     country: str,
     input_dir: str = "data/companies_by_country",
+    columns: Optional[Sequence[str]] = None,
 ) -> List[Dict[str, Any]]:
     """
-    Carga el snapshot JSON para un país dado desde el directorio especificado.
+    Carga el snapshot de un país desde el directorio especificado: la
+    partición Parquet country=<país> (ver scraper.export) o el JSON.
+    Con `columns` cada registro trae solo esos campos; en Parquet el resto
+    de columnas ni se lee.
     """
+    export = _parquet_source(country, input_dir)
+    if export is not None:
+        return export.load_records(country, input_dir, columns)
     path = os.path.join(input_dir, f"{country}.json")
     if not os.path.exists(path):
         return []
     with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+        records = json.load(f)
+    return records if columns is None else list(_project(records, columns))
+
+
+def iter_results(
+    country: str,
+    input_dir: str = "data/companies_by_country",
+    columns: Optional[Sequence[str]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Itera el snapshot de un país sin cargarlo en memoria: la partición
+    Parquet, el array JSON {country}.json o, si no existe, el stream
+    {country}.jsonl. `columns` como en load_results.
+    """
+    export = _parquet_source(country, input_dir)
+    if export is not None:
+        return export.iter_records(country, input_dir, columns)
+    path = os.path.join(input_dir, f"{country}.json")
+    if os.path.exists(path):
+        return _project(iter_json_array(path), columns)
+    return _project(read_results_jsonl(os.path.join(input_dir, f"{country}.jsonl")), columns)
+
+
+def _load_snapshot(
+    db: sqlite3.Connection,
+    table: str,
+    records: Iterable[Dict[str, Any]],
+    fields: Tuple[str, ...],
+) -> None:
+    """
+    Vuelca un snapshot a `table` por lotes: el registro completo y una
+    clave con los campos comparados. Si un company_link se repite gana el
+    último, como en un dict.
+    """
+    # la clave solo se compara por igualdad: repr es suficiente y más barato
+    rows = (
+        (c["company_link"], repr([c.get(f) for f in fields]), _encode(c))
+        for c in records
+    )
+    while True:
+        batch = list(islice(rows, DIFF_BATCH_SIZE))
+        if not batch:
+            return
+        db.executemany(f"INSERT OR REPLACE INTO {table} VALUES (?, ?, ?)", batch)
+
+
+def iter_diff(
+    old_records: Iterable[Dict[str, Any]],
+    new_records: Iterable[Dict[str, Any]],
+    fields: Tuple[str, ...] = DIFF_FIELDS,
+    revenue_threshold: float = DIFF_REVENUE_THRESHOLD,
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Diff en streaming con memoria acotada: ambos snapshots se indexan por
+    company_link en una base SQLite temporal en disco y se emiten tuplas
+    ("added" | "removed" | "updated", elemento) en ese orden.
+    """
+    fields = tuple(fields)
+    db = sqlite3.connect("")  # temporal en disco, se borra al cerrar
+    try:
+        db.execute(f"PRAGMA cache_size = -{DIFF_SQLITE_CACHE_MB * 1024}")
+        db.execute("PRAGMA journal_mode = OFF")
+        db.execute("PRAGMA synchronous = OFF")
+        for table in ("old", "new"):
+            db.execute(f"CREATE TABLE {table} (link TEXT PRIMARY KEY, key TEXT, rec TEXT)")
+        _load_snapshot(db, "old", old_records, fields)
+        _load_snapshot(db, "new", new_records, fields)
+
+        for (rec,) in db.execute(
+            "SELECT n.rec FROM new n LEFT JOIN old o ON o.link = n.link "
+            "WHERE o.link IS NULL ORDER BY n.rowid"
+        ):
+            yield "added", json.loads(rec)
+        for (rec,) in db.execute(
+            "SELECT o.rec FROM old o LEFT JOIN new n ON n.link = o.link "
+            "WHERE n.link IS NULL ORDER BY o.rowid"
+        ):
+            yield "removed", json.loads(rec)
+        for link, old_rec, new_rec in db.execute(
+            "SELECT n.link, o.rec, n.rec FROM new n JOIN old o ON o.link = n.link "
+            "WHERE o.key != n.key ORDER BY n.rowid"
+        ):
+            old_c, new_c = json.loads(old_rec), json.loads(new_rec)
+            item = _updated(link, old_c, new_c, fields, revenue_threshold)
+            if item is not None:
+                yield "updated", item
+    finally:
+        db.close()
+
+
+def _updated(
+    link: str,
+    old_c: Dict[str, Any],
+    new_c: Dict[str, Any],
+    fields: Tuple[str, ...],
+    revenue_threshold: float,
+) -> Optional[Dict[str, Any]]:
+    """Elemento "updated" o None si solo cambió revenue por debajo del umbral."""
+    changes = {
+        f: (old_c.get(f), new_c.get(f))
+        for f in fields
+        if (
+            revenue_changed(old_c.get(f), new_c.get(f), revenue_threshold)
+            if f == "revenue"
+            else old_c.get(f) != new_c.get(f)
+        )
+    }
+    if not changes:
+        return None
+    return {"company_link": link, "changes": changes, "old": old_c, "new": new_c}
+
+
+def _store_snapshots(country: str) -> Optional[Tuple[int, int]]:
+    """Ids de los dos últimos snapshots del país en el Store, si los hay."""
+    if not use_sqlite():
+        return None
+    ids = get_store().snapshots(country)
+    return (ids[-2], ids[-1]) if len(ids) >= 2 else None
+
+
+def iter_diff_snapshots(
+    old: int,
+    new: int,
+    fields: Tuple[str, ...] = DIFF_FIELDS,
+    revenue_threshold: float = DIFF_REVENUE_THRESHOLD,
+    columns: Optional[Sequence[str]] = None,
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Mismas tuplas que iter_diff entre dos snapshots del Store: los
+    emparejamientos por company_link son búsquedas en su clave primaria.
+    """
+    fields = tuple(fields)
+    for kind, a, b in get_store().snapshot_changes(old, new):
+        if columns is not None:
+            a, b = next(_project([a], columns)), b and next(_project([b], columns))
+        if kind != "changed":
+            yield kind, a
+            continue
+        item = _updated(a["company_link"], a, b, fields, revenue_threshold)
+        if item is not None:
+            yield "updated", item
+
+
+class _ReportWriter:
+    """
+    Escribe el informe {"country", "added", "removed", "updated"} elemento a
+    elemento, con el mismo formato que json.dump(indent=2).
+    """
+
+    SECTIONS = ("added", "removed", "updated")
+
+    def __init__(self, f, country: str):
+        self.f = f
+        self.counts = {s: 0 for s in self.SECTIONS}
+        self._open = None
+        f.write('{\n  "country": ' + json.dumps(country, ensure_ascii=False))
+
+    def _switch(self, section: str) -> None:
+        while self._open != section:
+            self._close_section()
+            nxt = self.SECTIONS.index(self._open) + 1 if self._open else 0
+            self._open = self.SECTIONS[nxt]
+            self.f.write(f',\n  "{self._open}": ')
+
+    def _close_section(self) -> None:
+        if self._open is not None:
+            self.f.write("\n  ]" if self.counts[self._open] else "[]")
+
+    def write(self, section: str, item: Dict[str, Any]) -> None:
+        self._switch(section)
+        body = json.dumps(item, indent=2, ensure_ascii=False).replace("\n", "\n    ")
+        self.f.write(("[\n    " if self.counts[section] == 0 else ",\n    ") + body)
+        self.counts[section] += 1
+
+    def close(self) -> None:
+        self._switch(self.SECTIONS[-1])
+        self._close_section()
+        self.f.write("\n}")
+
+
+class _Summary:
+    """Recuentos por sub_industry y mayores cambios de revenue de un país."""
+
+    def __init__(self, country: str, top_n: int = DIFF_TOP_MOVERS):
+        self.country = country
+        self.top_n = top_n
+        self.by_sub: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"added": 0, "removed": 0, "updated": 0}
+        )
+        self._movers: List[Tuple[float, int, Dict]] = []  # heap de tamaño top_n
+        self._seq = 0
+
+    def add(self, kind: str, item: Dict[str, Any]) -> None:
+        rec = item["new"] if kind == "updated" else item
+        self.by_sub[rec.get("sub_industry") or ""][kind] += 1
+        if kind != "updated" or "revenue" not in item["changes"]:
+            return
+        old_rev = parse_revenue(item["old"].get("revenue"))
+        new_rev = parse_revenue(item["new"].get("revenue"))
+        if old_rev is None or new_rev is None:
+            return
+        delta = new_rev - old_rev
+        mover = {
+            "country": self.country,
+            "company_link": item["company_link"],
+            "company_name": rec.get("company_name"),
+            "sub_industry": rec.get("sub_industry"),
+            "old_revenue": item["old"].get("revenue"),
+            "new_revenue": item["new"].get("revenue"),
+            "delta": delta,
+            "pct": round(delta / old_rev * 100, 2) if old_rev else None,
+        }
+        self._seq += 1
+        entry = (abs(delta), self._seq, mover)
+        if len(self._movers) < self.top_n:
+            heapq.heappush(self._movers, entry)
+        elif entry[0] > self._movers[0][0]:
+            heapq.heapreplace(self._movers, entry)
+
+    def top_movers(self) -> List[Dict]:
+        return [m for _, _, m in sorted(self._movers, key=lambda e: (-e[0], e[1]))]
+
+
+def _load_all(
+    country: str, input_dir: str, columns: Optional[Sequence[str]] = None
+) -> List[Dict[str, Any]]:
+    if _parquet_source(country, input_dir) is not None or os.path.exists(
+        os.path.join(input_dir, f"{country}.json")
+    ):
+        return load_results(country, input_dir, columns)
+    return list(iter_results(country, input_dir, columns))
+
+
+def _diff_columns(
+    columns: Optional[Sequence[str]], fields: Tuple[str, ...]
+) -> Optional[Tuple[str, ...]]:
+    """Columnas a leer: las pedidas más las que usan la comparación y el resumen."""
+    if columns is None:
+        return None
+    need = ("company_link", "company_name", "sub_industry", "revenue", *fields, *columns)
+    return tuple(dict.fromkeys(need))
+
+
+def _pick_engine(engine: str, country: str, old_dir: str, new_dir: str) -> str:
+    """
+    Resuelve "auto": con el backend "sqlite" y dos snapshots en el Store,
+    "store"; si no, numpy si está disponible y los snapshots caben en memoria.
+    """
+    if engine == "store" or (engine == "auto" and use_sqlite()):
+        if _store_snapshots(country) is not None:
+            return "store"
+        if engine == "store":
+            raise ValueError(f"{country}: el Store no tiene dos snapshots que comparar")
+    if engine != "auto":
+        if engine == "numpy" and _columnar() is None:
+            raise ImportError("el motor numpy requiere numpy (pip install dnb_scraper[fast])")
+        return engine
+    if _columnar() is None:
+        return "stream"
+    size = sum(
+        _source_size(p)
+        for p in (_source_path(country, old_dir), _source_path(country, new_dir))
+        if os.path.exists(p)
+    )
+    return "numpy" if size <= DIFF_COLUMNAR_MAX_BYTES else "stream"
 
 
 def compute_diff(
@@ -22,55 +386,222 @@ def compute_diff(
     old_dir: str = "data/companies_by_country_old",
     new_dir: str = "data/companies_by_country",
     report_dir: str = "reports",
+    top_n: int = DIFF_TOP_MOVERS,
+    fields: Tuple[str, ...] = DIFF_FIELDS,
+    revenue_threshold: float = DIFF_REVENUE_THRESHOLD,
+    engine: str = DIFF_ENGINE,
+    columns: Optional[Sequence[str]] = DIFF_COLUMNS,
 ) -> Dict[str, Any]:
     """
-    Compara el snapshot "old" y "new" de un país, y genera un dict con:
+    Compara el snapshot "old" y "new" de un país y escribe en
+    reports/{country}_changes.json:
       - added: empresas nuevas
       - removed: empresas que desaparecieron
-      - updated: empresas existentes cuyo "revenue" o "location" cambiaron
-    Escribe el informe completo en reports/{country}_changes.json.
-    """
-    old_snapshot = load_results(country, old_dir)
-    new_snapshot = load_results(country, new_dir)
-
-    # Indexar por company_link
-    old_map = {c["company_link"]: c for c in old_snapshot}
-    new_map = {c["company_link"]: c for c in new_snapshot}
-
-    # Detectar añadidos y eliminados
-    added = [new_map[link] for link in new_map if link not in old_map]
-    removed = [old_map[link] for link in old_map if link not in new_map]
-
-    # Detectar actualizados
-    updated: List[Dict[str, Any]] = []
-    for link, new_c in new_map.items():
-        if link in old_map:
-            old_c = old_map[link]
-            changes: Dict[str, Tuple[Any, Any]] = {}
-            for field in {"revenue", "location"}:
-                if old_c.get(field) != new_c.get(field):
-                    changes[field] = (old_c.get(field), new_c.get(field))
-            if changes:
-                updated.append(
-                    {
-                        "company_link": link,
-                        "changes": changes,
-                        "old": old_c,
-                        "new": new_c,
-                    }
-                )
-
-    report = {
-        "country": country,
-        "added": added,
-        "removed": removed,
-        "updated": updated,
-    }
+      - updated: empresas existentes en las que cambió alguno de `fields`
+        (revenue solo si varía más que `revenue_threshold`)
+    Motores: "stream" lee los snapshots y escribe el informe en streaming,
+    con memoria acotada; "numpy" los carga en columnas y compara de forma
+    vectorizada; "store" compara los dos últimos snapshots del Store
+    (backend "sqlite"). Con `columns`, los registros del informe solo llevan esas
+    columnas (y las necesarias para comparar), así que de una fuente Parquet
+    no se lee nada más. Devuelve el resumen: recuento por tipo de cambio y por
+    sub_industry, mayores cambios de revenue y la ruta del informe.
+    """
+    fields = tuple(fields)
+    engine = _pick_engine(engine, country, old_dir, new_dir)
+    cols = _diff_columns(columns, fields)
+    if engine == "store":
+        changes = iter_diff_snapshots(
+            *_store_snapshots(country), fields, revenue_threshold, cols
+        )
+    elif engine == "numpy":
+        changes = _columnar().iter_diff_columnar(
+            _load_all(country, old_dir, cols), _load_all(country, new_dir, cols),
+            fields, revenue_threshold,
+        )
+    else:
+        changes = iter_diff(
+            iter_results(country, old_dir, cols), iter_results(country, new_dir, cols),
+            fields, revenue_threshold,
+        )
 
-    # Asegurar directorio de reportes
     os.makedirs(report_dir, exist_ok=True)
     report_path = os.path.join(report_dir, f"{country}_changes.json")
-    with open(report_path, "w", encoding="utf-8") as f:
-        json.dump(report, f, indent=2, ensure_ascii=False)
+    tmp = report_path + ".tmp"
+    summary = _Summary(country, top_n)
+    with open(tmp, "w", encoding="utf-8") as f:
+        writer = _ReportWriter(f, country)
+        for kind, item in changes:
+            writer.write(kind, item)
+            summary.add(kind, item)
+        writer.close()
+    os.replace(tmp, report_path)
+
+    return {
+        "country": country,
+        "engine": engine,
+        **writer.counts,
+        "by_sub_industry": dict(sorted(summary.by_sub.items())),
+        "top_movers": summary.top_movers(),
+        "report": report_path,
+    }
+
+
+def _source_files(path: str) -> List[str]:
+    """El propio fichero o, para una partición Parquet, sus ficheros ordenados."""
+    if not os.path.isdir(path):
+        return [path]
+    return sorted(
+        os.path.join(root, name) for root, _, names in os.walk(path) for name in names
+    )
 
-    return report
+
+def _source_size(path: str) -> int:
+    return sum(os.path.getsize(p) for p in _source_files(path))
+
+
+def _file_state(path: str, previous: Optional[Dict] = None) -> Optional[Dict]:
+    """
+    Tamaño, mtime y sha256 de un fichero (o de todos los de una partición
+    Parquet). Si tamaño y mtime coinciden con `previous` se reutiliza su
+    hash sin releer los ficheros.
+    """
+    if not os.path.exists(path):
+        return None
+    files = _source_files(path)
+    stats = [os.stat(p) for p in files]
+    state = {
+        "size": sum(st.st_size for st in stats),
+        "mtime_ns": max((st.st_mtime_ns for st in stats), default=0),
+    }
+    if previous and all(previous.get(k) == v for k, v in state.items()):
+        return {**state, "sha256": previous.get("sha256")}
+    h = hashlib.sha256()
+    for p in files:
+        if p != path:
+            h.update(os.path.relpath(p, path).encode("utf-8"))
+        with open(p, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    return {**state, "sha256": h.hexdigest()}
+
+
+def _source_path(country: str, input_dir: str) -> str:
+    export = _parquet_source(country, input_dir)
+    if export is not None:
+        return export.country_dir(country, input_dir)
+    path = os.path.join(input_dir, f"{country}.json")
+    return path if os.path.exists(path) else os.path.join(input_dir, f"{country}.jsonl")
+
+
+def _same_sources(a: Optional[Dict], b: Optional[Dict]) -> bool:
+    if a is None or b is None:
+        return a is b
+    return a.get("sha256") == b.get("sha256") and a.get("snapshot") == b.get("snapshot")
+
+
+def _diff_job(args: Tuple) -> Dict[str, Any]:
+    return compute_diff(*args)
+
+
+def diff_countries(
+    countries: List[str],
+    old_dir: str = "data/companies_by_country_old",
+    new_dir: str = "data/companies_by_country",
+    report_dir: str = "reports",
+    workers: Optional[int] = None,
+    force: bool = False,
+    top_n: int = DIFF_TOP_MOVERS,
+    fields: Tuple[str, ...] = DIFF_FIELDS,
+    revenue_threshold: float = DIFF_REVENUE_THRESHOLD,
+    engine: str = DIFF_ENGINE,
+    columns: Optional[Sequence[str]] = DIFF_COLUMNS,
+) -> Dict[str, Any]:
+    """
+    Diff de varios países repartidos en un pool de procesos.
+    - Los países cuyas fuentes old/new no cambiaron (tamaño/mtime o, si
+      no, sha256; o los mismos snapshots del Store) desde el último
+      informe, con los mismos parámetros, se saltan y reutilizan su resumen.
+    - Escribe reports/summary.json con el total global, los recuentos por
+      país y sub_industry y los mayores cambios de revenue.
+    """
+    state_path = os.path.join(report_dir, DIFF_STATE_FILE)
+    state = load_json(state_path, {})
+    params = {"fields": list(fields), "revenue_threshold": revenue_threshold, "top_n": top_n}
+    if columns is not None:
+        params["columns"] = list(columns)
+    sources, todo, skipped = {}, [], []
+    for country in countries:
+        prev = state.get(country, {})
+        pair = _store_snapshots(country) if engine in ("auto", "store") else None
+        if pair is not None:
+            cur = {"old": {"snapshot": pair[0]}, "new": {"snapshot": pair[1]}}
+        else:
+            cur = {
+                side: _file_state(_source_path(country, d), prev.get(side))
+                for side, d in (("old", old_dir), ("new", new_dir))
+            }
+        sources[country] = cur
+        report_exists = os.path.exists(os.path.join(report_dir, f"{country}_changes.json"))
+        if (
+            not force
+            and report_exists
+            and "summary" in prev
+            and prev.get("params") == params
+            and _same_sources(cur["old"], prev.get("old"))
+            and _same_sources(cur["new"], prev.get("new"))
+        ):
+            skipped.append(country)
+        else:
+            todo.append(country)
+
+    summaries: Dict[str, Dict] = {c: state[c]["summary"] for c in skipped}
+    if todo:
+        jobs = [
+            (
+                c, old_dir, new_dir, report_dir, top_n, tuple(fields),
+                revenue_threshold, engine, columns,
+            )
+            for c in todo
+        ]
+        if workers == 1 or len(todo) == 1:
+            results = map(_diff_job, jobs)
+            for country, res in zip(todo, results):
+                summaries[country] = res
+        else:
+            with process_pool(workers) as pool:
+                for country, res in zip(todo, pool.map(_diff_job, jobs)):
+                    summaries[country] = res
+    for country in countries:
+        state[country] = {**sources[country], "params": params, "summary": summaries[country]}
+    save_json_atomic(state_path, state)
+
+    per_country = {c: summaries[c] for c in countries}
+    totals = {k: sum(s[k] for s in per_country.values()) for k in ("added", "removed", "updated")}
+    movers = heapq.nlargest(
+        top_n,
+        (m for s in per_country.values() for m in s["top_movers"]),
+        key=lambda m: abs(m["delta"]),
+    )
+    summary = {
+        "countries": len(countries),
+        "diffed": todo,
+        "skipped": skipped,
+        "totals": totals,
+        "by_country": {
+            c: {
+                "added": s["added"],
+                "removed": s["removed"],
+                "updated": s["updated"],
+                "by_sub_industry": s["by_sub_industry"],
+            }
+            for c, s in per_country.items()
+        },
+        "top_movers": movers,
+    }
+    save_json_atomic(os.path.join(report_dir, DIFF_SUMMARY_FILE), summary)
+    logger.info(
+        f"[diff] {len(todo)} países comparados, {len(skipped)} sin cambios en las fuentes; "
+        f"totales {totals}"
+    )
+    return summary
@@ -1,4 +1,5 @@
 import logging
+from functools import lru_cache
 from fake_useragent import UserAgent
 import chromedriver_autoinstaller
 from selenium import webdriver
@@ -7,18 +8,40 @@ from selenium.webdriver.chrome.options import Options
 from selenium_stealth import stealth
 
 BASE_URL = "https://www.dnb.com"
+# cabeceras comunes a navegador y cliente HTTP
+DEFAULT_HEADERS = {
+    "Accept-Language": "en-US,en;q=0.9",
+    "Referer": BASE_URL,
+}
 
 logger = logging.getLogger(__name__)
 
 
-def init_driver(proxy=None, headless=False):
+@lru_cache(maxsize=None)
+def _chromedriver_path() -> str:
+    """Instala (una sola vez por proceso) el chromedriver y devuelve su ruta."""
+    return chromedriver_autoinstaller.install()
+
+
+@lru_cache(maxsize=None)
+def _user_agents() -> UserAgent:
+    """Generador de user-agents compartido; construirlo es costoso."""
+    return UserAgent()
+
+
+def random_user_agent() -> str:
+    """Devuelve un user-agent aleatorio."""
+    return _user_agents().random
+
+
+def init_driver(proxy=None, headless=False, user_agent=None):
     """
     Inicializa un webDriver con configuración anti-bot, proxy opcional
-    y user-agent aleatorio.
+    y user-agent (aleatorio si no se indica).
     """
-    chromedir = chromedriver_autoinstaller.install()
+    chromedir = _chromedriver_path()
 
-    ua = UserAgent().random
+    ua = user_agent or random_user_agent()
     logger.debug(f"User-Agent: {ua}")
 
     opts = Options()
@@ -49,12 +72,7 @@ def init_driver(proxy=None, headless=False):
     driver.execute_cdp_cmd("Network.enable", {})
     driver.execute_cdp_cmd(
         "Network.setExtraHTTPHeaders",
-        {
-            "headers": {
-                "Accept-Language": "en-US,en;q=0.9",
-                "Referer": BASE_URL,
-            }
-        },
+        {"headers": dict(DEFAULT_HEADERS)},
     )
 
     stealth(
@@ -0,0 +1,170 @@
+import time
+import random
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from .config import POOL_MAX_PAGES_PER_SESSION, POOL_MAX_SESSION_AGE
+from .driver_factory import init_driver, random_user_agent
+from .metrics import timed
+from .proxies import ProxyManager
+
+logger = logging.getLogger(__name__)
+
+
+class PooledSession:
+    """
+    Sesión de WebDriver reutilizable, ligada a un único proxy y user-agent
+    durante toda su vida.
+    """
+
+    def __init__(self, sid: int, driver, proxy: Optional[str], user_agent: str):
+        self.id = sid
+        self.driver = driver
+        self.proxy = proxy
+        self.user_agent = user_agent
+        self.created_at = time.monotonic()
+        self.uses = 0
+        self.blocked = False
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.created_at
+
+    def mark_blocked(self) -> None:
+        """Marca la sesión para reciclarla al devolverla al pool."""
+        self.blocked = True
+
+
+class DriverPool:
+    """
+    Pool de sesiones de navegador calientes.
+    Cada sesión se recicla tras `max_pages` páginas, tras un bloqueo
+    o cuando supera `max_age` segundos. Con `health` las sesiones nuevas
+    usan proxies elegidos por puntuación y fuera de cuarentena.
+    """
+
+    def __init__(
+        self,
+        proxies: Optional[List[str]] = None,
+        headless: bool = False,
+        max_pages: int = POOL_MAX_PAGES_PER_SESSION,
+        max_age: float = POOL_MAX_SESSION_AGE,
+        factory: Callable = init_driver,
+        health: Optional[ProxyManager] = None,
+    ):
+        self.proxies = list(proxies or [])
+        self.health = health
+        self.headless = headless
+        self.max_pages = max_pages
+        self.max_age = max_age
+        self._factory = factory
+        self._idle: List[PooledSession] = []
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._stats: Dict[int, Dict] = {}
+
+    def _pick_proxy(self) -> Optional[str]:
+        if self.health is not None:
+            return self.health.pick(self.proxies)
+        return random.choice(self.proxies) if self.proxies else None
+
+    def _new_session(self) -> PooledSession:
+        proxy = self._pick_proxy()
+        ua = random_user_agent()
+        with timed("driver_start"):
+            driver = self._factory(proxy, headless=self.headless, user_agent=ua)
+        with self._lock:
+            sid = self._next_id
+            self._next_id += 1
+            self._stats[sid] = {
+                "proxy": proxy,
+                "user_agent": ua,
+                "uses": 0,
+                "closed": None,
+            }
+        logger.debug(f"[pool] nueva sesión #{sid} (proxy={proxy})")
+        return PooledSession(sid, driver, proxy, ua)
+
+    def _expired(self, s: PooledSession) -> Optional[str]:
+        if s.blocked:
+            return "blocked"
+        if s.uses >= self.max_pages:
+            return "max_pages"
+        if s.age >= self.max_age:
+            return "max_age"
+        return None
+
+    def _close(self, s: PooledSession, reason: str) -> None:
+        with self._lock:
+            self._stats[s.id]["closed"] = reason
+        logger.debug(f"[pool] cierro sesión #{s.id} tras {s.uses} usos ({reason})")
+        try:
+            s.driver.quit()
+        except Exception as e:
+            logger.debug(f"[pool] error cerrando sesión #{s.id}: {e}")
+
+    def acquire(self) -> PooledSession:
+        """Entrega una sesión ociosa válida o crea una nueva."""
+        while True:
+            with self._lock:
+                s = self._idle.pop() if self._idle else None
+            if s is None:
+                return self._new_session()
+            reason = self._expired(s)
+            if reason is None:
+                return s
+            self._close(s, reason)
+
+    def release(self, s: PooledSession) -> None:
+        """Devuelve una sesión al pool, reciclándola si ya no es válida."""
+        s.uses += 1
+        with self._lock:
+            self._stats[s.id]["uses"] = s.uses
+        reason = self._expired(s)
+        if reason:
+            self._close(s, reason)
+            return
+        with self._lock:
+            self._idle.append(s)
+
+    @contextmanager
+    def session(self):
+        """
+        Context manager: entrega una sesión y la devuelve al salir.
+        Si el bloque lanza una excepción la sesión se recicla.
+        """
+        s = self.acquire()
+        try:
+            yield s
+        except BaseException:
+            s.mark_blocked()
+            raise
+        finally:
+            self.release(s)
+
+    def close(self) -> None:
+        """Cierra todas las sesiones ociosas."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for s in idle:
+            self._close(s, "pool_closed")
+        stats = self.stats()
+        if stats:
+            total = sum(st["uses"] for st in stats)
+            logger.info(
+                f"[pool] {len(stats)} sesiones, {total} páginas, "
+                f"{total / len(stats):.1f} páginas/sesión"
+            )
+
+    def stats(self) -> List[Dict]:
+        """Contadores de reutilización por sesión."""
+        with self._lock:
+            return [{"session": sid, **st} for sid, st in sorted(self._stats.items())]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
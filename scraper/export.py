@@ -0,0 +1,242 @@
+"""
+Exportación columnar de los resultados (requiere pyarrow, extra "parquet").
+Cada país se escribe como dataset Parquet particionado estilo hive:
+    PARQUET_DIR/country=<país>/sub_industry=<sub>/part-*.parquet
+Los lectores pueden pedir solo algunas columnas: el resto ni se lee de
+disco ni se decodifica.
+"""
+
+import os
+import json
+import shutil
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+from urllib.parse import quote
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from .config import OUTPUT_DIR_1, PARQUET_DIR, PARQUET_BATCH_SIZE, PARQUET_COMPRESSION
+from .store import get_store, process_pool, use_sqlite
+from .utils import chunked, iter_json_array, read_results_jsonl
+
+logger = logging.getLogger(__name__)
+
+# campos de un registro de empresa, en el orden en que los escribe el scraper
+RECORD_FIELDS = (
+    "page",
+    "sub_industry",
+    "link",
+    "company_name",
+    "company_link",
+    "location",
+    "revenue",
+)
+
+# pertenencias de la empresa a otras sub‑industrias
+MEMBERSHIP = pa.struct([("sub_industry", pa.string()), ("link", pa.string()), ("page", pa.int64())])
+
+SCHEMA = pa.schema(
+    [
+        ("country", pa.string()),
+        ("sub_industry", pa.string()),
+        ("seq", pa.int64()),  # posición en el snapshot original
+        ("page", pa.int64()),
+        ("link", pa.string()),
+        ("company_name", pa.string()),
+        ("company_link", pa.string()),
+        ("location", pa.list_(pa.string())),
+        ("revenue", pa.string()),
+        ("revenue_usd", pa.float64()),  # revenue ya convertido a número
+        ("memberships", pa.list_(MEMBERSHIP)),
+        ("extra", pa.string()),  # JSON con cualquier otro campo del registro
+    ]
+)
+
+_PARTITIONING = ds.partitioning(
+    pa.schema([("country", pa.string()), ("sub_industry", pa.string())]), flavor="hive"
+)
+_SUB_PARTITIONING = ds.partitioning(pa.schema([("sub_industry", pa.string())]), flavor="hive")
+_COLUMNS = set(SCHEMA.names)
+
+
+def country_dir(country: str, root: str = PARQUET_DIR) -> str:
+    """Directorio de la partición de un país (mismo escape que pyarrow)."""
+    return os.path.join(root, "country=" + quote(country, safe=""))
+
+
+def has_country(country: str, root: str = PARQUET_DIR) -> bool:
+    return os.path.isdir(country_dir(country, root))
+
+
+def source_records(country: str, src_dir: str = OUTPUT_DIR_1) -> Iterator[Dict[str, Any]]:
+    """
+    Registros de un país: el stream JSONL si es más reciente que el JSON
+    compactado (o este no existe), si no el array JSON. Con el backend
+    "sqlite", la tabla de empresas del Store.
+    """
+    if use_sqlite():
+        return get_store().iter_companies(country)
+    json_path = os.path.join(src_dir, f"{country}.json")
+    jsonl_path = os.path.join(src_dir, f"{country}.jsonl")
+    if os.path.exists(jsonl_path) and (
+        not os.path.exists(json_path) or os.path.getmtime(jsonl_path) >= os.path.getmtime(json_path)
+    ):
+        return read_results_jsonl(jsonl_path)
+    return iter_json_array(json_path)
+
+
+def _to_batch(country: str, records: List[Dict[str, Any]], start: int) -> pa.RecordBatch:
+    from .diff import parse_revenue
+
+    cols: Dict[str, list] = {name: [] for name in SCHEMA.names}
+    for i, rec in enumerate(records):
+        page = rec.get("page")
+        extra = {k: v for k, v in rec.items() if k not in RECORD_FIELDS and k != "memberships"}
+        if page is not None and not isinstance(page, int):
+            extra["page"] = page  # p. ej. la URL del listado en registros antiguos
+            page = None
+        cols["country"].append(country)
+        cols["sub_industry"].append(rec.get("sub_industry"))
+        cols["seq"].append(start + i)
+        cols["page"].append(page)
+        for f in ("link", "company_name", "company_link", "location", "revenue"):
+            cols[f].append(rec.get(f))
+        cols["revenue_usd"].append(parse_revenue(rec.get("revenue")))
+        cols["memberships"].append(rec.get("memberships"))
+        cols["extra"].append(json.dumps(extra, ensure_ascii=False) if extra else None)
+    return pa.RecordBatch.from_pydict(cols, schema=SCHEMA)
+
+
+def export_country(
+    country: str,
+    src_dir: str = OUTPUT_DIR_1,
+    root: str = PARQUET_DIR,
+    batch_size: int = PARQUET_BATCH_SIZE,
+) -> int:
+    """
+    Convierte los resultados de un país a Parquet en streaming (lotes de
+    `batch_size` registros). Se escribe en un directorio temporal y luego
+    reemplaza la partición anterior del país. Devuelve el número de registros.
+    """
+    staging = os.path.join(root, f".staging-{os.getpid()}-{quote(country, safe='')}")
+    shutil.rmtree(staging, ignore_errors=True)
+    n = 0
+
+    def batches():
+        nonlocal n
+        for chunk in chunked(source_records(country, src_dir), batch_size):
+            yield _to_batch(country, chunk, n)
+            n += len(chunk)
+
+    ds.write_dataset(
+        batches(),
+        staging,
+        schema=SCHEMA,
+        format="parquet",
+        partitioning=_PARTITIONING,
+        file_options=ds.ParquetFileFormat().make_write_options(compression=PARQUET_COMPRESSION),
+        existing_data_behavior="overwrite_or_ignore",
+        preserve_order=True,
+    )
+    target = country_dir(country, root)
+    shutil.rmtree(target, ignore_errors=True)
+    written = os.path.join(staging, os.path.basename(target))
+    if os.path.isdir(written):
+        os.replace(written, target)
+    shutil.rmtree(staging, ignore_errors=True)
+    logger.info(f"[{country}] {n} registros exportados a {target}")
+    return n
+
+
+def export_countries(
+    countries: List[str],
+    src_dir: str = OUTPUT_DIR_1,
+    root: str = PARQUET_DIR,
+    workers: int = 1,
+) -> Dict[str, int]:
+    """Exporta varios países; con workers>1, un proceso por país."""
+    if workers <= 1:
+        return {c: export_country(c, src_dir, root) for c in countries}
+    with process_pool(workers) as pool:
+        jobs = [pool.submit(export_country, c, src_dir, root) for c in countries]
+        return {c: job.result() for c, job in zip(countries, jobs)}
+
+
+def _physical(columns: Optional[Sequence[str]]) -> Optional[List[str]]:
+    """Columnas a leer para `columns` (campos de registro o columnas del esquema)."""
+    if columns is None:
+        return None
+    cols = [c for c in dict.fromkeys(columns) if c in _COLUMNS and c != "country"]
+    if any(c not in _COLUMNS for c in columns) or "page" in columns:
+        cols.append("extra")  # campos fuera del esquema o page no numérico
+    return cols
+
+
+def load_table(
+    country: str,
+    root: str = PARQUET_DIR,
+    columns: Optional[Sequence[str]] = None,
+) -> pa.Table:
+    """
+    Tabla Arrow de un país con solo `columns` (todas si es None), en el
+    orden del snapshot original. Pensada para análisis (pandas, polars…).
+    """
+    cols = _physical(columns)
+    dataset = ds.dataset(
+        country_dir(country, root), format="parquet", partitioning=_SUB_PARTITIONING
+    )
+    table = dataset.to_table(columns=None if cols is None else list(dict.fromkeys(cols + ["seq"])))
+    table = table.sort_by("seq")
+    if cols is not None:
+        table = table.select(cols)
+    if columns is None or "country" in columns:
+        table = table.append_column("country", pa.array([country] * table.num_rows, pa.string()))
+    return table
+
+
+def _restore(row: Dict[str, Any], columns: Optional[Sequence[str]]) -> Dict[str, Any]:
+    """Fila Arrow → registro como en el JSON de resultados."""
+    extra = row.pop("extra", None)
+    if columns is None:
+        rec = {f: row.get(f) for f in RECORD_FIELDS}
+        if row.get("memberships") is not None:
+            rec["memberships"] = row["memberships"]
+    else:
+        rec = {f: row.get(f) for f in columns if f in row}
+    if extra:
+        rec.update((k, v) for k, v in json.loads(extra).items() if columns is None or k in columns)
+    return rec
+
+
+def iter_records(
+    country: str,
+    root: str = PARQUET_DIR,
+    columns: Optional[Sequence[str]] = None,
+    batch_size: int = PARQUET_BATCH_SIZE,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Itera los registros de un país por lotes, leyendo solo `columns`.
+    Sin `columns` se reconstruye el registro completo. El orden es el de
+    cada partición de sub_industry (el original dentro de cada una).
+    """
+    cols = _physical(columns)
+    dataset = ds.dataset(
+        country_dir(country, root), format="parquet", partitioning=_SUB_PARTITIONING
+    )
+    with_country = columns is not None and "country" in columns
+    for batch in dataset.to_batches(columns=cols, batch_size=batch_size):
+        for row in batch.to_pylist():
+            if with_country:
+                row["country"] = country
+            yield _restore(row, columns)
+
+
+def load_records(
+    country: str,
+    root: str = PARQUET_DIR,
+    columns: Optional[Sequence[str]] = None,
+) -> List[Dict[str, Any]]:
+    """Registros de un país en el orden del snapshot original (ver load_table)."""
+    table = load_table(country, root, columns)
+    return [_restore(row, columns) for row in table.to_pylist()]
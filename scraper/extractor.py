@@ -1,12 +1,98 @@
 import re
-from typing import List, Tuple, Dict
-from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from enum import Enum
+from typing import Dict, List, Optional, Set, Tuple
+from selenium.common.exceptions import NoSuchElementException
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from bs4 import BeautifulSoup
 from lxml import etree
 from .driver_factory import BASE_URL
+from .metrics import inc, instrumented
+
+CHALLENGE_IFRAME_ID = "sec-cpt-if"
+NO_COMPANIES_CLASS = "candidatesMatchedQuantityIsNullOrZeroWrapper"
+CONNECTION_LOST_MARKERS = [
+    "connection lost",
+    "not found",
+    "404 error",
+    "http error 502",
+    "no found",
+    "no puede procesar",
+]
+
+
+class PageStatus(str, Enum):
+    """Clasificación de una página descargada."""
+
+    OK = "ok"
+    NO_COMPANIES = "no_companies"
+    CHALLENGE = "challenge"
+    DENIED = "denied"
+    ERROR_5XX = "5xx"
+    CONNECTION_LOST = "connection_lost"
+    HTTP_ERROR = "http_error"  # cualquier otro código no 2xx (p. ej. una redirección sin seguir)
+
+    @property
+    def blocked(self) -> bool:
+        return self not in (PageStatus.OK, PageStatus.NO_COMPANIES)
+
+
+# Marcas de atributo: se confirman con regex solo si aparece la subcadena.
+_NO_COMPANIES_RE = re.compile(
+    r"class\s*=\s*[\"'][^\"']*\b" + NO_COMPANIES_CLASS + r"\b"
+)
+_CHALLENGE_RE = re.compile(r"id\s*=\s*[\"']" + CHALLENGE_IFRAME_ID + r"[\"']")
+# orden de prioridad cuando aparecen varias marcas
+_STATUS_PRIORITY = [
+    PageStatus.NO_COMPANIES,
+    PageStatus.CHALLENGE,
+    PageStatus.DENIED,
+    PageStatus.ERROR_5XX,
+    PageStatus.CONNECTION_LOST,
+]
+
+
+def page_markers(html: str) -> Set[PageStatus]:
+    """
+    Conjunto de estados cuyas marcas aparecen en el HTML. Trabaja sobre una
+    única instantánea con búsquedas de subcadena (sin DOM ni esperas).
+    """
+    found: Set[PageStatus] = set()
+    if not html:
+        return found
+    if NO_COMPANIES_CLASS in html and _NO_COMPANIES_RE.search(html):
+        found.add(PageStatus.NO_COMPANIES)
+    if CHALLENGE_IFRAME_ID in html and _CHALLENGE_RE.search(html):
+        found.add(PageStatus.CHALLENGE)
+    text = html.lower()
+    if "access denied" in text:
+        found.add(PageStatus.DENIED)
+    if "500 error" in text:
+        found.add(PageStatus.ERROR_5XX)
+    if any(msg in text for msg in CONNECTION_LOST_MARKERS):
+        found.add(PageStatus.CONNECTION_LOST)
+    return found
+
+
+def classify_page(html: str, http_status: int = 200) -> PageStatus:
+    """
+    Clasifica una instantánea de HTML en un solo paso: ok, sin empresas,
+    challenge, acceso denegado, error 5xx o conexión perdida.
+    Sin marcas en el HTML, un código HTTP 5xx/403/429/404 decide el estado;
+    cualquier otro código no 2xx es un error, nunca una página ok.
+    """
+    found = page_markers(html)
+    for status in _STATUS_PRIORITY:
+        if status in found:
+            return status
+    if http_status >= 500:
+        return PageStatus.ERROR_5XX
+    if http_status in (403, 429):
+        return PageStatus.DENIED
+    if http_status == 404:
+        return PageStatus.CONNECTION_LOST
+    if not 200 <= http_status < 300:
+        return PageStatus.HTTP_ERROR
+    return PageStatus.OK
 
 
 def bypass_challenge(driver) -> bool:
@@ -18,60 +104,20 @@ def bypass_challenge(driver) -> bool:
         return False
 
 
-def is_error_500(driver, timeout: int = 3) -> bool:
-    """
-    Detecta página con Error HTTP 500 usando WebDriverWait, 
-    con fallback en page_source.
-    """
-    try:
-        WebDriverWait(driver, timeout).until(
-            EC.presence_of_element_located(
-                (
-                    By.XPATH,
-                    "//h2[contains(text(),'500 Error') or "
-                    "contains(text(),'500 error')]",
-                )
-            )
-        )
-        return True
-    except (TimeoutException, NoSuchElementException, Exception):
-        return "500 error" in driver.page_source.lower()
+def is_error_500(driver) -> bool:
+    """Detecta página con Error HTTP 500 a partir de page_source."""
+    return PageStatus.ERROR_5XX in page_markers(driver.page_source)
 
 
-def is_access_denied(driver, timeout: int = 3) -> bool:
-    """
-    Detecta página con mensaje de Access Denied usando WebDriverWait,
-    con fallback.
-    """
-    try:
-        WebDriverWait(driver, timeout).until(
-            EC.presence_of_element_located(
-                (
-                    By.XPATH,
-                    "//h1[contains(text(),'Access Denied') or "
-                    "contains(text(),'access denied')]",
-                )
-            )
-        )
-        return True
-    except (TimeoutException, NoSuchElementException, Exception):
-        return "access denied" in driver.page_source.lower()
+def is_access_denied(driver) -> bool:
+    """Detecta página con mensaje de Access Denied a partir de page_source."""
+    return PageStatus.DENIED in page_markers(driver.page_source)
 
 
 def is_connection_lost(driver) -> bool:
     """Detecta errores de conexión (404, 502, connection lost, etc.)."""
     text = driver.page_source.lower()
-    for msg in [
-        "connection lost",
-        "not found",
-        "404 error",
-        "http error 502",
-        "no found",
-        "no puede procesar",
-    ]:
-        if msg in text:
-            return True
-    return False
+    return any(msg in text for msg in CONNECTION_LOST_MARKERS)
 
 
 def is_no_companies_message(driver) -> bool:
@@ -86,6 +132,40 @@ def is_no_companies_message(driver) -> bool:
         return False
 
 
+def extract_verticals(html: str) -> List[str]:
+    """Extrae los enlaces de la paginación alfabética A→Z."""
+    root = etree.HTML(html) if html else None
+    if root is None:
+        return []
+    return root.xpath(
+        "//*[contains(concat(' ', normalize-space(@class), ' '), ' alpha-pagination ')]"
+        "//a[@href]/@href"
+    )
+
+
+# solo el contador de resultados (clase exacta; no su variante "IsNullOrZeroWrapper")
+_TOTAL_COUNT = etree.XPath(
+    "//*[contains(concat(' ', normalize-space(@class), ' '), ' candidatesMatchedQuantity ')]"
+    "//text()"
+)
+_NUMBER_RE = re.compile(r"\d[\d,.]*")
+
+
+def extract_total_count(html: str) -> Optional[int]:
+    """
+    Número total de empresas de la vertical según el contador de resultados
+    (elemento candidatesMatchedQuantity); None si la página no lo muestra.
+    """
+    root = _parse_html(html)
+    if root is None:
+        return None
+    match = _NUMBER_RE.search(" ".join(_TOTAL_COUNT(root)))
+    if match is None:
+        return None
+    digits = re.sub(r"\D", "", match.group())
+    return int(digits) if digits else None
+
+
 def extract_subindustries(html: str) -> List[Tuple[str, str]]:
     """
     Extrae enlaces de subindustrias a partir de HTML.
@@ -118,6 +198,25 @@ def extract_subindustries(html: str) -> List[Tuple[str, str]]:
     return out
 
 
+# Selectores precompilados del listado de empresas
+_COMPANY_BLOCKS = etree.XPath("//div[contains(normalize-space(@class), 'col-md-12 data')]")
+_COMPANY_NAME = etree.XPath('.//div[@class="col-md-6"]/a')
+_COMPANY_LOCATION = etree.XPath('.//div[@class="col-md-4"]/text()')
+_COMPANY_REVENUE = etree.XPath('.//div[@class="col-md-2 last"]/text()')
+
+
+def _parse_html(html: str):
+    """Parsea el documento completo con lxml (None si está vacío)."""
+    if not html:
+        return None
+    try:
+        return etree.HTML(html)
+    except ValueError:
+        # str con declaración de encoding: lxml exige bytes
+        return etree.HTML(html.encode("utf-8"))
+
+
+@instrumented("parse")
 def extract_companies_detailed(
     html: str, sub_industry: str
 ) -> List[Dict[str, str]]:
@@ -125,20 +224,23 @@ def extract_companies_detailed(
     Extrae datos detallados de empresas de una página de resultados.
     Cada dict contiene company_name, company_link, location,
     revenue, sub_industry.
+    El documento se parsea una sola vez con lxml y los bloques se
+    consultan con XPath precompilados.
     """
-    soup = BeautifulSoup(html, "html.parser")
+    root = _parse_html(html)
+    if root is None:
+        return []
     data: List[Dict] = []
-    for blk in soup.find_all("div", class_=re.compile(r"col-md-12 data")):
+    for blk in _COMPANY_BLOCKS(root):
         try:
-            root = etree.HTML(str(blk))
-            name_el = root.xpath('.//div[@class="col-md-6"]/a')
+            name_el = _COMPANY_NAME(blk)
             comp = name_el[0].text.strip() if name_el else "N/A"
             href = name_el[0].get("href") if name_el else ""
             locs = [
                 text.strip().replace("\xa0", " ")
-                for text in root.xpath('.//div[@class="col-md-4"]/text()')
+                for text in _COMPANY_LOCATION(blk)
             ]
-            rev_el = root.xpath('.//div[@class="col-md-2 last"]/text()') or []
+            rev_el = _COMPANY_REVENUE(blk)
             rev = rev_el[-1].strip() if rev_el else "N/A"
             data.append(
                 {
@@ -151,4 +253,6 @@ def extract_companies_detailed(
             )
         except Exception:
             continue
+    inc("companies_total", len(data))
     return data
+
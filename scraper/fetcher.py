@@ -0,0 +1,310 @@
+import re
+import time
+import random
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import urllib3
+
+from .config import FETCH_BACKEND, HTTP_TIMEOUT, HTTP_POOL_MAXSIZE
+from .driver_factory import DEFAULT_HEADERS, random_user_agent
+from .driver_pool import DriverPool
+from .extractor import PageStatus, classify_page
+from .metrics import inc, timed
+from .proxies import ProxyManager
+from .ratelimit import AdaptiveScheduler
+
+logger = logging.getLogger(__name__)
+
+
+_CHARSET_RE = re.compile(r"charset=([\w-]+)", re.I)
+
+
+def _charset(content_type: str) -> str:
+    m = _CHARSET_RE.search(content_type or "")
+    return m.group(1) if m else "utf-8"
+
+
+class FetchResult:
+    """Resultado de descargar una URL: HTML, código HTTP y backend usado."""
+
+    def __init__(
+        self,
+        url: str,
+        html: str,
+        status: int = 200,
+        backend: str = "",
+        proxy: Optional[str] = None,
+    ):
+        self.url = url
+        self.html = html
+        self.status = status
+        self.backend = backend
+        self.proxy = proxy
+        self.elapsed = 0.0  # segundos de la descarga (lo anota _polite_fetch)
+        self._page_status: Optional[PageStatus] = None
+
+    @property
+    def page_status(self) -> PageStatus:
+        """Clasificación de la página (se calcula una sola vez)."""
+        if self._page_status is None:
+            with timed("classify"):
+                self._page_status = classify_page(self.html, self.status)
+        return self._page_status
+
+    def __repr__(self):
+        return f"FetchResult({self.url!r}, status={self.status}, backend={self.backend!r})"
+
+
+def _count(proxy: Optional[str], status: PageStatus) -> None:
+    inc("pages_total", status=status.value)
+    if status.blocked:
+        # quien llama reintenta toda descarga bloqueada o caída
+        inc("blocks_total", type=status.value)
+        inc("retries_total", proxy=proxy or "direct")
+
+
+def _report(
+    scheduler: Optional[AdaptiveScheduler],
+    health: Optional[ProxyManager],
+    proxy: Optional[str],
+    url: str,
+    status: PageStatus,
+    elapsed: Optional[float] = None,
+) -> None:
+    """Resultado de una descarga: al scheduler, a la salud de proxies y a las métricas."""
+    _count(proxy, status)
+    if scheduler is not None:
+        scheduler.record(proxy, url, status)
+    if health is not None:
+        health.record(proxy, status, elapsed)
+
+
+def _polite_fetch(
+    scheduler: Optional[AdaptiveScheduler],
+    proxy: Optional[str],
+    url: str,
+    get,
+    health: Optional[ProxyManager] = None,
+    report: bool = True,
+):
+    """
+    Ejecuta `get()` respetando el turno de (proxy, host) en `scheduler` e
+    informa de la clasificación de la página (o de la caída de conexión).
+    Con report=False la página no se anota: lo hará quien llama cuando
+    sepa el resultado final (ver FallbackFetcher).
+    """
+    if scheduler is not None:
+        with timed("sleep"):
+            scheduler.wait(proxy, url)
+    t0 = time.monotonic()
+    try:
+        res = get()
+    except Exception:
+        _report(scheduler, health, proxy, url, PageStatus.CONNECTION_LOST)
+        raise
+    res.elapsed = time.monotonic() - t0
+    if report:
+        _report(scheduler, health, proxy, url, res.page_status, res.elapsed)
+    return res
+
+
+class HttpFetcher:
+    """
+    Backend HTTP ligero: conexiones keep-alive reutilizadas (urllib3),
+    un pool de conexiones por proxy y las mismas cabeceras que el navegador.
+    Con un `scheduler` cada petición espera su turno de cortesía y con
+    `health` los proxies se eligen por puntuación, saltando los que están
+    en cuarentena.
+    """
+
+    backend = "http"
+
+    def __init__(
+        self,
+        proxies: Optional[List[str]] = None,
+        timeout: float = HTTP_TIMEOUT,
+        user_agent: Optional[str] = None,
+        maxsize: int = HTTP_POOL_MAXSIZE,
+        scheduler: Optional[AdaptiveScheduler] = None,
+        health: Optional[ProxyManager] = None,
+    ):
+        self.proxies = list(proxies or [])
+        self.scheduler = scheduler
+        self.health = health
+        self.timeout = timeout
+        self.maxsize = maxsize
+        self.headers = {
+            **DEFAULT_HEADERS,
+            "User-Agent": user_agent or random_user_agent(),
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        }
+        self._managers: Dict[Optional[str], urllib3.PoolManager] = {}
+        self._lock = threading.Lock()
+
+    def _manager(self, proxy: Optional[str]) -> urllib3.PoolManager:
+        with self._lock:
+            mgr = self._managers.get(proxy)
+            if mgr is None:
+                kw = dict(
+                    headers=self.headers,
+                    maxsize=self.maxsize,
+                    timeout=urllib3.Timeout(total=self.timeout),
+                    # sin reintentos (los hace la cola) pero siguiendo redirecciones
+                    retries=urllib3.Retry(
+                        total=None, connect=0, read=0, status=0, other=0, redirect=5
+                    ),
+                )
+                if proxy:
+                    mgr = urllib3.ProxyManager(f"http://{proxy}", **kw)
+                else:
+                    mgr = urllib3.PoolManager(**kw)
+                self._managers[proxy] = mgr
+            return mgr
+
+    def fetch(self, url: str, proxy: Optional[str] = None, report: bool = True) -> FetchResult:
+        if proxy is None and self.proxies:
+            if self.health is not None:
+                proxy = self.health.pick(self.proxies)
+            else:
+                proxy = random.choice(self.proxies)
+        return _polite_fetch(
+            self.scheduler, proxy, url, lambda: self._get(url, proxy), self.health, report
+        )
+
+    def report(self, res: FetchResult) -> None:
+        """Anota una descarga hecha con report=False."""
+        _report(self.scheduler, self.health, res.proxy, res.url, res.page_status, res.elapsed)
+
+    def _get(self, url: str, proxy: Optional[str]) -> FetchResult:
+        with timed("page_load", backend=self.backend):
+            resp = self._manager(proxy).request("GET", url)
+            html = resp.data.decode(
+                _charset(resp.headers.get("Content-Type", "")), errors="replace"
+            )
+        return FetchResult(url, html, resp.status, self.backend, proxy)
+
+    def close(self) -> None:
+        with self._lock:
+            managers, self._managers = self._managers, {}
+        for mgr in managers.values():
+            mgr.clear()
+        if self.health is not None:
+            self.health.save()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BrowserFetcher:
+    """Backend Selenium sobre un DriverPool de sesiones calientes."""
+
+    backend = "browser"
+
+    def __init__(self, pool: DriverPool, scheduler: Optional[AdaptiveScheduler] = None):
+        self.pool = pool
+        self.scheduler = scheduler
+
+    def fetch(self, url: str) -> FetchResult:
+        with self.pool.session() as s:
+            res = _polite_fetch(
+                self.scheduler, s.proxy, url, lambda: self._get(s, url), self.pool.health
+            )
+            if res.page_status.blocked:
+                s.mark_blocked()
+        return res
+
+    def _get(self, s, url: str) -> FetchResult:
+        # driver.get vuelve tras el evento load: la espera la marca el scheduler
+        with timed("page_load", backend=self.backend):
+            s.driver.get(url)
+            html = s.driver.page_source
+        return FetchResult(url, html, 200, self.backend, s.proxy)
+
+    def close(self) -> None:
+        self.pool.close()
+        if self.pool.health is not None:
+            self.pool.health.save()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FallbackFetcher:
+    """
+    Descarga con `primary` (HTTP) y solo recurre a `fallback` (navegador)
+    cuando la respuesta trae marcas de challenge/Access Denied o un 403/429.
+    Solo se anota el resultado final: un challenge HTTP que resuelve el
+    navegador no frena el scheduler ni penaliza el proxy.
+    """
+
+    def __init__(self, primary, fallback):
+        self.primary = primary
+        self.fallback = fallback
+        self.fallbacks = 0
+
+    @property
+    def scheduler(self) -> Optional[AdaptiveScheduler]:
+        return self.primary.scheduler
+
+    @property
+    def backend(self) -> str:
+        return f"{self.primary.backend}+{self.fallback.backend}"
+
+    def fetch(self, url: str) -> FetchResult:
+        # los errores de red se propagan: los reintenta el llamador
+        res = self.primary.fetch(url, report=False)
+        if res.page_status not in (PageStatus.CHALLENGE, PageStatus.DENIED):
+            self.primary.report(res)
+            return res
+        logger.debug(f"[fetch] {res.page_status.value} en {url}, uso {self.fallback.backend}")
+        self.fallbacks += 1
+        inc("fallbacks_total", type=res.page_status.value)
+        return self.fallback.fetch(url)
+
+    def close(self) -> None:
+        self.primary.close()
+        self.fallback.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def make_fetcher(
+    proxies: Optional[List[str]] = None,
+    backend: str = FETCH_BACKEND,
+    headless: bool = False,
+    scheduler: Optional[AdaptiveScheduler] = None,
+    health: Optional[ProxyManager] = None,
+):
+    """
+    Construye el backend de descarga:
+      - "http": solo cliente HTTP
+      - "browser": solo Selenium (DriverPool)
+      - "auto": HTTP con fallback a Selenium ante challenge
+    Todos los backends comparten `scheduler` y `health` (se crean si no se
+    pasan), así que la cortesía y la salud de proxies son comunes a HTTP y
+    navegador.
+    """
+    scheduler = scheduler or AdaptiveScheduler()
+    health = health or ProxyManager()
+    if backend == "http":
+        return HttpFetcher(proxies, scheduler=scheduler, health=health)
+    if backend == "browser":
+        return BrowserFetcher(DriverPool(proxies, headless=headless, health=health), scheduler)
+    if backend == "auto":
+        return FallbackFetcher(
+            HttpFetcher(proxies, scheduler=scheduler, health=health),
+            BrowserFetcher(DriverPool(proxies, headless=headless, health=health), scheduler),
+        )
+    raise ValueError(f"Backend de descarga desconocido: {backend}")
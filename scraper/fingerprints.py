@@ -0,0 +1,77 @@
+import os
+import json
+import hashlib
+import threading
+from typing import Dict, List, Optional
+
+from .config import FINGERPRINT_DIR
+from .utils import load_json, save_json_atomic
+
+
+def content_hash(comps: List[Dict]) -> str:
+    """Hash de las empresas extraídas de una página (en su orden)."""
+    body = json.dumps(
+        [
+            [c.get("company_link"), c.get("company_name"), c.get("location"), c.get("revenue")]
+            for c in comps
+        ],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.blake2b(body.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class PageFingerprints:
+    """
+    Huella de cada página listada de un país, para el refresco incremental:
+    {base_link: {vertical: {página: {"links": [...], "hash": ...}}}}.
+    "links" es la firma (company_links de la página, como first_sig) y
+    "hash" el de su contenido extraído. Se guarda en FINGERPRINT_DIR/{país}.json.
+    """
+
+    def __init__(self, country: str, root: str = FINGERPRINT_DIR):
+        self.path = os.path.join(root, f"{country}.json")
+        self.data: Dict[str, Dict[str, Dict[str, Dict]]] = load_json(self.path, {})
+        self.lock = threading.Lock()
+        self._dirty = False
+
+    def verticals(self, base_link: str) -> List[str]:
+        return list(self.data.get(base_link, {}))
+
+    def pages(self, base_link: str, vertical: str) -> Dict[int, Dict]:
+        """Huellas conocidas de una vertical, por número de página."""
+        pages = self.data.get(base_link, {}).get(vertical, {})
+        return {int(p): fp for p, fp in pages.items()}
+
+    def get(self, base_link: str, vertical: str, page: int) -> Optional[Dict]:
+        return self.data.get(base_link, {}).get(vertical, {}).get(str(page))
+
+    def put(self, base_link: str, vertical: str, page: int, comps: List[Dict]) -> Dict:
+        fp = {"links": [c["company_link"] for c in comps], "hash": content_hash(comps)}
+        with self.lock:
+            self.data.setdefault(base_link, {}).setdefault(vertical, {})[str(page)] = fp
+            self._dirty = True
+        return fp
+
+    def truncate(self, base_link: str, vertical: str, last_page: int) -> None:
+        """Olvida las páginas posteriores a `last_page` (la vertical encogió)."""
+        with self.lock:
+            pages = self.data.get(base_link, {}).get(vertical, {})
+            for p in [p for p in pages if int(p) > last_page]:
+                del pages[p]
+                self._dirty = True
+
+    @staticmethod
+    def matches(fp: Optional[Dict], comps: List[Dict]) -> bool:
+        """¿La página trae las mismas empresas con el mismo contenido?"""
+        return (
+            fp is not None
+            and fp["links"] == [c["company_link"] for c in comps]
+            and fp["hash"] == content_hash(comps)
+        )
+
+    def save(self) -> None:
+        with self.lock:
+            if self._dirty:
+                save_json_atomic(self.path, self.data)
+                self._dirty = False
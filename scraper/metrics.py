@@ -0,0 +1,330 @@
+"""
+Métricas del scraping: histogramas de tiempo por fase, contadores y una
+línea periódica de throughput, exportables como textfile de Prometheus
+(METRICS_DIR/{nombre}.prom, para el textfile collector de node_exporter)
+o como snapshot JSON.
+Fases instrumentadas (histograma scrape_phase_seconds{phase}):
+  - driver_start: arranque de un navegador (init_driver, en el DriverPool)
+  - page_load: descarga de una URL (drv.get o GET HTTP), etiquetada por backend
+  - sleep: espera de cortesía del scheduler antes de cada descarga
+  - classify: detección de bloqueos y páginas sin empresas
+  - parse: extract_companies_detailed
+  - persist: registro de resultados y escritura del checkpoint
+Contadores: páginas por estado, empresas extraídas, bloqueos por tipo y
+reintentos por proxy (cada descarga bloqueada o caída se reintenta).
+Cada proceso tiene su propio registro (get_metrics()).
+"""
+
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, Optional, Sequence, Tuple
+
+from .config import METRICS_BUCKETS, METRICS_DIR, METRICS_ENABLED, METRICS_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "dnb_"
+PHASE = "scrape_phase_seconds"
+_HELP = {
+    PHASE: "Tiempo por fase del scraping",
+    "pages_total": "Páginas descargadas por estado",
+    "companies_total": "Empresas extraídas",
+    "blocks_total": "Páginas bloqueadas por tipo",
+    "retries_total": "Descargas fallidas (y reintentadas) por proxy",
+    "fallbacks_total": "Challenges HTTP pasados al navegador, por tipo",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, object]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(labels: Labels, extra: Labels = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs
+    )
+    return "{" + body + "}"
+
+
+class Histogram:
+    """Histograma de cubetas fijas (acumulativas al exportar), con suma y cuenta."""
+
+    def __init__(self, buckets: Sequence[float] = METRICS_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # la última es +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """[(le, observaciones <= le)], terminando en +Inf."""
+        out, acc = [], 0
+        for le, n in zip(self.buckets + (float("inf"),), self.counts):
+            acc += n
+            out.append((le, acc))
+        return out
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "buckets": {
+                ("+Inf" if le == float("inf") else f"{le:g}"): n for le, n in self.cumulative()
+            },
+        }
+
+
+class Metrics:
+    """
+    Registro de contadores e histogramas con etiquetas, seguro entre hilos.
+    Con enabled=False las operaciones no hacen nada.
+    """
+
+    def __init__(self, enabled: bool = METRICS_ENABLED, buckets: Sequence[float] = METRICS_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        if not self.enabled:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        if not self.enabled:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram(self.buckets)
+            hist.observe(value)
+
+    @contextmanager
+    def timed(self, phase: str, **labels):
+        """Mide el bloque en scrape_phase_seconds{phase} (también si lanza)."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(PHASE, time.perf_counter() - t0, phase=phase, **labels)
+
+    def counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get((name, _labels(labels)), 0)
+
+    def total(self, name: str) -> float:
+        """Suma de un contador sobre todas sus etiquetas."""
+        with self._lock:
+            return sum(v for (n, _), v in self._counters.items() if n == name)
+
+    def by_label(self, name: str, label: str) -> Dict[str, float]:
+        """Un contador desglosado por una etiqueta: {valor: total}."""
+        out: Dict[str, float] = {}
+        with self._lock:
+            for (n, labels), v in self._counters.items():
+                if n == name:
+                    key = dict(labels).get(label, "")
+                    out[key] = out.get(key, 0) + v
+        return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self.started_at = time.time()
+
+    # ── exportación ───────────────────────────────────────────────────────
+    def snapshot(self) -> Dict:
+        """{"counters": {nombre: [{labels, value}]}, "histograms": {...}}"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda kv: kv[0])
+            out: Dict = {"started_at": self.started_at, "counters": {}, "histograms": {}}
+            for (name, labels), v in counters:
+                out["counters"].setdefault(name, []).append({"labels": dict(labels), "value": v})
+            for (name, labels), hist in histograms:
+                out["histograms"].setdefault(name, []).append(
+                    {"labels": dict(labels), **hist.to_dict()}
+                )
+        out["taken_at"] = time.time()
+        return out
+
+    def to_prometheus(self) -> str:
+        """Formato de texto de exposición de Prometheus (0.0.4)."""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                ((k, h.cumulative(), h.sum, h.count) for k, h in self._histograms.items()),
+                key=lambda x: x[0],
+            )
+        seen = set()
+        for (name, labels), v in counters:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {PREFIX}{name} {_HELP.get(name, name)}")
+                lines.append(f"# TYPE {PREFIX}{name} counter")
+            lines.append(f"{PREFIX}{name}{_fmt_labels(labels)} {v:g}")
+        for (name, labels), cumulative, total, count in histograms:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {PREFIX}{name} {_HELP.get(name, name)}")
+                lines.append(f"# TYPE {PREFIX}{name} histogram")
+            for le, n in cumulative:
+                le_s = "+Inf" if le == float("inf") else f"{le:g}"
+                lines.append(f"{PREFIX}{name}_bucket{_fmt_labels(labels, (('le', le_s),))} {n}")
+            lines.append(f"{PREFIX}{name}_sum{_fmt_labels(labels)} {total:.6f}")
+            lines.append(f"{PREFIX}{name}_count{_fmt_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, name: str, directory: str = METRICS_DIR) -> Tuple[str, str]:
+        """Escribe {directory}/{name}.prom y .json de forma atómica; devuelve las rutas."""
+        os.makedirs(directory, exist_ok=True)
+        prom = os.path.join(directory, f"{name}.prom")
+        js = os.path.join(directory, f"{name}.json")
+        _write_atomic(prom, self.to_prometheus())
+        _write_atomic(js, json.dumps(self.snapshot(), indent=2, ensure_ascii=False))
+        return prom, js
+
+
+def _write_atomic(path: str, text: str) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+_METRICS = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """Registro de métricas del proceso."""
+    return _METRICS
+
+
+def inc(name: str, value: float = 1, **labels) -> None:
+    _METRICS.inc(name, value, **labels)
+
+
+def timed(phase: str, **labels):
+    """get_metrics().timed(phase): `with timed("parse"): ...`"""
+    return _METRICS.timed(phase, **labels)
+
+
+def instrumented(phase: str):
+    """Decorador: mide cada llamada a la función en la fase `phase`."""
+
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _METRICS.timed(phase):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return deco
+
+
+class ThroughputReporter:
+    """
+    Hilo que cada `interval` segundos registra una línea de throughput
+    (páginas y empresas por minuto, bloqueos y reintentos del intervalo y
+    tiempo medio por fase) y exporta las métricas a METRICS_DIR/{name}.*
+    """
+
+    def __init__(
+        self,
+        name: str,
+        interval: float = METRICS_INTERVAL,
+        metrics: Optional[Metrics] = None,
+        directory: str = METRICS_DIR,
+    ):
+        self.name = name
+        self.interval = interval
+        self.metrics = metrics or _METRICS
+        self.directory = directory
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last = self._totals()
+        self._last_at = time.monotonic()
+
+    def _totals(self) -> Dict[str, float]:
+        m = self.metrics
+        return {
+            "pages": m.total("pages_total"),
+            "companies": m.total("companies_total"),
+            "blocks": m.total("blocks_total"),
+            "retries": m.total("retries_total"),
+        }
+
+    def line(self) -> str:
+        """Throughput desde la línea anterior (y la avanza)."""
+        now, totals = time.monotonic(), self._totals()
+        minutes = max(now - self._last_at, 1e-9) / 60
+        delta = {k: totals[k] - self._last.get(k, 0) for k in totals}
+        self._last, self._last_at = totals, now
+        phases: Dict[str, list] = {}
+        for h in self.metrics.snapshot()["histograms"].get(PHASE, []):
+            acc = phases.setdefault(h["labels"].get("phase", ""), [0.0, 0])
+            acc[0] += h["sum"]
+            acc[1] += h["count"]
+        means = " ".join(f"{p}={s / n * 1000:.0f}ms" for p, (s, n) in sorted(phases.items()) if n)
+        return (
+            f"[metrics] {delta['pages'] / minutes:.1f} páginas/min, "
+            f"{delta['companies'] / minutes:.1f} empresas/min, "
+            f"{delta['blocks']:g} bloqueos, {delta['retries']:g} reintentos "
+            f"(total {totals['pages']:g} páginas) | {means}"
+        )
+
+    def tick(self) -> None:
+        logger.info(self.line())
+        try:
+            self.metrics.export(self.name, self.directory)
+        except OSError as e:
+            logger.warning(f"[metrics] no se pudieron exportar: {e}")
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.tick()
+
+    def start(self) -> "ThroughputReporter":
+        if self.metrics.enabled:
+            self._thread = threading.Thread(target=self._run, name="metrics", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Detiene el hilo y hace una última exportación."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            self.tick()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,115 @@
+"""
+Estimación del número de páginas de una vertical antes de recorrerla.
+1. Si la página 1 muestra el total de empresas, end_page = ceil(total /
+   empresas por página), sin descargas extra. Un total menor que las
+   empresas de la propia página 1 no es fiable: se sondea.
+2. Si no, búsqueda exponencial (2, 4, 8…) seguida de búsqueda binaria
+   entre la última página con empresas y la primera sin ellas. Una página
+   "existe" si trae empresas y su firma no repite la de la página 1 (los
+   mismos cortes que walk_vertical).
+Las páginas descargadas durante la estimación se devuelven para que el
+recorrido no las vuelva a pedir.
+"""
+
+import math
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from .config import DEFAULT_END_PAGE, MAX_RETRIES, PAGE_PROBE_ENABLED
+from .extractor import PageStatus, extract_companies_detailed, extract_total_count
+
+logger = logging.getLogger(__name__)
+
+
+class PagePlan:
+    """Resultado de la estimación: end_page, método y páginas ya descargadas."""
+
+    def __init__(self, end_page: Optional[int], method: str, pages: Dict[int, object]):
+        self.end_page = end_page
+        self.method = method
+        self.pages = pages
+
+    def __repr__(self):
+        return f"PagePlan(end_page={self.end_page}, method={self.method!r})"
+
+
+class _Prober:
+    def __init__(self, vlink: str, fetcher, retries: int):
+        self.vlink = vlink
+        self.fetcher = fetcher
+        self.retries = retries
+        self.pages: Dict[int, object] = {}
+        self.first_sig = None
+
+    def fetch(self, page: int) -> Tuple[object, List[Dict]]:
+        """Descarga una página (con reintentos ante bloqueos o errores)."""
+        paged = f"{self.vlink}?page={page}"
+        for attempt in range(1, self.retries + 1):
+            try:
+                res = self.fetcher.fetch(paged)
+                status = res.page_status
+                if status.blocked:
+                    raise Exception(f"Bloqueo: {status.value}")
+                self.pages[page] = res
+                if status == PageStatus.NO_COMPANIES:
+                    return res, []
+                return res, extract_companies_detailed(res.html, "")
+            except Exception as e:
+                logger.warning(f"error estimando {paged}: {e}, retry {attempt}/{self.retries}")
+        raise RuntimeError(f"fallo persistente en {paged}")
+
+    def exists(self, page: int) -> bool:
+        _, comps = self.fetch(page)
+        return bool(comps) and {c["company_link"] for c in comps} != self.first_sig
+
+
+def estimate_pages(
+    vlink: str,
+    fetcher,
+    max_page: int = DEFAULT_END_PAGE,
+    probe: bool = PAGE_PROBE_ENABLED,
+    retries: int = MAX_RETRIES,
+) -> PagePlan:
+    """
+    Estima el end_page exacto de una vertical (como mucho `max_page`).
+    Devuelve un PagePlan con end_page=None si no se pudo estimar (fallos de
+    descarga, o sin contador y con el sondeo desactivado).
+    """
+    p = _Prober(vlink, fetcher, retries)
+    try:
+        res, comps = p.fetch(1)
+        if not comps:
+            return PagePlan(1, "empty", p.pages)
+        p.first_sig = {c["company_link"] for c in comps}
+
+        total = extract_total_count(res.html)
+        if total is not None and total >= len(comps):
+            end = math.ceil(total / len(comps))
+            return PagePlan(min(end, max_page), "count", p.pages)
+        if total is not None:
+            logger.warning(
+                f"{vlink}: el contador ({total}) no cuadra con la página 1 "
+                f"({len(comps)} empresas), sondeo"
+            )
+        if not probe:
+            return PagePlan(None, "none", p.pages)
+
+        # exponencial: lo existe, hi no (o hi > max_page)
+        lo, hi = 1, 2
+        while hi <= max_page and p.exists(hi):
+            lo, hi = hi, hi * 2
+        if hi > max_page:
+            if lo == max_page or p.exists(max_page):
+                return PagePlan(max_page, "probe", p.pages)
+            hi = max_page
+        # binaria en (lo, hi)
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if p.exists(mid):
+                lo = mid
+            else:
+                hi = mid
+        return PagePlan(lo, "probe", p.pages)
+    except RuntimeError as e:
+        logger.warning(f"no se pudo estimar {vlink}: {e}")
+        return PagePlan(None, "failed", p.pages)
@@ -0,0 +1,186 @@
+import os
+import asyncio
+import logging
+from typing import Iterable, List, Set, Tuple
+
+from .config import (
+    MAX_RETRIES,
+    INITIAL_BACKOFF,
+    BACKOFF_FACTOR,
+    STEP0_CONCURRENCY,
+)
+from .extractor import extract_subindustries
+from .progress import read_progress, save_progress
+from .utils import JsonlWriter, chunked, compact_jsonl, iter_json_array, read_jsonl
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()  # centinela de fin de etapa
+
+
+class Step0Results:
+    """
+    Resultados de step0 en streaming, con memoria acotada: los enlaces de
+    cada URL se añaden a {output}.jsonl (con fsync antes de marcarla como
+    completada) y close() compacta el array JSON de `output_file`.
+    Al abrir se descartan las líneas de URLs que no llegaron a completarse
+    (un corte entre el append y el progreso) y se migra un JSON previo.
+    """
+
+    def __init__(self, output_file: str, completed: Set[str]):
+        self.output_file = output_file
+        self.path = os.path.splitext(output_file)[0] + ".jsonl"
+        if os.path.exists(self.path):
+            previous: Iterable[dict] = read_jsonl(self.path)
+        else:
+            previous = iter_json_array(output_file) if completed else ()
+        tmp = self.path + ".tmp"
+        self.count = 0
+        with JsonlWriter(tmp) as w:
+            for chunk in chunked((r for r in previous if r["page"] in completed), 1000):
+                w.write(chunk)
+                self.count += len(chunk)
+        os.replace(tmp, self.path)
+        self._writer = JsonlWriter(self.path)
+
+    def add(self, url: str, subs: List[Tuple[str, str]]) -> None:
+        """Añade los enlaces de una URL; al volver ya están en disco."""
+        self._writer.write({"page": url, "sub_industry": name, "link": href} for name, href in subs)
+        self._writer.sync()
+        self.count += len(subs)
+
+    def close(self) -> int:
+        """Cierra el stream y compacta `output_file`; devuelve el número de enlaces."""
+        self._writer.close()
+        return compact_jsonl(self.path, self.output_file)
+
+
+async def _fetch_stage(
+    fetch_q: asyncio.Queue,
+    parse_q: asyncio.Queue,
+    persist_q: asyncio.Queue,
+    fetcher,
+    max_retries: int,
+    backoff0: float,
+) -> None:
+    while True:
+        url = await fetch_q.get()
+        if url is _DONE:
+            return
+        backoff = backoff0
+        for attempt in range(1, max_retries + 1):
+            logger.info(f"[{attempt}/{max_retries}] Scraping {url}...")
+            try:
+                # la cortesía por host y proxy la pone el scheduler del fetcher
+                res = await asyncio.to_thread(fetcher.fetch, url)
+                if res.page_status.blocked:
+                    raise Exception(f"Bloqueo detectado: {res.page_status.value}")
+                await parse_q.put((url, res.html))
+                break
+            except Exception as e:
+                logger.warning(f"  ⚠️ Error en {url}: {e}, retrying en {backoff}s")
+                await asyncio.sleep(backoff)
+                backoff *= BACKOFF_FACTOR
+        else:
+            logger.error(f"❌ Falló tras {max_retries} intentos: {url}")
+            await persist_q.put((url, None))
+
+
+async def _parse_stage(parse_q: asyncio.Queue, persist_q: asyncio.Queue) -> None:
+    while True:
+        item = await parse_q.get()
+        if item is _DONE:
+            await persist_q.put(_DONE)
+            return
+        url, html = item
+        try:
+            # el parseo es CPU: fuera del event loop
+            subs = await asyncio.to_thread(extract_subindustries, html)
+        except Exception as e:
+            # una página ilegible cuenta como fallida, sin detener el pipeline
+            logger.error(f"❌ Error al parsear {url}: {e}")
+            subs = None
+        await persist_q.put((url, subs))
+
+
+async def _persist_stage(
+    persist_q: asyncio.Queue,
+    progress_file: str,
+    results: Step0Results,
+    completed: Set[str],
+    blocked: Set[str],
+) -> None:
+    while True:
+        item = await persist_q.get()
+        if item is _DONE:
+            return
+        url, subs = item
+        if subs is None:
+            blocked.add(url)
+        else:
+            await asyncio.to_thread(results.add, url, subs)
+            completed.add(url)
+            blocked.discard(url)
+            logger.info(f"  ✅ Extraídos {len(subs)} enlaces de {url}")
+        # la única etapa que toca completed/blocked es esta: no hace falta copiarlos
+        await asyncio.to_thread(save_progress, progress_file, completed, blocked)
+
+
+async def run_step0_pipeline(
+    urls: List[str],
+    fetcher,
+    progress_file: str,
+    output_file: str,
+    concurrency: int = STEP0_CONCURRENCY,
+    max_retries: int = MAX_RETRIES,
+    backoff: float = INITIAL_BACKOFF,
+) -> int:
+    """
+    Step0 como pipeline asíncrono de tres etapas unidas por colas:
+    descarga (concurrencia acotada; la cortesía por host es la del
+    scheduler del fetcher) → parseo de sub‑industrias → persistencia de
+    progreso y resultados (append a un JSONL, ver Step0Results).
+    Respeta `progress_file`: las URLs ya completadas se saltan y sus
+    resultados previos se conservan. Devuelve el número de enlaces.
+    """
+    completed, blocked = read_progress(progress_file)
+    results = Step0Results(output_file, completed)
+
+    fetch_q: asyncio.Queue = asyncio.Queue()
+    parse_q: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    persist_q: asyncio.Queue = asyncio.Queue()
+
+    for url in urls:
+        if url in completed:
+            logger.info(f"[SKIP] {url}")
+            continue
+        fetch_q.put_nowait(url)
+    for _ in range(concurrency):
+        fetch_q.put_nowait(_DONE)
+
+    fetchers = [
+        asyncio.create_task(
+            _fetch_stage(fetch_q, parse_q, persist_q, fetcher, max_retries, backoff)
+        )
+        for _ in range(concurrency)
+    ]
+
+    async def fetch_all() -> None:
+        await asyncio.gather(*fetchers)
+        await parse_q.put(_DONE)
+
+    stages: List[asyncio.Task] = [
+        asyncio.create_task(fetch_all()),
+        asyncio.create_task(_parse_stage(parse_q, persist_q)),
+        asyncio.create_task(_persist_stage(persist_q, progress_file, results, completed, blocked)),
+    ]
+    try:
+        await asyncio.gather(*stages)
+    finally:
+        # si una etapa falla, ninguna otra se queda esperando en su cola
+        for task in fetchers + stages:
+            task.cancel()
+        total = results.close()
+
+    logger.info(f"Scrape step0 completado. Total de enlaces: {total}")
+    return total
@@ -2,12 +2,19 @@ import os
 import json
 from typing import Tuple, Set
 
+from .store import document_key, get_store, use_sqlite
+
 
 def read_progress(filepath: str) -> Tuple[Set[str], Set[str]]:
     """
     Lee un fichero JSON de progreso y devuelve dos conjuntos:
     completed y blocked. Si el fichero no existe, devuelve conjuntos vacíos.
+    Con el backend "sqlite" se leen de la tabla progress_items.
     """
+    if use_sqlite():
+        completed, blocked = get_store().read_items(document_key(filepath))
+        if completed or blocked or not os.path.exists(filepath):
+            return completed, blocked
     if not os.path.exists(filepath):
         return set(), set()
     with open(filepath, "r", encoding="utf-8") as f:
@@ -23,7 +30,11 @@ def save_progress(
     """
     Guarda el estado de progreso en un fichero JSON con las claves
     'completed' y 'blocked'. Crea directorio si es necesario.
+    Con el backend "sqlite" solo se escriben las diferencias en progress_items.
     """
+    if use_sqlite():
+        get_store().save_items(document_key(filepath), completed, blocked)
+        return
     dirpath = os.path.dirname(filepath)
     if dirpath:
         os.makedirs(dirpath, exist_ok=True)
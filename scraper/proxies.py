@@ -0,0 +1,286 @@
+import os
+import time
+import random
+import socket
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+import urllib3
+
+from .config import (
+    PROXY_LIST_FILE,
+    VALID_PROXY_LIST_FILE,
+    PROXY_STATS_FILE,
+    PROXY_CHECK_URL,
+    PROXY_CHECK_TIMEOUT,
+    PROXY_CHECK_CONCURRENCY,
+    PROXY_HEALTH_FILE,
+    PROXY_QUARANTINE_BASE,
+    PROXY_QUARANTINE_MAX,
+    PROXY_SCORE_ALPHA,
+    PROXY_LATENCY_REF,
+    PROXY_HEALTH_SAVE_EVERY,
+)
+from .extractor import PageStatus, classify_page
+from .utils import cargar_proxies, load_json, save_json_atomic
+
+logger = logging.getLogger(__name__)
+
+# bloqueos atribuibles al proxy (un 5xx es del servidor, no del proxy)
+_PROXY_FAILURES = (PageStatus.CHALLENGE, PageStatus.DENIED, PageStatus.CONNECTION_LOST)
+
+
+def _new_health() -> Dict:
+    return {
+        "ok": 0,
+        "fail": 0,
+        "blocks": {},  # tipo de bloqueo → veces
+        "success": 1.0,  # media móvil de éxito (optimista para probar proxies nuevos)
+        "latency": None,  # media móvil en segundos
+        "strikes": 0,  # fallos seguidos (decaen con cada éxito)
+        "quarantined_until": 0.0,  # time.time()
+        "last_status": None,
+    }
+
+
+class ProxyManager:
+    """
+    Salud de los proxies: tasa de éxito y latencia (medias móviles), tipo de
+    bloqueo por proxy y cuarentena exponencial tras challenge, Access Denied
+    o conexión perdida. Elige proxies al azar ponderando por puntuación y
+    persiste el estado en `health_file` entre ejecuciones.
+    Es seguro compartirlo entre hilos (p. ej. entre workers).
+    """
+
+    def __init__(
+        self,
+        health_file: Optional[str] = PROXY_HEALTH_FILE,
+        quarantine_base: float = PROXY_QUARANTINE_BASE,
+        quarantine_max: float = PROXY_QUARANTINE_MAX,
+        alpha: float = PROXY_SCORE_ALPHA,
+        latency_ref: float = PROXY_LATENCY_REF,
+        save_every: int = PROXY_HEALTH_SAVE_EVERY,
+        clock=time.time,
+    ):
+        self.health_file = health_file
+        self.quarantine_base = quarantine_base
+        self.quarantine_max = quarantine_max
+        self.alpha = alpha
+        self.latency_ref = latency_ref
+        self.save_every = save_every
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._dirty = 0
+        self._health: Dict[str, Dict] = {}
+        if health_file:
+            for proxy, h in load_json(health_file, {}).items():
+                self._health[proxy] = {**_new_health(), **h}
+
+    def _get(self, proxy: str) -> Dict:
+        h = self._health.get(proxy)
+        if h is None:
+            h = self._health[proxy] = _new_health()
+        return h
+
+    def _score(self, h: Dict) -> float:
+        score = h["success"]
+        if h["latency"] is not None:
+            score /= 1 + h["latency"] / self.latency_ref
+        return max(score, 0.01)
+
+    def score(self, proxy: str) -> float:
+        with self._lock:
+            return self._score(self._get(proxy))
+
+    def is_quarantined(self, proxy: str) -> bool:
+        with self._lock:
+            return self._get(proxy)["quarantined_until"] > self._clock()
+
+    def available(self, proxies: Iterable[str]) -> List[str]:
+        """Proxies de `proxies` que no están en cuarentena."""
+        now = self._clock()
+        with self._lock:
+            return [p for p in proxies if self._get(p)["quarantined_until"] <= now]
+
+    def pick(self, proxies: Iterable[str]) -> Optional[str]:
+        """
+        Elige un proxy de `proxies` con probabilidad proporcional a su
+        puntuación, descartando los que están en cuarentena. Si todos lo
+        están, devuelve el que sale antes de cuarentena.
+        """
+        proxies = list(proxies)
+        if not proxies:
+            return None
+        now = self._clock()
+        with self._lock:
+            healths = [self._get(p) for p in proxies]
+            live = [(p, h) for p, h in zip(proxies, healths) if h["quarantined_until"] <= now]
+            if not live:
+                proxy = min(zip(proxies, healths), key=lambda ph: ph[1]["quarantined_until"])[0]
+                logger.warning(f"[proxies] todos en cuarentena, uso {proxy}")
+                return proxy
+            weights = [self._score(h) for _, h in live]
+        return random.choices([p for p, _ in live], weights=weights)[0]
+
+    def record(
+        self,
+        proxy: Optional[str],
+        status: PageStatus,
+        latency: Optional[float] = None,
+    ) -> None:
+        """Registra el resultado de una petición hecha a través de `proxy`."""
+        if not proxy:
+            return
+        with self._lock:
+            h = self._get(proxy)
+            h["last_status"] = status.value
+            failed = status in _PROXY_FAILURES
+            h["success"] += self.alpha * ((0.0 if failed else 1.0) - h["success"])
+            if latency is not None and not failed:
+                prev = h["latency"]
+                h["latency"] = latency if prev is None else prev + self.alpha * (latency - prev)
+            if failed:
+                h["fail"] += 1
+                h["blocks"][status.value] = h["blocks"].get(status.value, 0) + 1
+                h["strikes"] += 1
+                wait = min(self.quarantine_base * 2 ** (h["strikes"] - 1), self.quarantine_max)
+                h["quarantined_until"] = self._clock() + wait
+                logger.info(f"[proxies] {proxy} en cuarentena {wait:.0f}s ({status.value})")
+            elif not status.blocked:
+                h["ok"] += 1
+                h["strikes"] = max(h["strikes"] - 1, 0)
+            self._dirty += 1
+            flush = self.save_every and self._dirty >= self.save_every
+        if flush:
+            self.save()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Copia del estado de salud por proxy, con su puntuación."""
+        with self._lock:
+            return {p: {**h, "score": round(self._score(h), 4)} for p, h in self._health.items()}
+
+    def save(self) -> None:
+        """Persiste la salud de los proxies en `health_file`."""
+        if not self.health_file:
+            return
+        with self._lock:
+            save_json_atomic(self.health_file, self._health)
+            self._dirty = 0
+
+
+def load_proxies(
+    raw_file: str = PROXY_LIST_FILE,
+    valid_file: str = VALID_PROXY_LIST_FILE,
+) -> List[str]:
+    """
+    Proxies para un scrape: la lista validada (`--validate-proxies`) si existe
+    y es posterior a `raw_file`; si no, la lista completa.
+    """
+    if os.path.exists(valid_file) and (
+        not os.path.exists(raw_file) or os.path.getmtime(valid_file) >= os.path.getmtime(raw_file)
+    ):
+        proxies = cargar_proxies(valid_file)
+        if proxies:
+            return proxies
+        logger.warning(f"[proxies] {valid_file} vacío, uso {raw_file}")
+    return cargar_proxies(raw_file)
+
+
+def _split_host_port(proxy: str):
+    host_port = proxy.split("://", 1)[-1].rsplit("@", 1)[-1]
+    host, _, port = host_port.rpartition(":")
+    return host, int(port)
+
+
+def probe_proxy(
+    proxy: str, target: str = PROXY_CHECK_URL, timeout: float = PROXY_CHECK_TIMEOUT
+) -> Dict:
+    """
+    Sondea un proxy: tiempo de conexión TCP, tiempo hasta la respuesta,
+    tiempo total y rendimiento de la descarga de `target` a través de él.
+    Es viable si responde sin error ni marcas de bloqueo.
+    """
+    stats = {
+        "proxy": proxy,
+        "ok": False,
+        "status": None,
+        "page_status": None,
+        "connect_s": None,
+        "ttfb_s": None,
+        "total_s": None,
+        "bytes": 0,
+        "throughput_kbps": None,
+        "error": None,
+    }
+    mgr = None
+    try:
+        t0 = time.monotonic()
+        socket.create_connection(_split_host_port(proxy), timeout=timeout).close()
+        stats["connect_s"] = round(time.monotonic() - t0, 4)
+
+        url = proxy if "://" in proxy else f"http://{proxy}"
+        mgr = urllib3.ProxyManager(
+            url,
+            timeout=urllib3.Timeout(total=timeout),
+            retries=urllib3.Retry(total=None, connect=0, read=0, status=0, other=0, redirect=5),
+        )
+        t0 = time.monotonic()
+        resp = mgr.request("GET", target, preload_content=False)
+        stats["ttfb_s"] = round(time.monotonic() - t0, 4)
+        body = resp.read()
+        resp.release_conn()
+        total = time.monotonic() - t0
+        stats["status"] = resp.status
+        stats["total_s"] = round(total, 4)
+        stats["bytes"] = len(body)
+        stats["throughput_kbps"] = round(len(body) / 1024 / max(total, 1e-6), 1)
+        page_status = classify_page(body.decode("utf-8", errors="replace"), resp.status)
+        stats["page_status"] = page_status.value
+        stats["ok"] = not page_status.blocked
+    except Exception as e:
+        stats["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        if mgr is not None:
+            mgr.clear()
+    return stats
+
+
+def validate_proxies(
+    proxies: List[str],
+    target: str = PROXY_CHECK_URL,
+    timeout: float = PROXY_CHECK_TIMEOUT,
+    concurrency: int = PROXY_CHECK_CONCURRENCY,
+) -> List[Dict]:
+    """
+    Sondea todos los proxies en paralelo y devuelve sus estadísticas
+    ordenadas: primero los viables, de menor a mayor tiempo total.
+    """
+    if not proxies:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(proxies)))) as pool:
+        results = list(pool.map(lambda p: probe_proxy(p, target, timeout), proxies))
+    return sorted(results, key=lambda r: (not r["ok"], r["total_s"] or float("inf")))
+
+
+def write_validated(
+    results: List[Dict],
+    valid_file: str = VALID_PROXY_LIST_FILE,
+    stats_file: str = PROXY_STATS_FILE,
+) -> List[str]:
+    """
+    Escribe la lista podada (solo viables, en orden de ranking) y las
+    estadísticas de todos los sondeos. Devuelve los proxies viables.
+    """
+    viable = [r["proxy"] for r in results if r["ok"]]
+    dirpath = os.path.dirname(valid_file)
+    if dirpath:
+        os.makedirs(dirpath, exist_ok=True)
+    tmp = f"{valid_file}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.writelines(f"{p}\n" for p in viable)
+    os.replace(tmp, valid_file)
+    save_json_atomic(stats_file, results)
+    logger.info(f"[proxies] {len(viable)}/{len(results)} proxies viables → {valid_file}")
+    return viable
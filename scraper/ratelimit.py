@@ -0,0 +1,138 @@
+import time
+import random
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from .config import (
+    SCHED_INITIAL_DELAY,
+    SCHED_PROXY_MIN_DELAY,
+    SCHED_PROXY_MAX_DELAY,
+    SCHED_HOST_MIN_DELAY,
+    SCHED_HOST_MAX_DELAY,
+    SCHED_RATE_INCREASE,
+    SCHED_BLOCK_DECREASE,
+    SCHED_ERROR_DECREASE,
+    SCHED_JITTER,
+)
+from .extractor import PageStatus
+
+logger = logging.getLogger(__name__)
+
+Key = Tuple[str, str]  # ("proxy", ip:puerto) o ("host", dominio)
+
+
+class _Bucket:
+    """Tasa permitida para una clave y el instante del siguiente hueco libre."""
+
+    def __init__(self, rate: float, min_delay: float, max_delay: float):
+        self.min_rate = 1.0 / max_delay
+        self.max_rate = 1.0 / min_delay
+        self.rate = min(max(rate, self.min_rate), self.max_rate)
+        self.next_at = 0.0
+        self.ok = 0
+        self.blocked = 0
+        self.errors = 0
+
+    @property
+    def delay(self) -> float:
+        return 1.0 / self.rate
+
+    def scale(self, factor: float) -> None:
+        self.rate = min(max(self.rate * factor, self.min_rate), self.max_rate)
+
+    def add(self, inc: float) -> None:
+        self.rate = min(max(self.rate + inc, self.min_rate), self.max_rate)
+
+
+class AdaptiveScheduler:
+    """
+    Planificador de cortesía AIMD con una tasa por proxy y otra por host.
+    - Cada página ok suma `increase` peticiones/s (aumento aditivo).
+    - Un challenge/denied multiplica la tasa por `block_decrease` y un
+      5xx/conexión perdida por `error_decrease` (disminución multiplicativa).
+    Antes de cada petición `wait` reserva el siguiente hueco libre de su
+    proxy y de su host y duerme hasta entonces.
+    """
+
+    def __init__(
+        self,
+        initial_delay: float = SCHED_INITIAL_DELAY,
+        increase: float = SCHED_RATE_INCREASE,
+        block_decrease: float = SCHED_BLOCK_DECREASE,
+        error_decrease: float = SCHED_ERROR_DECREASE,
+        jitter: float = SCHED_JITTER,
+        proxy_delays: Tuple[float, float] = (SCHED_PROXY_MIN_DELAY, SCHED_PROXY_MAX_DELAY),
+        host_delays: Tuple[float, float] = (SCHED_HOST_MIN_DELAY, SCHED_HOST_MAX_DELAY),
+        sleep=time.sleep,
+    ):
+        self.initial_delay = initial_delay
+        self.increase = increase
+        self.block_decrease = block_decrease
+        self.error_decrease = error_decrease
+        self.jitter = jitter
+        self._limits = {"proxy": proxy_delays, "host": host_delays}
+        self._buckets: Dict[Key, _Bucket] = {}
+        self._lock = threading.Lock()
+        self._sleep = sleep
+        self.slept = 0.0  # segundos totales de espera (métrica)
+
+    @staticmethod
+    def _keys(proxy: Optional[str], url: str) -> Tuple[Key, Key]:
+        return ("proxy", proxy or "direct"), ("host", urlparse(url).netloc)
+
+    def _bucket(self, key: Key) -> _Bucket:
+        b = self._buckets.get(key)
+        if b is None:
+            lo, hi = self._limits[key[0]]
+            b = self._buckets[key] = _Bucket(1.0 / self.initial_delay, lo, hi)
+        return b
+
+    def wait(self, proxy: Optional[str], url: str) -> float:
+        """Espera el turno de (proxy, host) para `url`. Devuelve los segundos dormidos."""
+        with self._lock:
+            now = time.monotonic()
+            buckets = [self._bucket(k) for k in self._keys(proxy, url)]
+            start = max([now] + [b.next_at for b in buckets])
+            for b in buckets:
+                b.next_at = start + b.delay * (1 + random.uniform(-self.jitter, self.jitter))
+            pause = start - now
+            self.slept += pause
+        if pause > 0:
+            self._sleep(pause)
+        return pause
+
+    def record(self, proxy: Optional[str], url: str, status: PageStatus) -> None:
+        """Ajusta las tasas de (proxy, host) según la clasificación de la página."""
+        with self._lock:
+            for b in (self._bucket(k) for k in self._keys(proxy, url)):
+                if not status.blocked:
+                    b.ok += 1
+                    b.add(self.increase)
+                elif status in (PageStatus.CHALLENGE, PageStatus.DENIED):
+                    b.blocked += 1
+                    b.scale(self.block_decrease)
+                else:
+                    b.errors += 1
+                    b.scale(self.error_decrease)
+
+    def rate(self, proxy: Optional[str] = None, url: Optional[str] = None) -> float:
+        """Tasa actual (peticiones/s) de un proxy o, si se da `url`, de su host."""
+        with self._lock:
+            key = ("host", urlparse(url).netloc) if url else ("proxy", proxy or "direct")
+            return self._bucket(key).rate
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Estado de todas las claves: tasa, espera actual y contadores."""
+        with self._lock:
+            return {
+                f"{kind}:{name}": {
+                    "rate": round(b.rate, 4),
+                    "delay": round(b.delay, 3),
+                    "ok": b.ok,
+                    "blocked": b.blocked,
+                    "errors": b.errors,
+                }
+                for (kind, name), b in self._buckets.items()
+            }
@@ -0,0 +1,281 @@
+"""
+Refresco incremental de países ya scrapeados (--refresh).
+Cada página listada tiene una huella (scraper.fingerprints): los
+company_links de la página y un hash de su contenido. Por vertical:
+  1. Se muestrean la página 1, la última conocida, algunas al azar y la
+     siguiente a la última (por si la vertical creció).
+  2. Si todas coinciden con su huella, la vertical no cambió: sus
+     registros se copian del snapshot anterior sin más descargas.
+  3. Si no, se recorre desde la página 1 y se corta en cuanto, pasada la
+     última página cambiada de la muestra, `stop_after` páginas seguidas
+     coinciden con el snapshot anterior; el resto se copia.
+El resultado sustituye a los resultados del país (core.rewrite_results).
+Un refresco interrumpido no se reanuda: se vuelve a lanzar entero.
+"""
+
+import os
+import json
+import random
+import logging
+import sqlite3
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .config import (
+    DEFAULT_END_PAGE,
+    FETCH_BACKEND,
+    INPUT_DIR_1,
+    MAX_RETRIES,
+    PAGE_CACHE_ENABLED,
+    REFRESH_SAMPLE_PAGES,
+    REFRESH_STOP_AFTER,
+)
+from .cache import PageCache
+from .core import expand_sightings, previous_records, rewrite_results
+from .extractor import PageStatus, extract_companies_detailed
+from .fetcher import make_fetcher
+from .fingerprints import PageFingerprints
+from .metrics import ThroughputReporter
+from .proxies import load_proxies
+from .utils import chunked, load_json
+from .verticals import VerticalIndex, discover_verticals, resolve_verticals
+
+logger = logging.getLogger(__name__)
+
+
+class Sightings:
+    """
+    Índice temporal (SQLite en disco) de cada aparición de una empresa en
+    una sub‑industria: (company_link, link) → registro. Las pertenencias
+    de los registros deduplicados se expanden a su propia aparición.
+    """
+
+    def __init__(self, records: Iterable[Dict]):
+        self._db = sqlite3.connect("")
+        self._db.execute(
+            "CREATE TABLE s (company_link TEXT, link TEXT, rec TEXT, "
+            "PRIMARY KEY (company_link, link))"
+        )
+        rows = (
+            (r["company_link"], r.get("link"), json.dumps(r, ensure_ascii=False))
+            for r in expand_sightings(records)
+        )
+        for chunk in chunked(rows, 5000):
+            self._db.executemany("INSERT OR REPLACE INTO s VALUES (?, ?, ?)", chunk)
+
+    def get(self, company_link: str, link: str) -> Optional[Dict]:
+        row = self._db.execute(
+            "SELECT rec FROM s WHERE company_link = ? AND link = ?", (company_link, link)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def close(self) -> None:
+        self._db.close()
+
+
+class Refresher:
+    """Refresco de las verticales de un país; acumula estadísticas en `stats`."""
+
+    def __init__(
+        self,
+        country: str,
+        fetcher,
+        fingerprints: PageFingerprints,
+        sightings: Sightings,
+        cache: Optional[PageCache] = None,
+        sample: int = REFRESH_SAMPLE_PAGES,
+        stop_after: int = REFRESH_STOP_AFTER,
+        rng: Optional[random.Random] = None,
+    ):
+        self.country = country
+        self.fetcher = fetcher
+        self.fps = fingerprints
+        self.sightings = sightings
+        self.cache = cache
+        self.sample = sample
+        self.stop_after = stop_after
+        self.rng = rng or random.Random()
+        self.stats = {
+            "pages_fetched": 0,
+            "pages_carried": 0,
+            "verticals_unchanged": 0,
+            "verticals_walked": 0,
+            "early_stops": 0,
+        }
+
+    def _fetch(self, rec: Dict, vlink: str, page: int) -> Optional[Tuple[PageStatus, List[Dict]]]:
+        """Descarga y extrae una página con reintentos; None si falla siempre."""
+        paged = f"{vlink}?page={page}"
+        for attempt in range(1, MAX_RETRIES + 1):
+            try:
+                res = self.fetcher.fetch(paged)
+                status = res.page_status
+                if status.blocked:
+                    raise Exception(f"Bloqueo: {status.value} ({res.backend}, HTTP {res.status})")
+                if self.cache is not None:
+                    self.cache.put(
+                        paged,
+                        res.html,
+                        self.country,
+                        base_link=rec["link"],
+                        vertical=vlink,
+                        page=page,
+                    )
+                self.stats["pages_fetched"] += 1
+                if status == PageStatus.NO_COMPANIES:
+                    return status, []
+                return status, extract_companies_detailed(res.html, rec["sub_industry"])
+            except Exception as e:
+                logger.warning(
+                    f"[{self.country}] error {paged}: {e}, retry {attempt}/{MAX_RETRIES}"
+                )
+        logger.error(f"[{self.country}] fallo persistente en {paged}")
+        return None
+
+    def _carry(self, rec: Dict, page: int, fp: Dict) -> List[Dict]:
+        """Registros de una página sin cambios, tomados del snapshot anterior."""
+        self.stats["pages_carried"] += 1
+        out = []
+        for link in fp["links"]:
+            old = self.sightings.get(link, rec["link"])
+            if old is not None:
+                out.append({**old, "page": page})
+        return out
+
+    @staticmethod
+    def _records(rec: Dict, page: int, comps: List[Dict]) -> List[Dict]:
+        return [{**rec, **c, "page": page} for c in comps]
+
+    def vertical(self, rec: Dict, vlink: str) -> Iterator[List[Dict]]:
+        """Lotes de registros (uno por página) de la vertical refrescada."""
+        old = self.fps.pages(rec["link"], vlink)
+        if not old:
+            yield from self._walk(rec, vlink, old, {}, horizon=0)
+            return
+
+        known = sorted(old)
+        middle = known[1:-1]
+        probe = {known[0], known[-1], known[-1] + 1}
+        probe.update(self.rng.sample(middle, min(self.sample, len(middle))))
+        fetched: Dict[int, Tuple[PageStatus, List[Dict]]] = {}
+        changed = []
+        for page in sorted(probe):
+            got = self._fetch(rec, vlink, page)
+            if got is None:
+                # sin datos nuevos: se conserva lo anterior
+                for p in known:
+                    yield self._carry(rec, p, old[p])
+                return
+            fetched[page] = got
+            status, comps = got
+            if page in old:
+                if not PageFingerprints.matches(old[page], comps):
+                    changed.append(page)
+            elif comps and {c["company_link"] for c in comps} != set(old[known[0]]["links"]):
+                changed.append(page)  # la vertical creció
+
+        if not changed:
+            self.stats["verticals_unchanged"] += 1
+            for p in known:
+                yield self._carry(rec, p, old[p])
+            return
+        yield from self._walk(rec, vlink, old, fetched, horizon=max(changed))
+
+    def _walk(
+        self,
+        rec: Dict,
+        vlink: str,
+        old: Dict[int, Dict],
+        fetched: Dict[int, Tuple[PageStatus, List[Dict]]],
+        horizon: int,
+    ) -> Iterator[List[Dict]]:
+        """
+        Recorre la vertical desde la página 1 con los cortes de
+        walk_vertical; pasada `horizon`, corta tras `stop_after` páginas
+        iguales al snapshot anterior y copia el resto.
+        """
+        self.stats["verticals_walked"] += 1
+        first_sig = None
+        run = 0
+        for page in range(1, DEFAULT_END_PAGE + 1):
+            got = fetched.pop(page, None) or self._fetch(rec, vlink, page)
+            if got is None:
+                for p in sorted(p for p in old if p >= page):
+                    yield self._carry(rec, p, old[p])
+                return
+            status, comps = got
+            sig = {c["company_link"] for c in comps}
+            if status == PageStatus.NO_COMPANIES or not comps or (page > 1 and sig == first_sig):
+                self.fps.truncate(rec["link"], vlink, page - 1)
+                return
+            if page == 1:
+                first_sig = sig
+            same = PageFingerprints.matches(old.get(page), comps)
+            self.fps.put(rec["link"], vlink, page, comps)
+            yield self._records(rec, page, comps)
+
+            run = run + 1 if same and page > horizon else 0
+            rest = [p for p in old if p > page]
+            if run >= self.stop_after and rest:
+                self.stats["early_stops"] += 1
+                for p in sorted(rest):
+                    yield self._carry(rec, p, old[p])
+                return
+
+
+def refresh_country(
+    country: str,
+    fetcher=None,
+    cache: Optional[PageCache] = None,
+    sample: int = REFRESH_SAMPLE_PAGES,
+    stop_after: int = REFRESH_STOP_AFTER,
+    rng: Optional[random.Random] = None,
+) -> Dict[str, int]:
+    """
+    Refresca un país a partir de las huellas de su último scraping y
+    reemplaza sus resultados. Las verticales sin huellas se recorren
+    enteras. Devuelve las estadísticas del refresco (registros, páginas
+    descargadas/copiadas, verticales sin cambios, cortes anticipados).
+    """
+    own_fetcher = fetcher is None
+    if own_fetcher:
+        fetcher = make_fetcher(load_proxies())
+    fps = PageFingerprints(country)
+    if not fps.data:
+        logger.warning(f"[{country}] sin huellas de páginas: se recorrerá todo de nuevo")
+    entries = load_json(os.path.join(INPUT_DIR_1, f"{country}.json"), [])
+    sightings = Sightings(previous_records(country))
+    refresher = Refresher(country, fetcher, fps, sightings, cache, sample, stop_after, rng)
+
+    index = VerticalIndex(country)
+    discover_verticals(index, [r["link"] for r in entries if not fps.verticals(r["link"])], fetcher)
+
+    def batches():
+        for rec in entries:
+            verticals = fps.verticals(rec["link"]) or resolve_verticals(index, rec["link"], fetcher)
+            for vlink in verticals:
+                yield from refresher.vertical(rec, vlink)
+
+    try:
+        n = rewrite_results(country, batches(), label="refresh")
+        fps.save()
+        index.save()
+    finally:
+        sightings.close()
+        if own_fetcher:
+            fetcher.close()
+    stats = {"records": n, **refresher.stats}
+    logger.info(f"[{country}] refresco: {stats}")
+    return stats
+
+
+def refresh_countries(countries: List[str], backend: str = FETCH_BACKEND) -> Dict[str, Dict]:
+    """Refresca varios países compartiendo fetcher y caché de páginas."""
+    cache = PageCache() if PAGE_CACHE_ENABLED else None
+    try:
+        with make_fetcher(load_proxies(), backend) as fetcher, ThroughputReporter("refresh"):
+            out = {c: refresh_country(c, fetcher=fetcher, cache=cache) for c in countries}
+            logger.info(f"[sched] tasas finales: {fetcher.scheduler.snapshot()}")
+            return out
+    finally:
+        if cache is not None:
+            cache.close()
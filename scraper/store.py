@@ -0,0 +1,416 @@
+import os
+import json
+import time
+import logging
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .config import STORAGE_BACKEND, STORE_PATH, STORE_CACHE_MB, STORE_KEEP_SNAPSHOTS
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS progress_items (
+    key   TEXT NOT NULL,  -- ruta del fichero de progreso (step0)
+    item  TEXT NOT NULL,
+    state TEXT NOT NULL,  -- completed | blocked
+    PRIMARY KEY (key, item)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS links (
+    country      TEXT NOT NULL,
+    link         TEXT NOT NULL,
+    start_page   INTEGER NOT NULL,
+    end_page     INTEGER NOT NULL,
+    current_page INTEGER NOT NULL,
+    PRIMARY KEY (country, link)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS completed (
+    country   TEXT NOT NULL,
+    base_link TEXT NOT NULL,
+    done_at   REAL NOT NULL,
+    PRIMARY KEY (country, base_link)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS companies (
+    country      TEXT NOT NULL,
+    company_link TEXT NOT NULL,
+    link         TEXT,  -- sub‑industria en la que apareció primero
+    data         TEXT NOT NULL,
+    PRIMARY KEY (country, company_link)
+);
+CREATE INDEX IF NOT EXISTS companies_country ON companies (country);
+CREATE TABLE IF NOT EXISTS memberships (
+    country      TEXT NOT NULL,
+    company_link TEXT NOT NULL,
+    link         TEXT NOT NULL,
+    sub_industry TEXT,
+    page         INTEGER,
+    PRIMARY KEY (country, company_link, link)
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    country  TEXT NOT NULL,
+    taken_at REAL NOT NULL,
+    size     INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_country ON snapshots (country, id);
+CREATE TABLE IF NOT EXISTS snapshot_rows (
+    snapshot     INTEGER NOT NULL,
+    company_link TEXT NOT NULL,
+    data         TEXT NOT NULL,
+    PRIMARY KEY (snapshot, company_link)
+) WITHOUT ROWID;
+"""
+
+# registro con sus pertenencias fusionadas, como en el JSON compactado
+_MERGED = """
+SELECT c.company_link,
+       CASE WHEN EXISTS (
+           SELECT 1 FROM memberships m
+           WHERE m.country = c.country AND m.company_link = c.company_link
+       )
+       THEN json_set(c.data, '$.memberships', (
+           SELECT json_group_array(json_object('sub_industry', m.sub_industry,
+                                               'link', m.link, 'page', m.page))
+           FROM memberships m
+           WHERE m.country = c.country AND m.company_link = c.company_link
+       ))
+       ELSE c.data END
+FROM companies c
+WHERE c.country = ?
+ORDER BY c.rowid
+"""
+
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+class Store:
+    """
+    Almacén SQLite (WAL) del estado del scraper:
+    - progress_items: progreso de step0 (completed/blocked), por elemento.
+    - links / completed: progreso por país, vertical y página.
+    - companies / memberships: resultados, una fila por company_link y
+      país; las apariciones en otras sub‑industrias van a memberships.
+    - snapshots / snapshot_rows: copias de los resultados para el diff.
+    Cada página se registra en una sola transacción (empresas + progreso).
+    Es seguro compartirlo entre hilos.
+    """
+
+    def __init__(self, path: str = STORE_PATH, cache_mb: int = STORE_CACHE_MB):
+        self.path = path
+        dirpath = os.path.dirname(path)
+        if dirpath:
+            os.makedirs(dirpath, exist_ok=True)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(f"PRAGMA cache_size=-{cache_mb * 1024}")
+        self._db.executescript(_SCHEMA)
+
+    @contextmanager
+    def transaction(self):
+        """Transacción explícita (BEGIN IMMEDIATE … COMMIT/ROLLBACK)."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def _query(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def _stream(self, sql: str, params: Tuple = (), batch: int = 1000) -> Iterator[Tuple]:
+        """
+        Itera un SELECT grande con una conexión de lectura propia: en WAL ve
+        una foto consistente y no bloquea al escritor.
+        """
+        db = sqlite3.connect(self.path)
+        try:
+            cur = db.execute(sql, params)
+            while rows := cur.fetchmany(batch):
+                yield from rows
+        finally:
+            db.close()
+
+    # ─── progreso de step0 ──────────────────────────────────────────────────
+    def read_items(self, key: str) -> Tuple[Set[str], Set[str]]:
+        sets: Dict[str, Set[str]] = {"completed": set(), "blocked": set()}
+        for item, state in self._query(
+            "SELECT item, state FROM progress_items WHERE key = ?", (key,)
+        ):
+            sets[state].add(item)
+        return sets["completed"], sets["blocked"]
+
+    def save_items(self, key: str, completed: Set[str], blocked: Set[str]) -> None:
+        """Guarda solo las diferencias con lo ya registrado."""
+        want = {**{i: "blocked" for i in blocked}, **{i: "completed" for i in completed}}
+        with self.transaction() as db:
+            have = dict(db.execute("SELECT item, state FROM progress_items WHERE key = ?", (key,)))
+            db.executemany(
+                "DELETE FROM progress_items WHERE key = ? AND item = ?",
+                [(key, i) for i in have.keys() - want.keys()],
+            )
+            db.executemany(
+                "INSERT OR REPLACE INTO progress_items (key, item, state) VALUES (?, ?, ?)",
+                [(key, i, s) for i, s in want.items() if have.get(i) != s],
+            )
+
+    # ─── progreso por país ──────────────────────────────────────────────────
+    def load_progress(self, country: str) -> Dict[str, Any]:
+        """Mismo formato que el checkpoint JSON (enlaces y base_links completados)."""
+        enlaces = {
+            link: {"start_page": s, "end_page": e, "current_page": c}
+            for link, s, e, c in self._query(
+                "SELECT link, start_page, end_page, current_page FROM links WHERE country = ?",
+                (country,),
+            )
+        }
+        completed = [
+            b
+            for (b,) in self._query(
+                "SELECT base_link FROM completed WHERE country = ? ORDER BY done_at", (country,)
+            )
+        ]
+        return {"enlaces": enlaces, "base_links_completados": completed}
+
+    @staticmethod
+    def _save_links(db, country: str, entries: Dict[str, Dict]) -> None:
+        db.executemany(
+            "INSERT OR REPLACE INTO links (country, link, start_page, end_page, current_page) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [
+                (country, link, e["start_page"], e["end_page"], e["current_page"])
+                for link, e in entries.items()
+            ],
+        )
+
+    def save_links(self, country: str, entries: Dict[str, Dict]) -> None:
+        with self.transaction() as db:
+            self._save_links(db, country, entries)
+
+    def complete(self, country: str, base_link: str) -> None:
+        with self.transaction() as db:
+            db.execute(
+                "INSERT OR IGNORE INTO completed (country, base_link, done_at) VALUES (?, ?, ?)",
+                (country, base_link, time.time()),
+            )
+
+    def reset_country(self, country: str) -> None:
+        """Borra progreso y resultados de un país (los snapshots se conservan)."""
+        with self.transaction() as db:
+            for table in ("links", "completed", "companies", "memberships"):
+                db.execute(f"DELETE FROM {table} WHERE country = ?", (country,))
+
+    # ─── empresas ───────────────────────────────────────────────────────────
+    @staticmethod
+    def _add_companies(db, country: str, records: Iterable[Dict]) -> Tuple[int, int]:
+        added = members = 0
+        for rec in records:
+            link = rec.get("link")
+            cur = db.execute(
+                "INSERT OR IGNORE INTO companies (country, company_link, link, data) "
+                "VALUES (?, ?, ?, ?)",
+                (country, rec["company_link"], link, _encode(rec)),
+            )
+            if cur.rowcount:
+                added += 1
+                continue
+            # ya vista: pertenencia extra si es otra sub‑industria
+            cur = db.execute(
+                "INSERT OR IGNORE INTO memberships "
+                "(country, company_link, link, sub_industry, page) "
+                "SELECT ?, ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM companies "
+                "WHERE country = ? AND company_link = ? AND link IS NOT ?)",
+                (
+                    country,
+                    rec["company_link"],
+                    link or "",
+                    rec.get("sub_industry"),
+                    rec.get("page"),
+                    country,
+                    rec["company_link"],
+                    link,
+                ),
+            )
+            members += cur.rowcount
+        return added, members
+
+    def commit_page(
+        self, country: str, records: Iterable[Dict], entries: Optional[Dict[str, Dict]] = None
+    ) -> Tuple[int, int]:
+        """
+        Registra los resultados de una página y el progreso de `entries`
+        (link → entrada) en una transacción. Devuelve (nuevas, pertenencias).
+        """
+        with self.transaction() as db:
+            counts = self._add_companies(db, country, records)
+            if entries:
+                self._save_links(db, country, entries)
+        return counts
+
+    def add_companies(self, country: str, records: Iterable[Dict]) -> Tuple[int, int]:
+        return self.commit_page(country, records)
+
+    def replace_companies(self, country: str, batches: Iterable[Iterable[Dict]]) -> int:
+        """Sustituye las empresas del país por las de `batches`, en una transacción."""
+        n = 0
+        with self.transaction() as db:
+            db.execute("DELETE FROM companies WHERE country = ?", (country,))
+            db.execute("DELETE FROM memberships WHERE country = ?", (country,))
+            for records in batches:
+                records = list(records)
+                self._add_companies(db, country, records)
+                n += len(records)
+        return n
+
+    def has_company(self, country: str, company_link: str) -> bool:
+        return bool(
+            self._query(
+                "SELECT 1 FROM companies WHERE country = ? AND company_link = ?",
+                (country, company_link),
+            )
+        )
+
+    def count_companies(self, country: str) -> int:
+        return self._query("SELECT COUNT(*) FROM companies WHERE country = ?", (country,))[0][0]
+
+    def iter_companies(self, country: str) -> Iterator[Dict]:
+        """Registros del país en orden de inserción, con "memberships" fusionado."""
+        for _, data in self._stream(_MERGED, (country,)):
+            yield json.loads(data)
+
+    def countries(self) -> List[str]:
+        rows = self._query("SELECT DISTINCT country FROM companies ORDER BY country")
+        return [c for (c,) in rows]
+
+    # ─── snapshots ──────────────────────────────────────────────────────────
+    def take_snapshot(self, country: str, keep: int = STORE_KEEP_SNAPSHOTS) -> int:
+        """
+        Copia los resultados actuales del país a un snapshot nuevo y borra
+        los más antiguos que excedan `keep` (0 = todos). Devuelve su id.
+        """
+        with self.transaction() as db:
+            sid = db.execute(
+                "INSERT INTO snapshots (country, taken_at, size) VALUES (?, ?, 0)",
+                (country, time.time()),
+            ).lastrowid
+            db.execute(
+                f"INSERT INTO snapshot_rows (snapshot, company_link, data) "
+                f"SELECT ?, * FROM ({_MERGED})",
+                (sid, country),
+            )
+            db.execute(
+                "UPDATE snapshots SET size = "
+                "(SELECT COUNT(*) FROM snapshot_rows WHERE snapshot = ?) WHERE id = ?",
+                (sid, sid),
+            )
+            if keep:
+                stale = (
+                    "SELECT id FROM snapshots WHERE country = ? "
+                    "ORDER BY id DESC LIMIT -1 OFFSET ?"
+                )
+                db.execute(
+                    f"DELETE FROM snapshot_rows WHERE snapshot IN ({stale})", (country, keep)
+                )
+                db.execute(f"DELETE FROM snapshots WHERE id IN ({stale})", (country, keep))
+        return sid
+
+    def snapshots(self, country: str) -> List[int]:
+        """Ids de los snapshots del país, del más antiguo al más reciente."""
+        return [
+            i
+            for (i,) in self._query(
+                "SELECT id FROM snapshots WHERE country = ? ORDER BY id", (country,)
+            )
+        ]
+
+    def iter_snapshot(self, snapshot: int) -> Iterator[Dict]:
+        for (data,) in self._stream(
+            "SELECT data FROM snapshot_rows WHERE snapshot = ?", (snapshot,)
+        ):
+            yield json.loads(data)
+
+    def snapshot_changes(self, old: int, new: int) -> Iterator[Tuple[str, Dict, Optional[Dict]]]:
+        """
+        Diferencias entre dos snapshots con búsquedas por índice:
+        ("added", rec, None), ("removed", rec, None) y ("changed", old, new)
+        para los company_link cuyo registro difiere.
+        """
+        missing = (
+            "SELECT a.data, NULL FROM snapshot_rows a WHERE a.snapshot = ? AND NOT EXISTS "
+            "(SELECT 1 FROM snapshot_rows b "
+            "WHERE b.snapshot = ? AND b.company_link = a.company_link)"
+        )
+        queries = (
+            ("added", missing, (new, old)),
+            ("removed", missing, (old, new)),
+            (
+                "changed",
+                "SELECT o.data, n.data FROM snapshot_rows n JOIN snapshot_rows o "
+                "ON o.snapshot = ? AND o.company_link = n.company_link "
+                "WHERE n.snapshot = ? AND o.data != n.data",
+                (old, new),
+            ),
+        )
+        for kind, sql, params in queries:
+            for a, b in self._stream(sql, params):
+                yield kind, json.loads(a), None if b is None else json.loads(b)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_backend = STORAGE_BACKEND
+_stores: Dict[Tuple[int, str], Store] = {}
+_stores_lock = threading.Lock()
+
+
+def set_backend(name: str) -> None:
+    """Cambia el backend de persistencia del proceso: "json" o "sqlite"."""
+    global _backend
+    if name not in ("json", "sqlite"):
+        raise ValueError(f"backend de almacenamiento desconocido: {name}")
+    _backend = name
+
+
+def use_sqlite() -> bool:
+    return _backend == "sqlite"
+
+
+def process_pool(workers: int, mp_context=None) -> ProcessPoolExecutor:
+    """
+    ProcessPoolExecutor cuyos procesos usan el backend de este proceso: con
+    spawn (Windows) los hijos reimportan la config y volverían a STORAGE_BACKEND.
+    """
+    return ProcessPoolExecutor(
+        max_workers=workers, mp_context=mp_context, initializer=set_backend, initargs=(_backend,)
+    )
+
+
+def get_store(path: str = STORE_PATH) -> Store:
+    """Store compartido del proceso para `path` (uno nuevo tras un fork)."""
+    key = (os.getpid(), os.path.abspath(path))
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = Store(path)
+        return store
+
+
+def document_key(path: str) -> str:
+    """Clave de documento para la ruta de un JSON (normalizada, con /)."""
+    return os.path.normpath(path).replace(os.sep, "/")
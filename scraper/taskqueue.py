@@ -0,0 +1,354 @@
+import os
+import time
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from .config import (
+    TASKQUEUE_PATH,
+    TASK_LEASE_SECONDS,
+    TASK_MAX_ATTEMPTS,
+    TASK_RETRY_DELAY,
+)
+
+logger = logging.getLogger(__name__)
+
+PENDING, IN_FLIGHT, DONE, FAILED = "pending", "in_flight", "done", "failed"
+# tipos de tarea, por orden de prioridad
+BASE, PLAN, PAGE, VERTICAL = "base", "plan", "page", "vertical"
+_PRIORITY = {BASE: 0, PLAN: 1, PAGE: 2, VERTICAL: 2}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind        TEXT NOT NULL,     -- base | plan | page | vertical
+    country     TEXT NOT NULL,
+    base_link   TEXT NOT NULL,
+    vertical    TEXT NOT NULL,     -- '' en las tareas base
+    page        INTEGER NOT NULL,  -- 0 salvo en las tareas page
+    priority    INTEGER NOT NULL,
+    state       TEXT NOT NULL,     -- pending | in_flight | done | failed
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    not_before  REAL NOT NULL DEFAULT 0,  -- reintento diferido
+    lease_until REAL,
+    worker      TEXT,
+    error       TEXT,
+    synced      INTEGER NOT NULL DEFAULT 1,  -- 0: hecha, su checkpoint aún sin escribir
+    updated_at  REAL NOT NULL,
+    UNIQUE (country, kind, base_link, vertical, page)
+);
+CREATE INDEX IF NOT EXISTS tasks_ready ON tasks (state, priority, not_before);
+CREATE INDEX IF NOT EXISTS tasks_vertical ON tasks (country, vertical, state);
+CREATE INDEX IF NOT EXISTS tasks_base ON tasks (country, base_link, state);
+"""
+
+
+class Task(NamedTuple):
+    id: int
+    kind: str
+    country: str
+    base_link: str
+    vertical: str
+    page: int
+    attempts: int
+
+
+class TaskQueue:
+    """
+    Cola persistente (SQLite, WAL) de las tareas del scraping: una por
+    base_link (descubrir verticales), por vertical (estimar páginas o,
+    si no se pudo, recorrerla entera) y por URL paginada.
+    - lease() reparte tareas pendientes (o con la concesión caducada) en
+      una transacción, así que varios hilos o procesos pueden consumirla.
+    - fail() devuelve la tarea a pendiente con un retraso creciente hasta
+      `max_attempts` intentos; después queda en failed.
+    - renew() prolonga la concesión de una tarea larga mientras se ejecuta.
+    - done(synced=False) marca una tarea cuyo resultado aún no está en el
+      checkpoint; reopen_unsynced() la repite si el proceso cayó antes.
+    Las tareas se identifican por (país, tipo, base_link, vertical, página):
+    añadir una tarea existente no hace nada.
+    """
+
+    def __init__(
+        self,
+        path: str = TASKQUEUE_PATH,
+        lease: float = TASK_LEASE_SECONDS,
+        max_attempts: int = TASK_MAX_ATTEMPTS,
+        retry_delay: float = TASK_RETRY_DELAY,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.lease_seconds = lease
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.clock = clock
+        dirpath = os.path.dirname(path)
+        if dirpath:
+            os.makedirs(dirpath, exist_ok=True)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(tasks)")}
+        if "synced" not in columns:  # colas creadas antes de la columna
+            self._db.execute("ALTER TABLE tasks ADD COLUMN synced INTEGER NOT NULL DEFAULT 1")
+        self._depth = 0
+
+    @contextmanager
+    def transaction(self):
+        """
+        Transacción de escritura. Es anidable: las operaciones hechas dentro
+        (add, done, complete…) se confirman juntas o no se confirma ninguna.
+        """
+        with self._lock:
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield self._db
+                finally:
+                    self._depth -= 1
+                return
+            self._db.execute("BEGIN IMMEDIATE")
+            self._depth = 1
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            finally:
+                self._depth = 0
+            self._db.execute("COMMIT")
+
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    # ── alta ──────────────────────────────────────────────────────────────
+    def add(
+        self,
+        kind: str,
+        country: str,
+        base_link: str,
+        vertical: str = "",
+        pages: Iterable[int] = (0,),
+    ) -> int:
+        """Encola tareas (una por página); devuelve cuántas eran nuevas."""
+        now = self.clock()
+        rows = [
+            (kind, country, base_link, vertical, p, _PRIORITY[kind], PENDING, now) for p in pages
+        ]
+        with self.transaction() as db:
+            before = db.total_changes
+            db.executemany(
+                "INSERT OR IGNORE INTO tasks "
+                "(kind, country, base_link, vertical, page, priority, state, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            return db.total_changes - before
+
+    # ── consumo ───────────────────────────────────────────────────────────
+    def lease(self, worker: str, countries: Optional[List[str]] = None) -> Optional[Task]:
+        """
+        Toma la siguiente tarea lista (pendiente o con la concesión caducada)
+        por prioridad y antigüedad; None si no hay ninguna lista ahora.
+        """
+        now = self.clock()
+        where, params = "", ()
+        if countries is not None:
+            where = f" AND country IN ({','.join('?' * len(countries))})"
+            params = tuple(countries)
+        with self.transaction() as db:
+            row = db.execute(
+                "SELECT id, kind, country, base_link, vertical, page, attempts FROM tasks "
+                "WHERE ((state = ? AND not_before <= ?) OR (state = ? AND lease_until < ?))"
+                f"{where} ORDER BY priority, not_before, id LIMIT 1",
+                (PENDING, now, IN_FLIGHT, now) + params,
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE tasks SET state = ?, attempts = attempts + 1, lease_until = ?, "
+                "worker = ?, updated_at = ? WHERE id = ?",
+                (IN_FLIGHT, now + self.lease_seconds, worker, now, row[0]),
+            )
+        task = Task(*row)
+        return task._replace(attempts=task.attempts + 1)
+
+    def done(self, task: Task, synced: bool = True) -> None:
+        """
+        Da por hecha la tarea. Con synced=False su resultado aún no está en
+        el checkpoint escrito: si el proceso cae antes de mark_synced(),
+        reopen_unsynced() la devuelve a la cola.
+        """
+        with self.transaction() as db:
+            db.execute(
+                "UPDATE tasks SET state = ?, lease_until = NULL, error = NULL, synced = ?, "
+                "updated_at = ? WHERE id = ?",
+                (DONE, int(synced), self.clock(), task.id),
+            )
+
+    def complete(
+        self,
+        kind: str,
+        country: str,
+        base_link: str,
+        vertical: str,
+        page: int,
+        synced: bool = True,
+    ) -> None:
+        """Da por hecha una tarea por su clave (p. ej. una página ya descargada al planificar)."""
+        with self.transaction() as db:
+            db.execute(
+                "UPDATE tasks SET state = ?, lease_until = NULL, synced = ?, updated_at = ? "
+                "WHERE country = ? AND kind = ? AND base_link = ? AND vertical = ? AND page = ?",
+                (DONE, int(synced), self.clock(), country, kind, base_link, vertical, page),
+            )
+
+    def renew(self, task: Task, worker: str) -> bool:
+        """Prolonga la concesión de una tarea en curso si aún la tiene `worker`."""
+        now = self.clock()
+        with self.transaction() as db:
+            cur = db.execute(
+                "UPDATE tasks SET lease_until = ?, updated_at = ? "
+                "WHERE id = ? AND state = ? AND worker = ? AND lease_until >= ?",
+                (now + self.lease_seconds, now, task.id, IN_FLIGHT, worker, now),
+            )
+            return cur.rowcount == 1
+
+    def mark_synced(self, country: str) -> int:
+        """Tras escribir el checkpoint del país: sus tareas hechas ya son definitivas."""
+        with self.transaction() as db:
+            cur = db.execute(
+                "UPDATE tasks SET synced = 1 WHERE country = ? AND synced = 0", (country,)
+            )
+            return cur.rowcount
+
+    def fail(self, task: Task, error: str) -> str:
+        """Reintento diferido o, agotados los intentos, failed. Devuelve el estado."""
+        now = self.clock()
+        state = FAILED if task.attempts >= self.max_attempts else PENDING
+        with self.transaction() as db:
+            db.execute(
+                "UPDATE tasks SET state = ?, not_before = ?, lease_until = NULL, error = ?, "
+                "updated_at = ? WHERE id = ?",
+                (state, now + self.retry_delay * task.attempts, error[:500], now, task.id),
+            )
+        return state
+
+    def drop_pages(self, country: str, vertical: str, after: int) -> int:
+        """Quita las tareas page pendientes de una vertical más allá de `after`."""
+        with self.transaction() as db:
+            cur = db.execute(
+                "DELETE FROM tasks WHERE country = ? AND vertical = ? AND kind = ? "
+                "AND page > ? AND state IN (?, ?)",
+                (country, vertical, PAGE, after, PENDING, FAILED),
+            )
+            return cur.rowcount
+
+    # ── consultas ─────────────────────────────────────────────────────────
+    def get(self, task_id: int) -> Optional[Task]:
+        rows = self._query(
+            "SELECT id, kind, country, base_link, vertical, page, attempts FROM tasks WHERE id = ?",
+            (task_id,),
+        )
+        return Task(*rows[0]) if rows else None
+
+    def holder(self, task_id: int) -> Optional[str]:
+        """Worker que tiene concedida la tarea ahora mismo (None si no está en curso)."""
+        rows = self._query(
+            "SELECT worker FROM tasks WHERE id = ? AND state = ? AND lease_until >= ?",
+            (task_id, IN_FLIGHT, self.clock()),
+        )
+        return rows[0][0] if rows else None
+
+    def open_count(
+        self,
+        countries: Optional[List[str]] = None,
+        base_link: Optional[str] = None,
+        vertical: Optional[str] = None,
+        failed: bool = False,
+    ) -> int:
+        """Tareas sin terminar (pendientes o en curso; con failed=True, también fallidas)."""
+        states = (PENDING, IN_FLIGHT, FAILED) if failed else (PENDING, IN_FLIGHT)
+        sql = f"SELECT COUNT(*) FROM tasks WHERE state IN ({','.join('?' * len(states))})"
+        params: tuple = states
+        if countries is not None:
+            sql += f" AND country IN ({','.join('?' * len(countries))})"
+            params += tuple(countries)
+        if base_link is not None:
+            sql += " AND base_link = ?"
+            params += (base_link,)
+        if vertical is not None:
+            sql += " AND vertical = ?"
+            params += (vertical,)
+        return self._query(sql, params)[0][0]
+
+    def verticals(self, country: str, base_link: str) -> List[str]:
+        """Verticales encoladas de un base_link (en orden de alta)."""
+        rows = self._query(
+            "SELECT vertical FROM tasks WHERE country = ? AND base_link = ? AND kind = ? "
+            "ORDER BY id",
+            (country, base_link, PLAN),
+        )
+        return [r[0] for r in rows]
+
+    def counts(self, countries: Optional[List[str]] = None) -> Dict[str, Dict[str, int]]:
+        """Progreso por país: {país: {estado: tareas}}."""
+        sql, params = "SELECT country, state, COUNT(*) FROM tasks", ()
+        if countries is not None:
+            sql += f" WHERE country IN ({','.join('?' * len(countries))})"
+            params = tuple(countries)
+        out: Dict[str, Dict[str, int]] = {}
+        for country, state, n in self._query(sql + " GROUP BY country, state", params):
+            out.setdefault(country, {})[state] = n
+        return out
+
+    def failures(self, country: str) -> List[tuple]:
+        """(tipo, vertical, página, intentos, error) de las tareas fallidas."""
+        return self._query(
+            "SELECT kind, vertical, page, attempts, error FROM tasks "
+            "WHERE country = ? AND state = ? ORDER BY id",
+            (country, FAILED),
+        )
+
+    # ── mantenimiento ─────────────────────────────────────────────────────
+    def retry_failed(self, country: str) -> int:
+        """Devuelve las tareas fallidas a pendiente con los intentos a cero."""
+        with self.transaction() as db:
+            cur = db.execute(
+                "UPDATE tasks SET state = ?, attempts = 0, not_before = 0, updated_at = ? "
+                "WHERE country = ? AND state = ?",
+                (PENDING, self.clock(), country, FAILED),
+            )
+            return cur.rowcount
+
+    def reopen_unsynced(self, country: str) -> int:
+        """
+        Devuelve a pendiente las tareas hechas cuyo resultado no llegó al
+        checkpoint (el proceso cayó entre dos escrituras).
+        """
+        with self.transaction() as db:
+            cur = db.execute(
+                "UPDATE tasks SET state = ?, synced = 1, not_before = 0, updated_at = ? "
+                "WHERE country = ? AND state = ? AND synced = 0",
+                (PENDING, self.clock(), country, DONE),
+            )
+            return cur.rowcount
+
+    def reset(self, country: str) -> None:
+        with self.transaction() as db:
+            db.execute("DELETE FROM tasks WHERE country = ?", (country,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -2,14 +2,57 @@
 import argparse
 import logging
 import os
+from urllib.parse import unquote
 
-from .core import scrape_country, scrape_countries
-from .diff import compute_diff
-from .config import INPUT_DIR_1, CONFIG_DIR
+from .cache import PageCache
+from .core import scrape_countries, compact_results, replay_countries
+from .diff import diff_countries
+from .proxies import validate_proxies, write_validated
+from .store import get_store, set_backend, use_sqlite
+from .utils import cargar_proxies
+from .config import (
+    INPUT_DIR_1,
+    OUTPUT_DIR_1,
+    CONFIG_DIR,
+    FETCH_BACKEND,
+    PROXY_LIST_FILE,
+    PROXY_CHECK_URL,
+    DIFF_FIELDS,
+    DIFF_REVENUE_THRESHOLD,
+    DIFF_ENGINE,
+    PARQUET_DIR,
+    COORDINATOR_HOST,
+    COORDINATOR_PORT,
+    STORAGE_BACKEND,
+    STORE_PATH,
+)
 
 logger = logging.getLogger(__name__)
 
 
+def list_countries(directory: str = INPUT_DIR_1, ext: str = ".json") -> list:
+    """Países disponibles en un directorio (un fichero por país)."""
+    if not os.path.isdir(directory):
+        return []
+    files = sorted(f for f in os.listdir(directory) if f.endswith(ext))
+    return [f[: -len(ext)] for f in files]
+
+
+def list_snapshot_countries(directory: str) -> list:
+    """
+    Países de un directorio de snapshots del diff: ficheros {país}.json(l)
+    o particiones Parquet country=<país> (ver --export-parquet).
+    """
+    if not os.path.isdir(directory):
+        return []
+    parts = [
+        unquote(d[len("country="):]) for d in os.listdir(directory) if d.startswith("country=")
+    ]
+    return sorted(
+        set(list_countries(directory)) | set(list_countries(directory, ".jsonl")) | set(parts)
+    )
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="DNB Scraper: batch, subset or single‑country modes"
@@ -31,7 +74,263 @@ def main():
         action="store_true",
         help="Generate change report after scraping"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Number of parallel browser workers (each with its own proxies)"
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["auto", "http", "browser"],
+        default=FETCH_BACKEND,
+        help="Page fetch backend: plain HTTP with browser fallback on challenge (auto), "
+             "HTTP only or Selenium only"
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Only rebuild the per-country JSON files from their JSONL result streams"
+    )
+    parser.add_argument(
+        "--validate-proxies",
+        action="store_true",
+        help=f"Only probe every proxy in {PROXY_LIST_FILE} and write the ranked list of viable ones"
+    )
+    parser.add_argument(
+        "--probe-url",
+        default=PROXY_CHECK_URL,
+        help="Target URL used by --validate-proxies"
+    )
+    parser.add_argument(
+        "--diff-only",
+        action="store_true",
+        help="Only generate change reports (no scraping)"
+    )
+    parser.add_argument(
+        "--diff-workers",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Processes used to diff countries in parallel (default: one per CPU)"
+    )
+    parser.add_argument(
+        "--force-diff",
+        action="store_true",
+        help="Re-diff countries even if their snapshots did not change since the last report"
+    )
+    parser.add_argument(
+        "--diff-fields",
+        nargs="+",
+        default=list(DIFF_FIELDS),
+        choices=["company_name", "sub_industry", "page", "revenue", "location"],
+        metavar="FIELD",
+        help=f"Fields compared by the diff (default: {' '.join(DIFF_FIELDS)})"
+    )
+    parser.add_argument(
+        "--revenue-threshold",
+        type=float,
+        default=DIFF_REVENUE_THRESHOLD,
+        metavar="RATIO",
+        help="Only report revenue changes larger than this relative change (0.1 = 10%%)"
+    )
+    parser.add_argument(
+        "--diff-engine",
+        choices=["auto", "numpy", "stream", "store"],
+        default=DIFF_ENGINE,
+        help="Vectorized in-memory engine (numpy), memory-bounded streaming engine, "
+             "or the last two snapshots of the SQLite store (store)"
+    )
+    parser.add_argument(
+        "--diff-columns",
+        nargs="+",
+        default=None,
+        metavar="COLUMN",
+        help="Only load these record columns for the diff report (default: whole records)"
+    )
+    parser.add_argument(
+        "--diff-old",
+        default="data/companies_by_country_old",
+        metavar="DIR",
+        help="Previous snapshots for the diff: {country}.json(l) files or a Parquet export "
+             f"(e.g. a copy of {PARQUET_DIR}) (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--diff-new",
+        default="data/companies_by_country",
+        metavar="DIR",
+        help=f"Current snapshots for the diff, same formats as --diff-old (e.g. {PARQUET_DIR}); "
+             "Parquet sources only read the needed columns (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--export-parquet",
+        action="store_true",
+        help=f"Only export the per-country results to Parquet under {PARQUET_DIR}, "
+             "partitioned by country and sub_industry (requires pyarrow)"
+    )
+    parser.add_argument(
+        "--storage",
+        choices=["json", "sqlite"],
+        default=STORAGE_BACKEND,
+        help=f"Where progress, results and snapshots are kept: JSON files or {STORE_PATH} (WAL)"
+    )
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help="Rebuild the per-country results from the page cache only (no network)"
+    )
+    parser.add_argument(
+        "--queue-status",
+        action="store_true",
+        help="Show task-queue progress per country (pending/in_flight/done/failed) and exit"
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Incremental re-scrape: sample pages per vertical and only walk the ones that changed"
+    )
+    parser.add_argument(
+        "--coordinator",
+        action="store_true",
+        help="Distributed mode: own the task queue and serve tasks over HTTP to remote workers"
+    )
+    parser.add_argument(
+        "--bind",
+        default=f"{COORDINATOR_HOST}:{COORDINATOR_PORT}",
+        metavar="HOST:PORT",
+        help="Address the coordinator listens on (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--worker",
+        metavar="URL",
+        help="Distributed mode: fetch tasks from the coordinator at URL (uses --workers/--backend)"
+    )
     args = parser.parse_args()
+    set_backend(args.storage)
+    diff_kw = dict(
+        old_dir=args.diff_old,
+        new_dir=args.diff_new,
+        workers=args.diff_workers,
+        force=args.force_diff,
+        fields=tuple(args.diff_fields),
+        revenue_threshold=args.revenue_threshold,
+        engine=args.diff_engine,
+        columns=args.diff_columns,
+    )
+
+    if args.validate_proxies:
+        # ─── Proxy validation mode ──────────────────────────────────────────────
+        results = validate_proxies(cargar_proxies(PROXY_LIST_FILE), target=args.probe_url)
+        for r in results:
+            logger.info(
+                f"[*] {r['proxy']}: {'ok' if r['ok'] else 'KO'} "
+                f"connect={r['connect_s']}s total={r['total_s']}s "
+                f"{r['throughput_kbps']} KB/s {r['error'] or r['page_status']}"
+            )
+        write_validated(results)
+        return
+
+    if args.queue_status:
+        # ─── Task-queue status ──────────────────────────────────────────────────
+        from .taskqueue import TaskQueue
+
+        targets = [args.country] if args.country else args.countries
+        with TaskQueue() as tasks:
+            for country, counts in sorted(tasks.counts(targets).items()):
+                logger.info(f"[*] {country}: {counts}")
+                for kind, vertical, page, attempts, error in tasks.failures(country):
+                    logger.info(f"    failed {kind} {vertical} p{page} ({attempts}x): {error}")
+        return
+
+    if args.replay:
+        # ─── Replay mode ────────────────────────────────────────────────────────
+        if args.country or args.countries:
+            targets = [args.country] if args.country else args.countries
+        else:
+            with PageCache() as cache:
+                targets = cache.countries()
+        logger.info(f"[*] Replay mode: re-extracting {targets} from the page cache")
+        for country, n in replay_countries(targets, workers=args.workers).items():
+            logger.info(f"[*] {country}: {n} records rebuilt")
+        if args.diff:
+            diff_countries(targets, **diff_kw)
+        return
+
+    if args.diff_only:
+        # ─── Diff mode ──────────────────────────────────────────────────────────
+        targets = (
+            [args.country] if args.country
+            else args.countries or list_snapshot_countries(args.diff_new)
+        )
+        logger.info(f"[*] Diff mode: {targets}")
+        diff_countries(targets, **diff_kw)
+        return
+
+    if args.export_parquet:
+        # ─── Parquet export mode ────────────────────────────────────────────────
+        from .export import export_countries
+
+        targets = (
+            [args.country] if args.country
+            else args.countries or sorted(
+                set(list_countries(OUTPUT_DIR_1)) | set(list_countries(OUTPUT_DIR_1, ".jsonl"))
+            )
+        )
+        for country, n in export_countries(targets, workers=args.workers).items():
+            logger.info(f"[*] {country}: {n} records exported")
+        return
+
+    if args.compact:
+        # ─── Compact mode ───────────────────────────────────────────────────────
+        targets = (
+            [args.country] if args.country
+            else args.countries or (
+                get_store().countries() if use_sqlite() else list_countries(OUTPUT_DIR_1, ".jsonl")
+            )
+        )
+        for country in targets:
+            n = compact_results(country)
+            logger.info(f"[*] {country}: {n} records compacted")
+        return
+
+    if args.worker:
+        # ─── Distributed worker ─────────────────────────────────────────────────
+        from .coordinator import run_remote_workers
+
+        logger.info(f"[*] Worker mode: {args.workers} workers → {args.worker}")
+        done = run_remote_workers(args.worker, workers=args.workers, backend=args.backend)
+        logger.info(f"[*] Tasks done per worker: {done}")
+        return
+
+    if args.coordinator:
+        # ─── Distributed coordinator ────────────────────────────────────────────
+        from .coordinator import run_coordinator
+
+        os.makedirs(CONFIG_DIR, exist_ok=True)
+        host, _, port = args.bind.rpartition(":")
+        targets = [args.country] if args.country else args.countries or list_countries()
+        logger.info(f"[*] Coordinator mode on {args.bind}: {targets}")
+        counts = run_coordinator(
+            targets, host=host or COORDINATOR_HOST, port=int(port), reset=bool(args.country)
+        )
+        for country, n in sorted(counts.items()):
+            logger.info(f"[*] {country}: {n}")
+        if args.diff:
+            diff_countries(targets, **diff_kw)
+        return
+
+    if args.refresh:
+        # ─── Refresh mode ───────────────────────────────────────────────────────
+        from .refresh import refresh_countries
+
+        targets = [args.country] if args.country else args.countries or list_countries()
+        logger.info(f"[*] Refresh mode: {targets}")
+        for country, stats in refresh_countries(targets, backend=args.backend).items():
+            logger.info(f"[*] {country}: {stats}")
+        if args.diff:
+            diff_countries(targets, **diff_kw)
+        return
 
     # Asegurarnos de que exista la carpeta de configs
     os.makedirs(CONFIG_DIR, exist_ok=True)
@@ -40,11 +339,13 @@ def main():
         # ─── Single‑country mode ─────────────────────────────────────────────────
         country = args.country
         logger.info(f"[*] Single‑country mode: force re‑scrape {country}")
-        scrape_country(country, reset=True)
+        scrape_countries(
+            [country], reset=True, workers=args.workers, backend=args.backend
+        )
 
         if args.diff:
             logger.info(f"[*] Generating diff for {country}")
-            compute_diff(country)
+            diff_countries([country], **diff_kw)
 
     else:
         # ─── Batch / Subset mode ────────────────────────────────────────────────
@@ -53,17 +354,15 @@ def main():
             logger.info(f"[*] Subset mode: processing {targets}")
         else:
             # Batch A→Z: todos los países que falten por completar
-            files = sorted(f for f in os.listdir(INPUT_DIR_1) if f.endswith(".json"))
-            targets = [os.path.splitext(f)[0] for f in files]
+            targets = list_countries()
             logger.info(f"[*] Batch mode: processing all countries → {targets}")
 
         # Ejecutar scraping de todos los targets (va saltando los completados)
-        scrape_countries(targets)
+        scrape_countries(targets, workers=args.workers, backend=args.backend)
 
         if args.diff:
-            for country in targets:
-                logger.info(f"[*] Generating diff for {country}")
-                compute_diff(country)
+            logger.info(f"[*] Generating diffs for {len(targets)} countries")
+            diff_countries(targets, **diff_kw)
 
 
 if __name__ == '__main__':
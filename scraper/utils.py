@@ -1,9 +1,15 @@
 import os
 import json
-from typing import List
+import time
+import logging
+from itertools import islice
+from typing import Iterable, Iterator, List
 
+from scraper.config import RESULTS_FSYNC_EVERY, RESULTS_FSYNC_INTERVAL
 from scraper.driver_factory import BASE_URL
 
+logger = logging.getLogger(__name__)
+
 
 def cargar_proxies(filepath: str) -> List[str]:
     """
@@ -59,3 +65,236 @@ def save_json(path: str, obj) -> None:
     os.makedirs(os.path.dirname(path), exist_ok=True)
     with open(path, "w", encoding="utf-8") as f:
         json.dump(obj, f, indent=2, ensure_ascii=False)
+
+
+def save_json_atomic(path: str, obj) -> None:
+    """
+    Guarda un objeto como JSON de forma atómica: escribe en un fichero
+    temporal, hace fsync y lo renombra sobre el destino.
+    """
+    dirpath = os.path.dirname(path)
+    if dirpath:
+        os.makedirs(dirpath, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, indent=2, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def recover_jsonl(path: str) -> int:
+    """
+    Recupera la cola de un fichero JSONL tras un corte: como cada registro
+    termina en salto de línea, se trunca todo lo escrito tras el último.
+    Devuelve el número de bytes descartados.
+    """
+    if not os.path.exists(path):
+        return 0
+    size = os.path.getsize(path)
+    if size == 0:
+        return 0
+    with open(path, "rb+") as f:
+        pos = size
+        while pos > 0:
+            step = min(4096, pos)
+            f.seek(pos - step)
+            chunk = f.read(step)
+            if pos == size and chunk.endswith(b"\n"):
+                return 0
+            nl = chunk.rfind(b"\n")
+            if nl != -1:
+                pos = pos - step + nl + 1
+                break
+            pos -= step
+        f.truncate(pos)
+    return size - pos
+
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    """Agrupa un iterable en listas de hasta `size` elementos."""
+    it = iter(items)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+def read_jsonl(path: str) -> Iterator[dict]:
+    """Itera los registros de un fichero JSONL, uno por línea."""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+MEMBER_KEY = "member_of"  # línea de pertenencia extra (ver scraper.dedup)
+
+
+def read_results_jsonl(path: str) -> Iterator[dict]:
+    """
+    Itera los registros completos de un stream de resultados, fusionando
+    las líneas de pertenencia ({"company_link", "member_of": {...}}) en el
+    campo "memberships" de su registro. Dos pasadas: la primera solo
+    decodifica las líneas de pertenencia.
+    """
+    members = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if f'"{MEMBER_KEY}"' in line:
+                    rec = json.loads(line)
+                    members.setdefault(rec["company_link"], []).append(rec[MEMBER_KEY])
+    for rec in read_jsonl(path):
+        if MEMBER_KEY in rec:
+            continue
+        extra = members.get(rec["company_link"]) if members else None
+        if extra:
+            rec["memberships"] = extra
+        yield rec
+
+
+_JSON_WS = " \t\r\n"
+
+
+def iter_json_array(path: str, chunk_size: int = 1 << 20) -> Iterator:
+    """
+    Itera los elementos de un fichero con un array JSON sin cargarlo entero:
+    lee en bloques de `chunk_size` caracteres y decodifica con raw_decode.
+    """
+    if not os.path.exists(path):
+        return
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf, pos, eof = "", 0, False
+        started = False
+        while True:
+            while pos < len(buf) and (buf[pos] in _JSON_WS or (started and buf[pos] == ",")):
+                pos += 1
+            if pos >= len(buf):
+                if eof:
+                    if started:
+                        raise ValueError(f"{path}: array JSON sin cerrar")
+                    return
+                buf, pos = f.read(chunk_size), 0
+                eof = not buf
+                continue
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError(f"{path}: no es un array JSON")
+                started, pos = True, pos + 1
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                obj, end = None, None
+            if end is None or (end == len(buf) and not eof):
+                # elemento partido entre bloques: leer más
+                more = f.read(chunk_size)
+                if not more:
+                    if end is None:
+                        raise ValueError(f"{path}: JSON truncado")
+                    eof = True
+                buf, pos = buf[pos:] + more, 0
+                continue
+            yield obj
+            pos = end
+
+
+class JsonlWriter:
+    """
+    Escritor append-only de registros JSON, uno por línea.
+    Cada escritura se vuelca al sistema operativo; el fsync a disco se hace
+    cada `fsync_every` registros o `fsync_interval` segundos.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fsync_every: int = RESULTS_FSYNC_EVERY,
+        fsync_interval: float = RESULTS_FSYNC_INTERVAL,
+    ):
+        dirpath = os.path.dirname(path)
+        if dirpath:
+            os.makedirs(dirpath, exist_ok=True)
+        dropped = recover_jsonl(path)
+        if dropped:
+            logger.warning(f"{path}: descartados {dropped} bytes de una línea incompleta")
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._f = open(path, "ab")
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def write(self, records: Iterable[dict]) -> None:
+        data = b"".join(
+            json.dumps(r, ensure_ascii=False).encode("utf-8") + b"\n" for r in records
+        )
+        if not data:
+            return
+        self._f.write(data)
+        self._f.flush()
+        self._pending += data.count(b"\n")
+        if (
+            self._pending >= self.fsync_every
+            or time.monotonic() - self._last_sync >= self.fsync_interval
+        ):
+            self.sync()
+
+    def sync(self) -> None:
+        """Fuerza el volcado a disco (fsync)."""
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def tell(self) -> int:
+        """Offset en bytes del final de lo escrito."""
+        return self._f.tell()
+
+    def close(self) -> None:
+        if not self._f.closed:
+            self.sync()
+            self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_json_array(records: Iterable[dict], json_path: str) -> int:
+    """
+    Escribe `records` en `json_path` como array JSON (mismo formato que
+    save_json), en streaming y con reemplazo atómico. Devuelve cuántos.
+    """
+    dirpath = os.path.dirname(json_path)
+    if dirpath:
+        os.makedirs(dirpath, exist_ok=True)
+    tmp = json_path + ".tmp"
+    n = 0
+    with open(tmp, "w", encoding="utf-8") as f:
+        for rec in records:
+            body = json.dumps(rec, indent=2, ensure_ascii=False).replace("\n", "\n  ")
+            f.write(("[\n  " if n == 0 else ",\n  ") + body)
+            n += 1
+        f.write("\n]" if n else "[]")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, json_path)
+    return n
+
+
+def compact_jsonl(jsonl_path: str, json_path: str) -> int:
+    """
+    Genera `json_path` como array JSON (mismo formato que save_json) a partir
+    del JSONL, en streaming y con reemplazo atómico. Las pertenencias extra
+    de empresas deduplicadas se fusionan en su registro ("memberships").
+    Devuelve el número de registros escritos.
+    """
+    return write_json_array(read_results_jsonl(jsonl_path), json_path)
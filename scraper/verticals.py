@@ -0,0 +1,113 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urljoin
+
+from .config import MAX_RETRIES, VERTICALS_DIR, VERTICALS_TTL, VERTICALS_WORKERS
+from .driver_factory import BASE_URL
+from .extractor import extract_verticals
+from .utils import load_json, save_json_atomic
+
+logger = logging.getLogger(__name__)
+
+
+def discover(base_link: str, fetcher, retries: int = MAX_RETRIES) -> Optional[List[str]]:
+    """
+    Enlaces absolutos de las verticales A→Z de una sub‑industria; el propio
+    enlace base si no hay paginación alfabética. None si la página no se
+    pudo leer (bloqueo o error persistente): ese resultado no se indexa.
+    """
+    full_base = BASE_URL + base_link
+    for attempt in range(1, retries + 1):
+        try:
+            res = fetcher.fetch(full_base)
+            if res.page_status.blocked:
+                raise Exception(f"Bloqueo: {res.page_status.value}")
+            return [urljoin(full_base, v) for v in extract_verticals(res.html)] or [full_base]
+        except Exception as e:
+            logger.warning(f"error verticales {full_base}: {e}, retry {attempt}/{retries}")
+    return None
+
+
+class VerticalIndex:
+    """
+    Índice persistente base_link → verticales A→Z de un país, en
+    VERTICALS_DIR/{país}.json: {base_link: {"verticals": [...], "ts": epoch}}.
+    Las entradas caducan a los `ttl` segundos (0 = nunca).
+    """
+
+    def __init__(
+        self,
+        country: str,
+        root: str = VERTICALS_DIR,
+        ttl: float = VERTICALS_TTL,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = os.path.join(root, f"{country}.json")
+        self.ttl = ttl
+        self.clock = clock
+        self.data: Dict[str, Dict] = load_json(self.path, {})
+        self.lock = threading.Lock()
+        self._dirty = False
+
+    def get(self, base_link: str) -> Optional[List[str]]:
+        """Verticales indexadas y vigentes, o None."""
+        item = self.data.get(base_link)
+        if item is None or (self.ttl and self.clock() - item["ts"] > self.ttl):
+            return None
+        return item["verticals"]
+
+    def put(self, base_link: str, verticals: List[str]) -> None:
+        with self.lock:
+            self.data[base_link] = {"verticals": list(verticals), "ts": self.clock()}
+            self._dirty = True
+
+    def missing(self, base_links: List[str]) -> List[str]:
+        """base_links sin entrada vigente."""
+        return [b for b in base_links if self.get(b) is None]
+
+    def save(self) -> None:
+        with self.lock:
+            if self._dirty:
+                save_json_atomic(self.path, self.data)
+                self._dirty = False
+
+
+def resolve_verticals(index: VerticalIndex, base_link: str, fetcher) -> List[str]:
+    """Verticales de un base_link: del índice o descubiertas (y anotadas)."""
+    verticals = index.get(base_link)
+    if verticals is not None:
+        return verticals
+    verticals = discover(base_link, fetcher)
+    if verticals is None:
+        return [BASE_URL + base_link]
+    index.put(base_link, verticals)
+    return verticals
+
+
+def discover_verticals(
+    index: VerticalIndex,
+    base_links: List[str],
+    fetcher,
+    workers: int = VERTICALS_WORKERS,
+) -> int:
+    """
+    Resuelve en paralelo las verticales de los base_links que no están en el
+    índice (o caducaron) y guarda el índice. Devuelve cuántos se descubrieron.
+    """
+    todo = index.missing(base_links)
+    if not todo:
+        return 0
+    logger.info(f"descubriendo verticales de {len(todo)} base_links ({workers} en paralelo)")
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(todo)))) as pool:
+        found = list(pool.map(lambda b: (b, discover(b, fetcher)), todo))
+    n = 0
+    for base_link, verticals in found:
+        if verticals is not None:
+            index.put(base_link, verticals)
+            n += 1
+    index.save()
+    return n
@@ -0,0 +1,449 @@
+import os
+import time
+import socket
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from .cache import PageCache
+from .config import (
+    FETCH_BACKEND,
+    RESULTS_COMPACT_ON_FINISH,
+    PAGE_CACHE_ENABLED,
+    PAGE_ESTIMATE_ENABLED,
+    TASK_POLL_INTERVAL,
+    TASK_RENEW_INTERVAL,
+)
+from .core import CountryState, fetch_listing, record_page, walk_vertical
+from .driver_factory import BASE_URL
+from .extractor import PageStatus, extract_companies_detailed
+from .fetcher import make_fetcher
+from .metrics import ThroughputReporter
+from .paging import estimate_pages
+from .proxies import ProxyManager, load_proxies
+from .ratelimit import AdaptiveScheduler
+from .taskqueue import BASE, PAGE, PLAN, VERTICAL, Task, TaskQueue
+from .verticals import discover, discover_verticals
+
+logger = logging.getLogger(__name__)
+
+
+def split_proxies(proxies: List[str], workers: int) -> List[List[str]]:
+    """
+    Reparte los proxies en `workers` grupos disjuntos (round‑robin), de modo
+    que cada worker navegue siempre con sus propias IPs.
+    """
+    return [proxies[i::workers] for i in range(workers)]
+
+
+def execute(task: Task, payload: Dict, fetcher, cache: Optional[PageCache] = None) -> Dict:
+    """
+    Parte de red de una tarea: descarga y extrae, sin tocar el estado del
+    país. `payload` es lo que el Dispatcher entrega con la tarea y el
+    resultado es JSON serializable, así que puede ejecutarse en otra
+    máquina (scraper.coordinator).
+    """
+    rec, country = payload["rec"], task.country
+    if task.kind == BASE:
+        verticals = payload.get("verticals") or discover(task.base_link, fetcher)
+        return {"verticals": verticals}
+    if task.kind == PLAN:
+        if payload.get("known"):
+            return {"known": True}
+        plan = estimate_pages(task.vertical, fetcher)
+        pages = {}
+        if plan.end_page is not None:
+            for page, res in plan.pages.items():
+                if page <= plan.end_page:
+                    if cache is not None:
+                        paged = f"{task.vertical}?page={page}"
+                        cache.put(paged, res.html, country, rec["link"], task.vertical, page)
+                    if res.page_status == PageStatus.NO_COMPANIES:
+                        pages[page] = []
+                    else:
+                        pages[page] = extract_companies_detailed(res.html, rec["sub_industry"])
+        return {"end_page": plan.end_page, "pages": pages}
+    if task.kind == PAGE:
+        comps = fetch_listing(rec, task.vertical, task.page, fetcher, cache, country)
+        return {"pages": {task.page: comps}}
+    return walk_vertical(
+        rec,
+        task.vertical,
+        payload["start"],
+        payload["end"],
+        fetcher,
+        first_sig=payload.get("first_sig"),
+        cache=cache,
+        country=country,
+    )
+
+
+class Dispatcher:
+    """
+    Reparto de la cola de tareas (scraper.taskqueue) entre consumidores:
+    mantiene el estado de cada país (CountryState) y aplica en él los
+    resultados de execute(). Tipos de tarea:
+      - base: verticales A→Z de un base_link (del índice de verticales del
+        país o descargando su página base); encola un plan por vertical
+      - plan: end_page exacto de una vertical nueva; encola una tarea page
+        por página pendiente (las descargadas al estimar ya quedan hechas)
+        o, si no se pudo estimar, una tarea vertical
+      - page: una URL paginada
+      - vertical: la vertical entera en orden, con los cortes de siempre
+    Una tarea que falla vuelve a la cola con un retraso y la toma cualquier
+    consumidor, sin frenar al resto. Un base_link queda completado cuando
+    no le quedan tareas abiertas ni fallidas. Es seguro entre hilos.
+    El resultado de una tarea solo se acepta de quien tiene su concesión,
+    y las tareas que genera se encolan en la misma transacción que la da
+    por hecha. Con el checkpoint JSON (escrito por lotes), las tareas hechas
+    quedan pendientes de sincronizar hasta la siguiente escritura.
+    """
+
+    def __init__(self, tasks: TaskQueue):
+        self.tasks = tasks
+        self.states: Dict[str, CountryState] = {}
+        self._recs: Dict[Tuple[str, str], dict] = {}
+
+    @property
+    def countries(self) -> List[str]:
+        return list(self.states)
+
+    def submit_country(self, state: CountryState) -> None:
+        """Encola una tarea base por cada base_link aún no completado."""
+        self.states[state.country] = state
+        if state.store is None:
+            state.ckpt.on_flush = lambda: self.tasks.mark_synced(state.country)
+        for rec in state.entries:
+            self._recs[(state.country, rec["link"])] = rec
+        for rec in state.pending_entries():
+            self.tasks.add(BASE, state.country, rec["link"])
+
+    def open_countries(
+        self,
+        countries: List[str],
+        reset: bool = False,
+        cache: Optional[PageCache] = None,
+        fetcher=None,
+    ) -> None:
+        """
+        Abre el estado de cada país y encola su trabajo. Con reset=True se
+        vacían sus tareas; si no, las que fallaron antes vuelven a intentarse.
+        Con `fetcher`, las verticales de los base_links aún sin expandir que
+        no estén en el índice se descubren antes, en paralelo
+        (VERTICALS_WORKERS), y sus tareas base ya no descargan nada.
+        """
+        for country in countries:
+            state = CountryState(country, reset=reset, cache=cache)
+            if reset:
+                self.tasks.reset(country)
+            else:
+                if self.tasks.retry_failed(country):
+                    logger.info(f"[{country}] reintento las tareas fallidas")
+                lost = self.tasks.reopen_unsynced(country)
+                if lost:
+                    logger.warning(f"[{country}] {lost} tareas sin checkpoint, se repiten")
+            self.submit_country(state)
+            if fetcher is not None:
+                todo = [
+                    rec["link"]
+                    for rec in state.pending_entries()
+                    if not self.tasks.verticals(country, rec["link"])
+                ]
+                discover_verticals(state.verticals, todo, fetcher)
+
+    def close(self, compact: bool = RESULTS_COMPACT_ON_FINISH) -> None:
+        """Cierra el estado de los países e informa de las tareas fallidas."""
+        for country, state in self.states.items():
+            state.close(compact=compact)
+            failed = self.tasks.failures(country)
+            if failed:
+                logger.warning(f"[{country}] {len(failed)} tareas fallidas (se reintentarán)")
+            else:
+                logger.info(f"[{country}] Scraping completado.")
+
+    def lease(self, worker: str) -> Optional[Tuple[Task, Dict]]:
+        """Siguiente tarea lista y lo necesario para ejecutarla, o None."""
+        task = self.tasks.lease(worker, self.countries)
+        if task is None:
+            return None
+        return task, self.payload(task)
+
+    def payload(self, task: Task) -> Dict:
+        state = self.states[task.country]
+        out: Dict = {"rec": self._recs[(task.country, task.base_link)]}
+        if task.kind == BASE:
+            out["verticals"] = state.verticals.get(task.base_link)
+        elif task.kind == PLAN:
+            out["known"] = task.vertical in state.ckpt.enlaces or not PAGE_ESTIMATE_ENABLED
+        elif task.kind == VERTICAL:
+            entry = state.init_link(task.vertical)
+            first = state.fingerprints.get(task.base_link, task.vertical, 1)
+            out.update(start=entry["current_page"], end=entry["end_page"])
+            out["first_sig"] = first["links"] if first else None
+        return out
+
+    def finished(self) -> bool:
+        """¿No quedan tareas pendientes ni en curso?"""
+        return not self.tasks.open_count(self.countries)
+
+    def _holds(self, task: Task, worker: Optional[str]) -> bool:
+        """¿Sigue `worker` teniendo la concesión de la tarea? (None: no se comprueba)"""
+        if worker is None or self.tasks.holder(task.id) == worker:
+            return True
+        logger.warning(
+            f"[{task.country}] {task.kind} {task.vertical or task.base_link} p{task.page}: "
+            f"concesión perdida por {worker}, descarto su resultado"
+        )
+        return False
+
+    def complete(self, task: Task, outcome: Dict, worker: Optional[str] = None) -> bool:
+        """Aplica el resultado de una tarea y la da por hecha (o fallida)."""
+        if not self._holds(task, worker):
+            return False
+        try:
+            self._apply(task, outcome)
+        except Exception as e:
+            self.fail(task, str(e))
+            return False
+        self._finish(task)
+        return True
+
+    def fail(self, task: Task, error: str, worker: Optional[str] = None) -> None:
+        if not self._holds(task, worker):
+            return
+        state = self.tasks.fail(task, error)
+        logger.warning(
+            f"[{task.country}] {task.kind} {task.vertical or task.base_link} p{task.page}: "
+            f"{error} (intento {task.attempts}, {state})"
+        )
+
+    def renew(self, task: Task, worker: str) -> bool:
+        """Prolonga la concesión de una tarea que `worker` aún está ejecutando."""
+        return self.tasks.renew(task, worker)
+
+    def _apply(self, task: Task, outcome: Dict) -> None:
+        """
+        Registra el resultado en el estado del país y después, en una sola
+        transacción de la cola, encola las tareas que genera y la da por hecha.
+        """
+        state = self.states[task.country]
+        rec = self._recs[(task.country, task.base_link)]
+        # con el Store cada página se confirma al registrarla
+        synced = state.store is not None
+        # JSON convierte las claves a texto
+        pages = {int(p): comps for p, comps in (outcome.get("pages") or {}).items()}
+        if task.kind == BASE:
+            verticals = outcome.get("verticals")
+            if verticals:
+                state.verticals.put(task.base_link, verticals)
+            else:
+                verticals = [BASE_URL + task.base_link]  # no se indexa
+            with self.tasks.transaction():
+                for vlink in verticals:
+                    self.tasks.add(PLAN, task.country, task.base_link, vlink)
+                self.tasks.done(task)
+
+        elif task.kind == PLAN:
+            end = outcome.get("end_page")
+            if outcome.get("known") or end is None:
+                with self.tasks.transaction():
+                    self.tasks.add(VERTICAL, task.country, task.base_link, task.vertical)
+                    self.tasks.done(task)
+                return
+            entry = state.init_link(task.vertical)
+            state.update_link(entry, end_page=end)
+            recorded, stop = [], None
+            for page in sorted(p for p in pages if p <= end):
+                recorded.append(page)
+                stop = record_page(state, rec, task.vertical, page, pages[page])
+                if stop is not None:
+                    break
+            with self.tasks.transaction():
+                self.tasks.add(
+                    PAGE,
+                    task.country,
+                    task.base_link,
+                    task.vertical,
+                    range(entry["current_page"], entry["end_page"] + 1),
+                )
+                for page in recorded:
+                    self.tasks.complete(
+                        PAGE, task.country, task.base_link, task.vertical, page, synced=synced
+                    )
+                if stop is not None:
+                    self.tasks.drop_pages(task.country, task.vertical, stop)
+                self.tasks.done(task)
+
+        elif task.kind == PAGE:
+            stop = record_page(state, rec, task.vertical, task.page, pages.get(task.page, []))
+            with self.tasks.transaction():
+                if stop is not None:
+                    self.tasks.drop_pages(task.country, task.vertical, stop)
+                self.tasks.done(task, synced=synced)
+
+        else:
+            for page in sorted(pages):
+                record_page(state, rec, task.vertical, page, pages[page], current_page=page + 1)
+            if outcome.get("error"):
+                raise Exception(outcome["error"])
+            entry = state.init_link(task.vertical)
+            end = outcome.get("end_page") or entry["end_page"]
+            state.update_link(entry, end_page=end, current_page=end + 1)
+            self.tasks.done(task, synced=synced)
+
+    def _finish(self, task: Task) -> None:
+        """Cierra la vertical y el base_link de una tarea terminada si ya no les queda nada."""
+        state = self.states[task.country]
+        if task.kind in (PLAN, PAGE) and not self.tasks.open_count(
+            [task.country], vertical=task.vertical, failed=True
+        ):
+            entry = state.init_link(task.vertical)
+            state.update_link(entry, current_page=entry["end_page"] + 1)
+        if not self.tasks.open_count([task.country], base_link=task.base_link, failed=True):
+            state.complete_base_link(
+                task.base_link, self.tasks.verticals(task.country, task.base_link)
+            )
+
+
+class WorkerEngine:
+    """
+    Consumidor de tareas: `workers` hilos, cada uno con su propio backend de
+    descarga (y DriverPool) y un subconjunto de proxies. El `dispatcher` es
+    local (Dispatcher sobre `tasks`) o remoto (scraper.coordinator).
+    Con `cache`, el HTML descargado se guarda en la caché de páginas.
+    Mientras ejecuta una tarea, cada worker renueva su concesión cada
+    `renew` segundos, así que un recorrido largo no se reparte dos veces.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        proxies: Optional[List[str]] = None,
+        fetcher_factory=make_fetcher,
+        tasks: Optional[TaskQueue] = None,
+        poll: float = TASK_POLL_INTERVAL,
+        dispatcher=None,
+        cache: Optional[PageCache] = None,
+        renew: float = TASK_RENEW_INTERVAL,
+    ):
+        proxies = list(proxies or [])
+        if proxies and workers > len(proxies):
+            logger.warning(
+                f"[workers] {workers} workers pero solo {len(proxies)} proxies; "
+                f"uso {len(proxies)} workers"
+            )
+            workers = len(proxies)
+        self.workers = max(workers, 1)
+        if proxies:
+            self.proxy_groups = split_proxies(proxies, self.workers)
+        else:
+            self.proxy_groups = [[] for _ in range(self.workers)]
+        self._fetcher_factory = fetcher_factory
+        if dispatcher is None:
+            dispatcher = Dispatcher(tasks if tasks is not None else TaskQueue())
+        self.dispatcher = dispatcher
+        self.cache = cache
+        self.poll = poll
+        self.renew = renew
+        self._lock = threading.Lock()
+        self.processed: Dict[int, int] = {}
+
+    def submit_country(self, state: CountryState) -> None:
+        self.dispatcher.submit_country(state)
+
+    @contextmanager
+    def _renewing(self, task: Task, worker: str):
+        """Renueva la concesión de `task` mientras dura el bloque."""
+        stop = threading.Event()
+
+        def loop():
+            while not stop.wait(self.renew):
+                if not self.dispatcher.renew(task, worker):
+                    logger.warning(f"[{worker}] no se pudo renovar la tarea {task.id}")
+                    return
+
+        thread = threading.Thread(target=loop, name=f"renew-{task.id}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def _worker(self, idx: int) -> None:
+        name = f"{socket.gethostname()}-{os.getpid()}-{idx}"
+        with self._fetcher_factory(self.proxy_groups[idx]) as fetcher:
+            while True:
+                leased = self.dispatcher.lease(name)
+                if leased is None:
+                    if self.dispatcher.finished():
+                        return
+                    # reintentos diferidos o tareas en curso de otros workers
+                    time.sleep(self.poll)
+                    continue
+                task, payload = leased
+                try:
+                    with self._renewing(task, name):
+                        outcome = execute(task, payload, fetcher, self.cache)
+                except Exception as e:
+                    self.dispatcher.fail(task, str(e), name)
+                    continue
+                if self.dispatcher.complete(task, outcome, name):
+                    with self._lock:
+                        self.processed[idx] = self.processed.get(idx, 0) + 1
+
+    def run(self) -> None:
+        """Lanza los workers y espera a que no queden tareas abiertas."""
+        threads = [
+            threading.Thread(target=self._worker, args=(i,), name=f"worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        logger.info(f"[workers] tareas procesadas por worker: {self.processed}")
+
+
+def run_workers(
+    countries: List[str],
+    workers: int,
+    reset: bool = False,
+    backend: str = FETCH_BACKEND,
+) -> None:
+    """
+    Scrapea varios países consumiendo la cola de tareas con `workers`
+    navegadores aislados.
+    """
+    # scheduler y salud de proxies únicos: el límite por host y las
+    # cuarentenas son comunes a todos los workers
+    scheduler = AdaptiveScheduler()
+    health = ProxyManager()
+    tasks = TaskQueue()
+    dispatcher = Dispatcher(tasks)
+    cache = PageCache() if PAGE_CACHE_ENABLED else None
+
+    def fetcher_factory(proxies):
+        return make_fetcher(proxies, backend, scheduler=scheduler, health=health)
+
+    engine = WorkerEngine(
+        workers,
+        load_proxies(),
+        fetcher_factory=fetcher_factory,
+        dispatcher=dispatcher,
+        cache=cache,
+    )
+    try:
+        # descubrimiento A→Z en paralelo antes de repartir las tareas base
+        with fetcher_factory(load_proxies()) as fetcher:
+            dispatcher.open_countries(countries, reset=reset, cache=cache, fetcher=fetcher)
+        with ThroughputReporter("scrape"):
+            engine.run()
+        logger.info(f"[queue] {tasks.counts(countries)}")
+    finally:
+        dispatcher.close()
+        if cache is not None:
+            cache.close()
+        tasks.close()
+    logger.info(f"[sched] tasas finales: {scheduler.snapshot()}")
@@ -1,26 +1,21 @@
 import os
 import time
-import random
+import asyncio
+import argparse
 import logging
 from scraper.driver_factory import init_driver
-from scraper.extractor import (
-    extract_subindustries,
-    bypass_challenge,
-    is_access_denied,
-    is_error_500,
-    is_connection_lost,
-)
-from scraper.utils import (
-    cargar_proxies,
-    cargar_links,
-    save_json
-)
+from scraper.extractor import PageStatus, extract_subindustries, classify_page
+from scraper.utils import cargar_links
 from scraper.progress import read_progress, save_progress
+from scraper.fetcher import make_fetcher
+from scraper.pipeline import Step0Results, run_step0_pipeline
+from scraper.proxies import ProxyManager, load_proxies
+from scraper.ratelimit import AdaptiveScheduler
 from scraper.config import (
     MAX_RETRIES,
-    INITIAL_BACKOFF,
-    BACKOFF_FACTOR,
-    PROXY_LIST_FILE
+    STEP0_CONCURRENCY,
+    SCHED_HOST_MAX_DELAY,
+    SCHED_HOST_MIN_DELAY,
 )
 
 # configuración de logging
@@ -40,40 +35,73 @@ os.makedirs("logs", exist_ok=True)
 os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
 
 
-def main():
-    proxies = cargar_proxies(PROXY_LIST_FILE)
+def main_async(concurrency: int = STEP0_CONCURRENCY, host_interval: float = SCHED_HOST_MIN_DELAY):
+    """Step0 en modo pipeline asíncrono (descarga → parseo → persistencia)."""
+    proxies = load_proxies()
+    urls = cargar_links(LINKS_FILE)
+    # un único limitador: el scheduler del fetcher, con `host_interval` como mínimo por host
+    scheduler = AdaptiveScheduler(host_delays=(host_interval, SCHED_HOST_MAX_DELAY))
+    with make_fetcher(proxies, headless=True, scheduler=scheduler) as fetcher:
+        asyncio.run(
+            run_step0_pipeline(urls, fetcher, PROGRESS_FILE, OUTPUT_FILE, concurrency=concurrency)
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DNB step0: sub-industrias por país")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        metavar="N",
+        help=f"Descargas simultáneas con el pipeline asyncio (p. ej. {STEP0_CONCURRENCY}); "
+             "1 = modo secuencial clásico",
+    )
+    parser.add_argument(
+        "--host-interval",
+        type=float,
+        default=SCHED_HOST_MIN_DELAY,
+        help="Segundos mínimos entre peticiones al mismo host (modo asyncio)",
+    )
+    args = parser.parse_args(argv)
+    if args.concurrency > 1:
+        main_async(args.concurrency, args.host_interval)
+        return
+
+    proxies = load_proxies()
     urls = cargar_links(LINKS_FILE)
     completed, blocked = read_progress(PROGRESS_FILE)
-    results = []
+    # resultados en streaming (JSONL): la memoria no crece con el número de URLs
+    results = Step0Results(OUTPUT_FILE, completed)
+    scheduler = AdaptiveScheduler()
+    health = ProxyManager()
 
     for url in urls:
         if url in completed:
             logger.info(f"[SKIP] {url}")
             continue
 
-        backoff, success = INITIAL_BACKOFF, False
+        success = False
         for attempt in range(1, MAX_RETRIES + 1):
             logger.info(f"[{attempt}/{MAX_RETRIES}] Scraping {url}...")
-            proxy = random.choice(proxies) if proxies else None
+            # los proxies en cuarentena no gastan reintentos
+            proxy = health.pick(proxies)
             driver = init_driver(proxy, headless=True)
+            status, latency = PageStatus.CONNECTION_LOST, None
             try:
+                scheduler.wait(proxy, url)
+                t0 = time.monotonic()
                 driver.get(url)
-                time.sleep(random.uniform(2, 4))
                 html = driver.page_source
+                latency = time.monotonic() - t0
 
-                # Detectar bloqueos
-                if (
-                    bypass_challenge(driver)
-                    or is_access_denied(driver)
-                    or is_error_500(driver)
-                    or is_connection_lost(driver)
-                ):
-                    raise Exception("Bloqueo detectado")
+                # Detectar bloqueos (una sola pasada sobre el HTML)
+                status = classify_page(html)
+                if status.blocked:
+                    raise Exception(f"Bloqueo detectado: {status.value}")
 
                 subs = extract_subindustries(html)
-                if subs:
-                    for name, href in subs:
-                        results.append({"page": url, "sub_industry": name, "link": href})
+                results.add(url, subs)
 
                 completed.add(url)
                 logger.info(f"  ✅ Extraídos {len(subs)} enlaces de {url}")
@@ -81,11 +109,12 @@ def main():
                 break
 
             except Exception as e:
-                logger.warning(f"  ⚠️ Error en {url}: {e}, retrying en {backoff}s")
-                time.sleep(backoff)
-                backoff *= BACKOFF_FACTOR
+                logger.warning(f"  ⚠️ Error en {url}: {e}, reintento")
 
             finally:
+                # el scheduler ajusta la espera del siguiente intento/URL
+                scheduler.record(proxy, url, status)
+                health.record(proxy, status, latency)
                 driver.quit()
 
         if not success:
@@ -93,10 +122,10 @@ def main():
             blocked.add(url)
 
         save_progress(PROGRESS_FILE, completed, blocked)
-        save_json(OUTPUT_FILE, results)
-        time.sleep(random.uniform(1, 3))
 
-    logger.info(f"Scrape step0 completado. Total de enlaces: {len(results)}")
+    logger.info(f"Scrape step0 completado. Total de enlaces: {results.close()}")
+    logger.info(f"[sched] tasas finales: {scheduler.snapshot()}")
+    health.save()
 
 
 if __name__ == "__main__":
@@ -16,7 +16,7 @@ setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/ESPAlvarez/dnb_scraper",
-    packages=find_packages(exclude=["tests", "app"]),
+    packages=find_packages(exclude=["tests", "app", "benchmarks", "benchmarks.*"]),
     include_package_data=True,
     install_requires=[
         "selenium>=4.0.0",
@@ -25,8 +25,15 @@ setup(
         "beautifulsoup4",
         "lxml",
         "selenium-stealth",
+        "urllib3>=2.0",
     ],
     extras_require={
+        "fast": [
+            "numpy",
+        ],
+        "parquet": [
+            "pyarrow",
+        ],
         "dev": [
             "pytest",
             "black",
@@ -0,0 +1,132 @@
+import json
+
+from scraper.cache import PageCache
+from scraper.core import replay_country
+from scraper.fetcher import FetchResult
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def listing(names):
+    rows = "".join(
+        f'<div class="col-md-12 data"><div class="col-md-6">'
+        f'<a href="/business-directory/company-profiles.{n}.html">{n}</a></div>'
+        f'<div class="col-md-4">Lima,&nbsp;Lima<br/>Peru</div>'
+        f'<div class="col-md-2 last">$1.0M</div></div>'
+        for n in names
+    )
+    return f"<html><body>{rows}</body></html>"
+
+
+NO_COMPANIES = (
+    '<html><body><div class="candidatesMatchedQuantityIsNullOrZeroWrapper">'
+    "No companies</div></body></html>"
+)
+
+
+def test_put_get_dedup_and_ttl(tmp_path):
+    clock = Clock()
+    cache = PageCache(str(tmp_path / "cache"), ttl=100, clock=clock)
+    sha1 = cache.put("https://x/a?page=1", "<html>igual</html>", "Peru", "/a", "https://x/a", 1)
+    sha2 = cache.put("https://x/b?page=1", "<html>igual</html>", "Peru", "/b", "https://x/b", 1)
+    assert sha1 == sha2
+    assert cache.stats()["pages"] == 2 and cache.stats()["blobs"] == 1
+    assert cache.get("https://x/a?page=1") == "<html>igual</html>"
+    assert cache.get("https://x/none") is None
+
+    clock.now += 101
+    assert cache.get("https://x/a?page=1") is None
+    assert list(cache.pages("Peru")) == []
+    cache.evict()
+    assert cache.stats() == {"pages": 0, "blobs": 0, "bytes": 0}
+    assert not list((tmp_path / "cache" / "objects").glob("*/*.gz"))
+
+
+def test_lru_eviction_keeps_recently_used(tmp_path):
+    clock = Clock()
+    cache = PageCache(str(tmp_path / "cache"), ttl=0, max_bytes=10**9, clock=clock)
+    for i in range(4):
+        clock.now += 1
+        cache.put(f"u{i}", f"<html>{i}{'x' * 5000}{i * 7919}</html>")
+    clock.now += 1
+    cache.get("u0")  # u0 pasa a ser el más reciente
+    one = cache.total_bytes() // 4
+    cache.max_bytes = one * 2 + one // 2
+    cache.evict()
+    assert cache.get("u0") is not None
+    assert cache.get("u3") is not None
+    assert cache.get("u1") is None and cache.get("u2") is None
+
+
+def test_replay_rebuilds_results_without_network(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data" / "by_country").mkdir(parents=True)
+    rec = {"link": "/bd/retail.pe.html", "sub_industry": "retail", "country": "Peru"}
+    (tmp_path / "data" / "by_country" / "Peru.json").write_text(json.dumps([rec]))
+
+    pages = {1: listing(["a", "b"]), 2: listing(["c"]), 3: NO_COMPANIES}
+
+    class FakeFetcher:
+        def fetch(self, url):
+            if "?page=" not in url:
+                return FetchResult(url, "<html></html>")
+            return FetchResult(url, pages[int(url.rsplit("=", 1)[1])])
+
+    from tests.test_workers import scrape
+
+    with PageCache("cache") as cache:
+        scrape("Peru", fetcher=FakeFetcher(), cache=cache)
+    out = tmp_path / "data" / "companies_by_sub_industry" / "Peru.json"
+    scraped = json.loads(out.read_text())
+    assert [c["company_name"] for c in scraped] == ["a", "b", "c"]
+
+    out.unlink()
+    (tmp_path / "data" / "companies_by_sub_industry" / "Peru.jsonl").unlink()
+    with PageCache("cache") as cache:
+        assert replay_country("Peru", cache) == 3
+    assert json.loads(out.read_text()) == scraped
+    cfg = json.loads((tmp_path / "config_companies" / "Peru.json").read_text())
+    assert cfg["results_offset"] == (out.parent / "Peru.jsonl").stat().st_size
+
+
+def test_replay_only_replaces_fully_cached_base_links(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data" / "by_country").mkdir(parents=True)
+    recs = [
+        {"link": "/bd/a.pe.html", "sub_industry": "a", "country": "Peru"},
+        {"link": "/bd/b.pe.html", "sub_industry": "b", "country": "Peru"},
+    ]
+    (tmp_path / "data" / "by_country" / "Peru.json").write_text(json.dumps(recs))
+    out = tmp_path / "data" / "companies_by_sub_industry"
+    out.mkdir(parents=True)
+    old = [
+        {**recs[0], "company_name": "viejo", "company_link": "x/viejo", "page": 1},
+        {**recs[1], "company_name": "b1", "company_link": "x/b1", "page": 1},
+    ]
+    (out / "Peru.jsonl").write_text("".join(json.dumps(r) + "\n" for r in old))
+
+    # caché vacía: no se toca nada
+    with PageCache("cache") as cache:
+        assert replay_country("Peru", cache) == 0
+    assert (out / "Peru.jsonl").read_text().count("\n") == 2
+
+    # a: páginas 1-2 y cierre en caché; b: falta la página 2
+    with PageCache("cache") as cache:
+        va, vb = "https://x/bd/a.pe.html", "https://x/bd/b.pe.html"
+        for p, html in {1: listing(["a1"]), 2: listing(["a2"]), 3: NO_COMPANIES}.items():
+            cache.put(f"{va}?page={p}", html, "Peru", recs[0]["link"], va, p)
+        for p, html in {1: listing(["b1"]), 3: NO_COMPANIES}.items():
+            cache.put(f"{vb}?page={p}", html, "Peru", recs[1]["link"], vb, p)
+        assert replay_country("Peru", cache) == 3
+    rows = json.loads((out / "Peru.json").read_text())
+    assert sorted((r["link"], r["company_name"]) for r in rows) == [
+        ("/bd/a.pe.html", "a1"),
+        ("/bd/a.pe.html", "a2"),
+        ("/bd/b.pe.html", "b1"),
+    ]
@@ -0,0 +1,42 @@
+import json
+
+from scraper.checkpoint import CheckpointManager
+from scraper.core import CountryState
+from scraper.utils import read_jsonl
+
+
+def test_checkpoint_batches_writes(tmp_path):
+    path = tmp_path / "cfg" / "Peru.json"
+    ck = CheckpointManager(str(path), flush_every=3, flush_interval=3600)
+    ck.enlaces["v1"] = {"start_page": 1, "end_page": 20, "current_page": 1}
+    ck.touch()
+    ck.touch()
+    assert not path.exists()
+    ck.touch()
+    assert json.loads(path.read_text())["enlaces"]["v1"]["current_page"] == 1
+
+    ck.complete("/bd/a.html")
+    ck.complete("/bd/a.html")
+    data = json.loads(path.read_text())
+    assert data["base_links_completados"] == ["/bd/a.html"]
+    assert CheckpointManager(str(path)).is_completed("/bd/a.html")
+
+
+def test_sink_truncated_to_last_checkpoint_after_crash(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data" / "by_country").mkdir(parents=True)
+    (tmp_path / "data" / "by_country" / "Peru.json").write_text("[]")
+
+    st = CountryState("Peru")
+    st.ckpt.flush_every = 2
+    st.ckpt.flush_interval = 3600
+    entry = st.init_link("v1")  # 1 cambio, sin escribir
+    st.commit_page(entry, [{"company_link": "a"}], current_page=2)  # flush
+    st.commit_page(entry, [{"company_link": "b"}], current_page=3)  # pendiente
+    # "crash": no se llama a close()
+
+    st2 = CountryState("Peru")
+    assert st2.ckpt.enlaces["v1"]["current_page"] == 2
+    assert [r["company_link"] for r in read_jsonl(st2.results_path)] == ["a"]
+    st2.close()
+    assert json.loads((tmp_path / st2.out_file).read_text()) == [{"company_link": "a"}]
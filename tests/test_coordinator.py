@@ -0,0 +1,89 @@
+import json
+import time
+import multiprocessing
+import urllib.error
+import urllib.request
+
+from scraper.coordinator import Coordinator, RemoteDispatcher, run_remote_workers
+from scraper.taskqueue import BASE, Task, TaskQueue
+from tests.test_taskqueue import FlakyFetcher
+
+
+def post(url, body):
+    req = urllib.request.Request(url, data=json.dumps(body).encode("utf-8"))
+    try:
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def remote_worker(url):
+    run_remote_workers(url, workers=2, fetcher_factory=lambda proxies: FlakyFetcher(), poll=0.05)
+
+
+def test_remote_workers_and_lost_lease(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data" / "by_country").mkdir(parents=True)
+    rec = {"link": "/bd/retail.pe.html", "sub_industry": "retail"}
+    (tmp_path / "data" / "by_country" / "Peru.json").write_text(json.dumps([rec]))
+
+    tasks = TaskQueue(str(tmp_path / "tasks.sqlite"), lease=1, retry_delay=0)
+    coord = Coordinator(["Peru"], port=0, tasks=tasks).start()
+    try:
+        # un worker "fantasma" se lleva la tarea base y desaparece
+        code, ghost = post(coord.url + "/lease", {"worker": "ghost"})
+        assert code == 200 and ghost["task"]["kind"] == BASE
+        time.sleep(1.1)
+
+        ctx = multiprocessing.get_context("fork")
+        procs = [ctx.Process(target=remote_worker, args=(coord.url,)) for _ in range(2)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join(timeout=60)
+            assert p.exitcode == 0
+
+        # la concesión caducada se repartió de nuevo; su resultado tardío se rechaza
+        task_id = ghost["task"]["id"]
+        assert tasks.get(task_id).attempts == 2
+        code, reply = post(
+            coord.url + "/complete",
+            {"worker": "ghost", "task_id": task_id, "outcome": {"verticals": []}},
+        )
+        assert (code, reply["ok"]) == (409, False)
+        assert coord.dispatcher.finished()
+        assert tasks.counts() == {"Peru": {"done": 5}}  # base, plan y 3 páginas
+    finally:
+        coord.close()
+        tasks.close()
+
+    cfg = json.loads((tmp_path / "config_companies" / "Peru.json").read_text())
+    assert cfg["base_links_completados"] == ["/bd/retail.pe.html"]
+    out = json.loads((tmp_path / "data" / "companies_by_sub_industry" / "Peru.json").read_text())
+    assert sorted(c["company_name"] for c in out) == ["c1a", "c1b", "c2a", "c2b", "c3a", "c3b"]
+
+
+def test_remote_dispatcher_retries_and_survives_coordinator_errors():
+    remote = RemoteDispatcher("http://coordinator", retries=3, backoff=0)
+    task = Task(7, BASE, "Peru", "/bd/a.html", "", 0, 1)
+    calls = []
+
+    def flaky_post(path, body):
+        calls.append(path)
+        if len(calls) < 3:
+            raise (urllib.error.URLError("caído") if len(calls) == 1 else ValueError("no JSON"))
+        return {"ok": True}
+
+    remote._post = flaky_post
+    assert remote.complete(task, {"verticals": []}, "w") and calls == ["/complete"] * 3
+
+    def down(path, body):
+        calls.append(path)
+        raise ConnectionResetError("reset")
+
+    calls.clear()
+    remote._post = down
+    assert not remote.complete(task, {"verticals": []}, "w")
+    remote.fail(task, "bloqueo", "w")  # no lanza: el hilo del worker sigue vivo
+    assert calls == ["/complete"] * 3 + ["/fail"] * 3
@@ -0,0 +1,71 @@
+import json
+
+from scraper.core import CountryState
+from scraper.dedup import DedupIndex, HashSet64, key64
+from scraper.utils import compact_jsonl
+
+
+def company(name, sub, page=1):
+    return {
+        "link": f"/bd/{sub}.pe.html",
+        "sub_industry": sub,
+        "company_name": name,
+        "company_link": f"/business-directory/company-profiles.{name}.html",
+        "page": page,
+    }
+
+
+def test_hashset_grows_and_keeps_keys():
+    s = HashSet64(8)
+    keys = [key64(str(i)) for i in range(5000)]
+    assert all(s.add(k) for k in keys)
+    assert not any(s.add(k) for k in keys)
+    assert len(s) == 5000 and all(k in s for k in keys)
+    assert key64("nope") not in s
+    assert s.nbytes <= 16 * 8 * 1024  # ~8 bytes por hueco, carga ≤ 0.6
+
+
+def test_filter_turns_repeats_into_memberships():
+    index = DedupIndex()
+    first = index.filter([company("a", "retail"), company("b", "retail")])
+    assert [r["company_name"] for r in first] == ["a", "b"]
+
+    out = index.filter([company("a", "retail"), company("a", "food", page=3), company("c", "food")])
+    assert out[0] == {
+        "company_link": company("a", "food")["company_link"],
+        "member_of": {"sub_industry": "food", "link": "/bd/food.pe.html", "page": 3},
+    }
+    assert out[1]["company_name"] == "c"
+    assert index.stats()["companies"] == 3
+    assert (index.memberships, index.dropped) == (1, 1)
+
+
+def test_compact_merges_memberships(tmp_path):
+    index = DedupIndex()
+    lines = index.filter([company("a", "retail"), company("b", "retail"), company("a", "food")])
+    src = tmp_path / "Peru.jsonl"
+    src.write_text("".join(json.dumps(r) + "\n" for r in lines))
+
+    assert compact_jsonl(str(src), str(tmp_path / "Peru.json")) == 2
+    a, b = json.loads((tmp_path / "Peru.json").read_text())
+    assert a["sub_industry"] == "retail"
+    assert a["memberships"] == [{"sub_industry": "food", "link": "/bd/food.pe.html", "page": 1}]
+    assert "memberships" not in b
+
+
+def test_index_survives_resume(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    state = CountryState("Peru")
+    entry = state.init_link("/v")
+    state.commit_page(entry, [company("a", "retail"), company("b", "retail")], current_page=2)
+    state.close(compact=False)
+
+    state = CountryState("Peru")
+    assert key64(company("a", "retail")["company_link"]) in state.dedup.companies
+    entry = state.init_link("/w")
+    state.commit_page(entry, [company("b", "food"), company("c", "food")], current_page=2)
+    state.close()
+
+    out = json.loads((tmp_path / "data" / "companies_by_sub_industry" / "Peru.json").read_text())
+    assert [c["company_name"] for c in out] == ["a", "b", "c"]
+    assert out[1]["memberships"][0]["sub_industry"] == "food"
@@ -0,0 +1,207 @@
+import json
+import hashlib
+import random
+
+import pytest
+
+from scraper.diff import (
+    compute_diff,
+    diff_countries,
+    iter_diff,
+    parse_revenue,
+    revenue_changed,
+)
+from scraper.utils import save_json
+
+
+def company(i, revenue="$1.0M", location=("", "Lima", "Peru")):
+    return {
+        "page": 1,
+        "sub_industry": "retail",
+        "company_name": f"C{i}",
+        "company_link": f"https://www.dnb.com/c{i}.html",
+        "location": list(location),
+        "revenue": revenue,
+    }
+
+
+def snapshots(n, rate=0.1, seed=0):
+    """Snapshot antiguo y uno nuevo con ~rate altas, bajas y cambios."""
+    rng = random.Random(seed)
+    old = [
+        {
+            **company(i, revenue=f"${rng.uniform(0.5, 9):.2f}M"),
+            "page": 1 + i // 50,
+            "sub_industry": f"sub_{i % 7}",
+        }
+        for i in range(n)
+    ]
+    new = []
+    for rec in old:
+        r = rng.random()
+        if r < rate:
+            continue
+        if r < 2 * rate:
+            rec = {**rec, "revenue": f"${rng.uniform(0.5, 9):.2f}M"}
+        elif r < 2.5 * rate:
+            rec = {**rec, "company_name": rec["company_name"] + " SAC", "page": rec["page"] + 1}
+        new.append(rec)
+    new += [company(n + i) for i in range(int(n * rate))]
+    return old, new
+
+
+def legacy_report(country, old, new):
+    """Informe de la implementación anterior (dicts en memoria)."""
+    old_map = {c["company_link"]: c for c in old}
+    new_map = {c["company_link"]: c for c in new}
+    updated = []
+    for link, new_c in new_map.items():
+        if link in old_map:
+            old_c = old_map[link]
+            changes = {
+                f: (old_c.get(f), new_c.get(f))
+                for f in ("revenue", "location")
+                if old_c.get(f) != new_c.get(f)
+            }
+            if changes:
+                updated.append(
+                    {"company_link": link, "changes": changes, "old": old_c, "new": new_c}
+                )
+    return {
+        "country": country,
+        "added": [new_map[k] for k in new_map if k not in old_map],
+        "removed": [old_map[k] for k in old_map if k not in new_map],
+        "updated": updated,
+    }
+
+
+def test_compute_diff_matches_legacy_report(tmp_path):
+    old = [company(i) for i in range(10)]
+    new = [company(i) for i in range(2, 12)]
+    new[0] = company(2, revenue="$2.0M")
+    new[3] = company(5, location=("", "Cusco", "Peru"))
+    save_json(str(tmp_path / "old" / "Peru.json"), old)
+    save_json(str(tmp_path / "new" / "Peru.json"), new)
+
+    res = compute_diff("Peru", str(tmp_path / "old"), str(tmp_path / "new"), str(tmp_path / "rep"))
+    assert (res["added"], res["removed"], res["updated"]) == (2, 2, 2)
+
+    expected = json.dumps(legacy_report("Peru", old, new), indent=2, ensure_ascii=False)
+    assert (tmp_path / "rep" / "Peru_changes.json").read_text(encoding="utf-8") == expected
+
+
+def test_compute_diff_empty_sections_and_jsonl_source(tmp_path):
+    old = [company(1)]
+    (tmp_path / "new").mkdir()
+    (tmp_path / "new" / "Peru.jsonl").write_text(json.dumps(company(1)) + "\n")
+    save_json(str(tmp_path / "old" / "Peru.json"), old)
+
+    compute_diff("Peru", str(tmp_path / "old"), str(tmp_path / "new"), str(tmp_path / "rep"))
+    expected = json.dumps(legacy_report("Peru", old, old), indent=2)
+    assert (tmp_path / "rep" / "Peru_changes.json").read_text() == expected
+
+
+def test_iter_diff_streams_from_generators():
+    old = (company(i) for i in range(1000))
+    new = (company(i, revenue="$9M" if i % 100 == 0 else "$1.0M") for i in range(500, 1500))
+    kinds = {}
+    for kind, _ in iter_diff(old, new):
+        kinds[kind] = kinds.get(kind, 0) + 1
+    assert kinds == {"added": 500, "removed": 500, "updated": 5}
+
+
+def test_parse_revenue():
+    assert parse_revenue("$1.2M") == 1.2e6
+    assert parse_revenue("$850K") == 850e3
+    assert parse_revenue("$3.4B") == 3.4e9
+    assert parse_revenue("$1,234") == 1234
+    assert parse_revenue("") is None and parse_revenue(None) is None
+    assert parse_revenue("n/a") is None
+
+
+def test_diff_countries_summary_and_skip(tmp_path):
+    old_dir, new_dir, rep = (str(tmp_path / d) for d in ("old", "new", "rep"))
+    for country, n in (("Peru", 6), ("Chile", 4)):
+        old = [company(i) for i in range(n)]
+        new = [company(i, revenue=f"${i + 1}.0M") for i in range(1, n + 1)]
+        save_json(f"{old_dir}/{country}.json", old)
+        save_json(f"{new_dir}/{country}.json", new)
+
+    summary = diff_countries(["Peru", "Chile"], old_dir, new_dir, rep, workers=2, top_n=3)
+    assert summary["diffed"] == ["Peru", "Chile"] and summary["skipped"] == []
+    assert summary["totals"] == {"added": 2, "removed": 2, "updated": 8}
+    assert summary["by_country"]["Peru"]["by_sub_industry"]["retail"]["updated"] == 5
+    deltas = [m["delta"] for m in summary["top_movers"]]
+    assert deltas == [5e6, 4e6, 3e6]
+    assert json.loads((tmp_path / "rep" / "summary.json").read_text()) == summary
+
+    # sin cambios en las fuentes: se reutiliza el resumen
+    again = diff_countries(["Peru", "Chile"], old_dir, new_dir, rep, workers=1, top_n=3)
+    assert again["skipped"] == ["Peru", "Chile"] and again["totals"] == summary["totals"]
+
+    # reescribir con el mismo contenido (cambia mtime, no el hash) tampoco recompara
+    save_json(f"{new_dir}/Chile.json", json.loads((tmp_path / "new" / "Chile.json").read_text()))
+    save_json(f"{new_dir}/Peru.json", [company(0)])
+    third = diff_countries(["Peru", "Chile"], old_dir, new_dir, rep, workers=1, top_n=3)
+    assert third["diffed"] == ["Peru"] and third["skipped"] == ["Chile"]
+    assert third["by_country"]["Peru"]["removed"] == 5
+
+
+def test_revenue_threshold_filters_small_changes():
+    assert not revenue_changed("$1.0M", "$1.05M", 0.10)
+    assert revenue_changed("$1.0M", "$1.2M", 0.10)
+    assert revenue_changed("$1.0M", "$1.05M", 0.0)
+    assert revenue_changed("", "$1.0M", 0.10)
+    old = [company(1, revenue="$1.0M"), company(2, revenue="$1.0M")]
+    new = [company(1, revenue="$1.05M"), company(2, revenue="$2.0M")]
+    updated = [item["company_link"] for kind, item in iter_diff(old, new, revenue_threshold=0.1)]
+    assert updated == [company(2)["company_link"]]
+
+
+@pytest.mark.parametrize("fields", [("revenue", "location"), ("company_name", "page", "revenue")])
+@pytest.mark.parametrize("threshold", [0.0, 0.25])
+def test_numpy_engine_matches_stream_engine(tmp_path, fields, threshold):
+    pytest.importorskip("numpy")
+    old, new = snapshots(3000)
+    new += [{**new[5], "company_name": "dup"}]  # company_link repetido: gana el último
+    save_json(str(tmp_path / "old" / "Peru.json"), old)
+    save_json(str(tmp_path / "new" / "Peru.json"), new)
+
+    reports = {}
+    for engine in ("stream", "numpy"):
+        rep = tmp_path / engine
+        res = compute_diff(
+            "Peru",
+            str(tmp_path / "old"),
+            str(tmp_path / "new"),
+            str(rep),
+            fields=fields,
+            revenue_threshold=threshold,
+            engine=engine,
+        )
+        assert res["engine"] == engine
+        reports[engine] = json.loads((rep / "Peru_changes.json").read_text())
+    assert reports["numpy"]["added"] == reports["stream"]["added"]
+    assert reports["numpy"]["removed"] == reports["stream"]["removed"]
+    key = lambda u: u["company_link"]  # noqa: E731
+    assert sorted(reports["numpy"]["updated"], key=key) == sorted(
+        reports["stream"]["updated"], key=key
+    )
+    assert reports["numpy"]["updated"]
+
+
+def test_auto_engine_keeps_large_snapshots_streaming(tmp_path, monkeypatch):
+    np = pytest.importorskip("numpy")
+    from scraper import diff
+    from scraper.columnar import _hashes
+
+    old, new = snapshots(50)
+    save_json(str(tmp_path / "old" / "Peru.json"), old)
+    save_json(str(tmp_path / "new" / "Peru.json"), new)
+    args = ("auto", "Peru", str(tmp_path / "old"), str(tmp_path / "new"))
+    assert diff._pick_engine(*args) == "numpy"
+    monkeypatch.setattr(diff, "DIFF_COLUMNAR_MAX_BYTES", 1024)
+    assert diff._pick_engine(*args) == "stream"
+    # hash de company_link estable entre procesos (no el hash() salado de str)
+    digest = hashlib.blake2b(b"x/a", digest_size=8).digest()
+    assert _hashes(["x/a"])[0] == np.uint64(int.from_bytes(digest, "little"))
@@ -0,0 +1,73 @@
+import scraper.driver_pool as dp
+from scraper.driver_pool import DriverPool
+from scraper.extractor import PageStatus
+from scraper.proxies import ProxyManager
+
+
+class FakeDriver:
+    def __init__(self, proxy):
+        self.proxy = proxy
+        self.closed = False
+
+    def quit(self):
+        self.closed = True
+
+
+def make_pool(monkeypatch, **kw):
+    monkeypatch.setattr(dp, "random_user_agent", lambda: "UA-test")
+    created = []
+
+    def factory(proxy, headless=False, user_agent=None):
+        drv = FakeDriver(proxy)
+        created.append(drv)
+        return drv
+
+    return DriverPool(["1.1.1.1:80"], factory=factory, **kw), created
+
+
+def test_pool_reuses_session_until_max_pages(monkeypatch):
+    pool, created = make_pool(monkeypatch, max_pages=3)
+    for _ in range(5):
+        with pool.session() as s:
+            assert s.proxy == "1.1.1.1:80"
+            assert s.user_agent == "UA-test"
+    # 3 páginas en la primera sesión, 2 en la segunda
+    assert len(created) == 2
+    assert created[0].closed and not created[1].closed
+    assert [st["uses"] for st in pool.stats()] == [3, 2]
+    pool.close()
+    assert created[1].closed
+    assert pool.stats()[1]["closed"] == "pool_closed"
+
+
+def test_pool_recycles_blocked_and_old_sessions(monkeypatch):
+    pool, created = make_pool(monkeypatch, max_age=0)
+    s = pool.acquire()
+    pool.release(s)
+    # max_age=0: expira inmediatamente
+    assert created[0].closed
+    assert pool.stats()[0]["closed"] == "max_age"
+
+    pool, created = make_pool(monkeypatch)
+    try:
+        with pool.session():
+            raise RuntimeError("Bloqueo")
+    except RuntimeError:
+        pass
+    assert created[0].closed
+    assert pool.stats()[0]["closed"] == "blocked"
+
+
+def test_pool_skips_quarantined_proxies(monkeypatch, tmp_path):
+    monkeypatch.setattr(dp, "random_user_agent", lambda: "UA-test")
+    health = ProxyManager(str(tmp_path / "health.json"))
+    health.record("1.1.1.1:80", PageStatus.DENIED)
+    pool = DriverPool(
+        ["1.1.1.1:80", "2.2.2.2:80"],
+        factory=lambda proxy, headless=False, user_agent=None: FakeDriver(proxy),
+        health=health,
+    )
+    for _ in range(5):
+        with pool.session() as s:
+            assert s.proxy == "2.2.2.2:80"
+            s.mark_blocked()
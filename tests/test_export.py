@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from scraper.diff import compute_diff, load_results  # noqa: E402
+from scraper.export import country_dir, export_country, iter_records, load_table  # noqa: E402
+from scraper.tasks import main  # noqa: E402
+from scraper.utils import save_json  # noqa: E402
+
+
+def company(i, sub="retail", revenue="$1.0M"):
+    return {
+        "page": 1 + i // 3,
+        "sub_industry": sub,
+        "link": f"/bd/{sub}.pe.html",
+        "company_name": f"C{i}",
+        "company_link": f"https://www.dnb.com/c{i}.html",
+        "location": ["", "Lima", "Peru"],
+        "revenue": revenue,
+    }
+
+
+def test_export_roundtrip_partitions_and_order(tmp_path):
+    records = [company(i, sub="retail" if i % 2 else "food & drink") for i in range(10)]
+    records[3]["memberships"] = [{"sub_industry": "food & drink", "link": "/bd/f.html", "page": 2}]
+    records[4]["country"] = "Peru"  # campo fuera del esquema
+    save_json(str(tmp_path / "src" / "Peru.json"), records)
+
+    root = tmp_path / "pq"
+    assert export_country("Peru", str(tmp_path / "src"), str(root), batch_size=4) == 10
+    parts = sorted(p.name for p in (root / "country=Peru").iterdir())
+    assert parts == ["sub_industry=food%20%26%20drink", "sub_industry=retail"]
+
+    assert load_results("Peru", str(root)) == records
+    assert sorted(iter_records("Peru", str(root)), key=lambda r: r["company_name"]) == sorted(
+        records, key=lambda r: r["company_name"]
+    )
+
+    table = load_table("Peru", str(root), columns=["company_link", "revenue_usd"])
+    assert table.column_names == ["company_link", "revenue_usd"]
+    assert table.column("revenue_usd").to_pylist() == [1e6] * 10
+    assert load_results("Peru", str(root), columns=["company_name"])[0] == {"company_name": "C0"}
+
+
+def test_export_prefers_newer_stream_and_replaces_partition(tmp_path):
+    src = tmp_path / "src"
+    save_json(str(src / "Peru.json"), [company(0, sub="old")])
+    (src / "Peru.jsonl").write_text(json.dumps(company(1)) + "\n")
+    root = str(tmp_path / "pq")
+    export_country("Peru", str(src), root)
+    export_country("Peru", str(src), root)
+    assert [r["company_name"] for r in load_results("Peru", root)] == ["C1"]
+    assert sorted(p.name for p in (tmp_path / "pq").iterdir()) == ["country=Peru"]
+
+
+def test_diff_reads_parquet_with_column_subset(tmp_path):
+    old = [company(i) for i in range(6)]
+    new = [company(i, revenue="$2.0M" if i == 2 else "$1.0M") for i in range(1, 7)]
+    save_json(str(tmp_path / "a" / "Peru.json"), old)
+    save_json(str(tmp_path / "b" / "Peru.json"), new)
+    for side in ("a", "b"):
+        export_country("Peru", str(tmp_path / side), str(tmp_path / f"pq_{side}"))
+    assert (tmp_path / "pq_a").joinpath(country_dir("Peru", "")).is_dir()
+
+    res = compute_diff(
+        "Peru",
+        str(tmp_path / "pq_a"),
+        str(tmp_path / "pq_b"),
+        str(tmp_path / "rep"),
+        engine="stream",
+        columns=("company_link",),
+    )
+    assert (res["added"], res["removed"], res["updated"]) == (1, 1, 1)
+    report = json.loads((tmp_path / "rep" / "Peru_changes.json").read_text())
+    assert set(report["added"][0]) == {
+        "company_link",
+        "company_name",
+        "sub_industry",
+        "revenue",
+        "location",
+    }
+    assert res["top_movers"][0]["delta"] == 1e6
+
+
+def test_diff_only_cli_compares_parquet_exports(tmp_path, monkeypatch):
+    save_json(str(tmp_path / "a" / "Peru.json"), [company(i) for i in range(3)])
+    save_json(str(tmp_path / "b" / "Peru.json"), [company(i) for i in range(1, 4)])
+    for side in ("a", "b"):
+        export_country("Peru", str(tmp_path / side), str(tmp_path / f"pq_{side}"))
+
+    monkeypatch.chdir(tmp_path)
+    argv = ["tasks", "--diff-only", "--diff-old", "pq_a", "--diff-new", "pq_b"]
+    monkeypatch.setattr("sys.argv", argv + ["--diff-engine", "stream", "--diff-workers", "1"])
+    main()  # sin --country: los países salen de las particiones de --diff-new
+    summary = json.loads((tmp_path / "reports" / "summary.json").read_text())
+    assert summary["by_country"]["Peru"]["added"] == 1
+    assert summary["by_country"]["Peru"]["removed"] == 1
@@ -93,3 +93,56 @@ def test_bypass_and_error_detectors():
         elements={"candidatesMatchedQuantityIsNullOrZeroWrapper": True}
     )
     assert is_no_companies_message(drv5)
+
+
+def test_extract_verticals():
+    from scraper.extractor import extract_verticals
+
+    html = '<ul class="alpha-pagination"><a href="/v?alpha=A">A</a><a href="/v?alpha=B">B</a></ul>'
+    assert extract_verticals(html) == ["/v?alpha=A", "/v?alpha=B"]
+
+
+def test_classify_page_single_pass():
+    from scraper.extractor import PageStatus, classify_page
+
+    assert classify_page(HTML_COMPS) == PageStatus.OK
+    assert classify_page(
+        '<div class="candidatesMatchedQuantityIsNullOrZeroWrapper">0</div>'
+    ) == PageStatus.NO_COMPANIES
+    assert classify_page('<iframe id="sec-cpt-if"></iframe>') == PageStatus.CHALLENGE
+    # la marca en un script no es un iframe de challenge
+    assert classify_page("<script>var x='sec-cpt-if';</script>") == PageStatus.OK
+    assert classify_page("<h1>Access Denied</h1>") == PageStatus.DENIED
+    assert classify_page("<h2>500 Error</h2>") == PageStatus.ERROR_5XX
+    assert classify_page("HTTP ERROR 502") == PageStatus.CONNECTION_LOST
+    # sin marcas, decide el código HTTP
+    assert classify_page("", 503) == PageStatus.ERROR_5XX
+    assert classify_page("", 429) == PageStatus.DENIED
+    assert classify_page("", 302) == PageStatus.HTTP_ERROR
+    assert classify_page(HTML_COMPS, 410).blocked
+    assert classify_page(HTML_COMPS).blocked is False
+    assert PageStatus.CHALLENGE.blocked
+
+
+def test_extract_companies_detailed_matches_legacy():
+    import os
+    from benchmarks.bench_extractor import extract_companies_detailed_legacy
+
+    tricky = HTML_COMPS + """
+<div class="col-md-12  data extra">
+  <div class="col-md-6"><a href="/c/b&amp;c">B &amp; C&nbsp;Ltda</a></div>
+  <div class="col-md-4">Lima,&nbsp;Perú<br>Peru</div>
+</div>
+<div class="col-md-12 data"><div class="col-md-6"><a><span>x</span></a></div></div>
+"""
+    fixtures = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "fixtures")
+    pages = [tricky]
+    for name in sorted(os.listdir(fixtures)):
+        if name.startswith("listing_"):
+            with open(os.path.join(fixtures, name), encoding="utf-8") as f:
+                pages.append(f.read())
+    for html in pages:
+        assert extract_companies_detailed(html, "foo") == extract_companies_detailed_legacy(
+            html, "foo"
+        )
+    assert len(extract_companies_detailed(tricky, "foo")) == 2
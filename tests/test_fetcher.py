@@ -0,0 +1,104 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from scraper.fetcher import FallbackFetcher, FetchResult, HttpFetcher
+from scraper.ratelimit import AdaptiveScheduler
+
+PAGES = {
+    "/ok": (200, "<html><body><div class='col-md-12 data'>ok</div></body></html>"),
+    "/challenge": (200, "<html><body><iframe id='sec-cpt-if'></iframe></body></html>"),
+    "/forbidden": (403, "<html><body>nope</body></html>"),
+    "/moved": (301, ""),
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    seen = []
+
+    def do_GET(self):
+        StubHandler.seen.append((self.path, dict(self.headers), self.client_address[1]))
+        status, body = PAGES.get(self.path, (404, "not found"))
+        data = body.encode("utf-8")
+        self.send_response(status)
+        if status == 301:
+            self.send_header("Location", "/ok")
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    StubHandler.seen = []
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    yield f"http://127.0.0.1:{srv.server_port}"
+    srv.shutdown()
+    srv.server_close()
+
+
+class FakeBrowser:
+    backend = "browser"
+
+    def __init__(self):
+        self.urls = []
+
+    def fetch(self, url):
+        self.urls.append(url)
+        return FetchResult(url, "<html>rendered</html>", 200, self.backend)
+
+    def close(self):
+        pass
+
+
+def test_http_fetcher_headers_and_keepalive(stub_server):
+    with HttpFetcher(user_agent="UA-test") as f:
+        r1 = f.fetch(stub_server + "/ok")
+        r2 = f.fetch(stub_server + "/ok")
+    assert r1.status == 200 and "col-md-12 data" in r1.html
+    assert r2.backend == "http"
+    headers = StubHandler.seen[0][1]
+    assert headers["User-Agent"] == "UA-test"
+    assert headers["Accept-Language"] == "en-US,en;q=0.9"
+    # misma conexión reutilizada (mismo puerto cliente)
+    assert StubHandler.seen[0][2] == StubHandler.seen[1][2]
+
+
+def test_fallback_only_on_challenge(stub_server):
+    browser = FakeBrowser()
+    sched = AdaptiveScheduler(initial_delay=1.0, sleep=lambda s: None)
+    f = FallbackFetcher(HttpFetcher(user_agent="UA-test", scheduler=sched), browser)
+    assert f.fetch(stub_server + "/ok").backend == "http"
+    assert f.fetch(stub_server + "/challenge").backend == "browser"
+    assert f.fetch(stub_server + "/forbidden").backend == "browser"
+    assert f.fallbacks == 2
+    assert browser.urls == [stub_server + "/challenge", stub_server + "/forbidden"]
+    # los challenges que resolvió el navegador no cuentan como bloqueos
+    snap = sched.snapshot()
+    assert (snap["proxy:direct"]["ok"], snap["proxy:direct"]["blocked"]) == (1, 0)
+    f.close()
+
+
+def test_http_fetcher_reports_to_scheduler(stub_server):
+    sched = AdaptiveScheduler(initial_delay=1.0, sleep=lambda s: None)
+    with HttpFetcher(scheduler=sched) as f:
+        f.fetch(stub_server + "/ok")
+        f.fetch(stub_server + "/forbidden")
+    snap = sched.snapshot()
+    assert snap["proxy:direct"]["ok"] == 1
+    assert snap["proxy:direct"]["blocked"] == 1
+
+
+def test_http_fetcher_follows_redirects(stub_server):
+    with HttpFetcher(user_agent="UA-test") as f:
+        res = f.fetch(stub_server + "/moved")
+    assert res.status == 200 and "col-md-12 data" in res.html
+    assert [p for p, _, _ in StubHandler.seen] == ["/moved", "/ok"]
@@ -0,0 +1,63 @@
+import json
+
+from scraper.extractor import extract_companies_detailed
+from scraper.fetcher import HttpFetcher
+from scraper.metrics import PHASE, Metrics, ThroughputReporter, get_metrics
+from tests import test_fetcher
+from tests.test_cache import listing
+
+stub_server = test_fetcher.stub_server
+
+
+def test_histograms_counters_and_prometheus_text(tmp_path):
+    m = Metrics(buckets=(0.1, 1))
+    for v in (0.05, 0.5, 0.5, 3):
+        m.observe(PHASE, v, phase="parse")
+    m.inc("blocks_total", type="challenge")
+    m.inc("blocks_total", 2, type="denied")
+    with m.timed("persist"):
+        pass
+
+    text = m.to_prometheus()
+    assert "# TYPE dnb_blocks_total counter" in text
+    assert 'dnb_blocks_total{type="denied"} 2' in text
+    assert "# TYPE dnb_scrape_phase_seconds histogram" in text
+    assert 'dnb_scrape_phase_seconds_bucket{phase="parse",le="0.1"} 1' in text
+    assert 'dnb_scrape_phase_seconds_bucket{phase="parse",le="1"} 3' in text
+    assert 'dnb_scrape_phase_seconds_bucket{phase="parse",le="+Inf"} 4' in text
+    assert 'dnb_scrape_phase_seconds_count{phase="parse"} 4' in text
+    assert 'dnb_scrape_phase_seconds_count{phase="persist"} 1' in text
+    assert m.by_label("blocks_total", "type") == {"challenge": 1, "denied": 2}
+
+    prom, js = m.export("test", str(tmp_path))
+    assert open(prom, encoding="utf-8").read() == text
+    parse, _ = json.load(open(js, encoding="utf-8"))["histograms"][PHASE]
+    assert (parse["count"], parse["sum"], parse["buckets"]["1"]) == (4, 4.05, 3)
+
+    off = Metrics(enabled=False)
+    off.inc("pages_total")
+    with off.timed("parse"):
+        pass
+    assert off.snapshot()["counters"] == {} and off.snapshot()["histograms"] == {}
+
+
+def test_fetch_and_parse_are_instrumented(stub_server, tmp_path):
+    m = get_metrics()
+    m.reset()
+    reporter = ThroughputReporter("run", metrics=m, directory=str(tmp_path))
+    with HttpFetcher(user_agent="UA-test") as f:
+        f.fetch(stub_server + "/ok")
+        f.fetch(stub_server + "/challenge")
+    extract_companies_detailed(listing(["a", "b", "c"]), "retail")
+
+    assert m.by_label("pages_total", "status") == {"ok": 1, "challenge": 1}
+    assert m.counter("blocks_total", type="challenge") == 1
+    assert m.counter("retries_total", proxy="direct") == 1
+    assert m.total("companies_total") == 3
+    phases = {h["labels"]["phase"] for h in m.snapshot()["histograms"][PHASE]}
+    assert {"page_load", "classify", "parse"} <= phases
+
+    line = reporter.line()
+    assert "1 bloqueos, 1 reintentos (total 2 páginas)" in line and "parse=" in line
+    reporter.tick()
+    assert 'dnb_pages_total{status="ok"} 1' in (tmp_path / "run.prom").read_text()
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from scraper.extractor import extract_total_count
+from scraper.fetcher import FetchResult
+from scraper.paging import estimate_pages
+from tests.test_cache import NO_COMPANIES, listing
+from tests.test_workers import scrape
+
+
+class PagedFetcher:
+    """Vertical de `n` páginas de dos empresas; más allá, sin empresas o repite la 1."""
+
+    def __init__(self, n, counter=False, beyond="empty", total=None):
+        self.n = n
+        self.counter = counter
+        self.total = 2 * n - 1 if total is None else total
+        self.beyond = beyond
+        self.calls = []
+
+    def fetch(self, url):
+        if "?page=" not in url:
+            return FetchResult(url, "<html></html>")
+        page = int(url.rsplit("=", 1)[1])
+        self.calls.append(page)
+        if page > self.n:
+            if self.beyond == "empty":
+                return FetchResult(url, NO_COMPANIES)
+            page = 1
+        html = listing([f"c{page}a", f"c{page}b"])
+        if self.counter:
+            total = f'<div class="candidatesMatchedQuantity">{self.total} companies</div>'
+            html = html.replace("<body>", "<body>" + total)
+        return FetchResult(url, html)
+
+
+def test_total_count():
+    assert extract_total_count('<p class="x candidatesMatchedQuantity">1,234 results</p>') == 1234
+    # solo cuenta el contador de resultados, no cualquier "N results" de la página
+    assert extract_total_count("<p>Showing 57 results</p>") is None
+    assert extract_total_count('<p class="candidatesMatchedQuantityX">9 results</p>') is None
+    assert extract_total_count(listing(["a"])) is None
+    assert extract_total_count(NO_COMPANIES) is None
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 5, 8, 13, 20, 25])
+@pytest.mark.parametrize("beyond", ["empty", "repeat"])
+def test_probe_finds_exact_end(n, beyond):
+    fetcher = PagedFetcher(n, beyond=beyond)
+    plan = estimate_pages("v", fetcher, max_page=20)
+    assert (plan.end_page, plan.method) == (min(n, 20), "probe")
+    assert len(fetcher.calls) <= 10 and set(plan.pages) == set(fetcher.calls)
+
+
+def test_counter_needs_no_extra_pages():
+    fetcher = PagedFetcher(7, counter=True)
+    plan = estimate_pages("v", fetcher)
+    assert (plan.end_page, plan.method, fetcher.calls) == (7, "count", [1])
+    assert estimate_pages("v", PagedFetcher(1), probe=False).end_page is None
+
+
+def test_count_below_page_one_size_falls_back_to_probing():
+    fetcher = PagedFetcher(5, counter=True, total=1)  # la página 1 ya trae 2
+    plan = estimate_pages("v", fetcher)
+    assert (plan.end_page, plan.method) == (5, "probe")
+
+
+def test_scrape_uses_exact_end_and_reuses_probed_pages(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data" / "by_country").mkdir(parents=True)
+    rec = {"link": "/bd/retail.pe.html", "sub_industry": "retail"}
+    (tmp_path / "data" / "by_country" / "Peru.json").write_text(json.dumps([rec]))
+
+    fetcher = PagedFetcher(3, counter=True)
+    scrape("Peru", fetcher=fetcher)
+    assert fetcher.calls == [1, 2, 3]  # ni la página 4 de cierre
+    cfg = json.loads((tmp_path / "config_companies" / "Peru.json").read_text())
+    (entry,) = cfg["enlaces"].values()
+    assert (entry["end_page"], entry["current_page"]) == (3, 4)
+    out = json.loads((tmp_path / "data" / "companies_by_sub_industry" / "Peru.json").read_text())
+    assert len(out) == 6
@@ -0,0 +1,70 @@
+import json
+import asyncio
+
+import scraper.pipeline as pipeline
+from scraper.fetcher import FetchResult
+from scraper.pipeline import run_step0_pipeline
+from scraper.progress import save_progress
+
+PAGE = """
+<div class="col-md-6 col-xs-6 data">
+  <a href="/business-directory/company-information.{sub}.pe.html">{sub} (12)</a>
+</div>
+"""
+
+
+class FakeFetcher:
+    def __init__(self, blocked=()):
+        self.blocked = set(blocked)
+        self.calls = []
+
+    def fetch(self, url):
+        self.calls.append(url)
+        if url in self.blocked:
+            return FetchResult(url, "<h1>Access Denied</h1>", 200, "fake")
+        return FetchResult(url, PAGE.format(sub=url.rsplit("/", 1)[-1]), 200, "fake")
+
+
+def run(urls, fetcher, progress, output):
+    return asyncio.run(
+        run_step0_pipeline(urls, fetcher, progress, output, concurrency=3, max_retries=2, backoff=0)
+    )
+
+
+def test_step0_pipeline_resume_and_blocked(tmp_path):
+    progress = str(tmp_path / "progress.json")
+    output = str(tmp_path / "out.json")
+    save_progress(progress, {"http://h/done"}, set())
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump([{"page": "http://h/done", "sub_industry": "done", "link": "/x"}], f)
+
+    urls = ["http://h/done", "http://h/a", "http://h/b", "http://h/bad"]
+    fetcher = FakeFetcher(blocked={"http://h/bad"})
+    assert run(urls, fetcher, progress, output) == 3
+
+    assert "http://h/done" not in fetcher.calls
+    assert fetcher.calls.count("http://h/bad") == 2
+    data = json.loads(open(progress, encoding="utf-8").read())
+    assert set(data["completed"]) == {"http://h/done", "http://h/a", "http://h/b"}
+    assert data["blocked"] == ["http://h/bad"]
+    out = json.loads(open(output, encoding="utf-8").read())
+    assert sorted(r["sub_industry"] for r in out) == ["a", "b", "done"]
+
+    # líneas de una URL que no llegó al progreso (corte): se descartan al reanudar
+    with open(tmp_path / "out.jsonl", "a", encoding="utf-8") as f:
+        f.write(json.dumps({"page": "http://h/bad", "sub_industry": "stale", "link": "/s"}) + "\n")
+    assert run(urls, FakeFetcher(blocked={"http://h/bad"}), progress, output) == 3
+
+
+def test_parse_error_does_not_hang_the_pipeline(tmp_path, monkeypatch):
+    def extract(html):
+        if "boom" in html:
+            raise ValueError("HTML ilegible")
+        return [("ok", "/ok")]
+
+    monkeypatch.setattr(pipeline, "extract_subindustries", extract)
+    progress = str(tmp_path / "progress.json")
+    urls = [f"http://h/{x}" for x in ("a", "boom", "b")]
+    assert run(urls, FakeFetcher(), progress, str(tmp_path / "out.json")) == 2
+    data = json.loads(open(progress, encoding="utf-8").read())
+    assert data["blocked"] == ["http://h/boom"]
@@ -0,0 +1,176 @@
+import json
+import socket
+import threading
+import urllib.request
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from scraper.extractor import PageStatus
+from scraper.proxies import ProxyManager, load_proxies, validate_proxies, write_validated
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_manager(tmp_path, **kw):
+    clock = Clock()
+    kw.setdefault("quarantine_base", 60.0)
+    mgr = ProxyManager(str(tmp_path / "health.json"), clock=clock, **kw)
+    return mgr, clock
+
+
+def test_quarantine_grows_and_expires(tmp_path):
+    mgr, clock = make_manager(tmp_path)
+    mgr.record("a", PageStatus.DENIED)
+    assert mgr.is_quarantined("a")
+    assert mgr.available(["a", "b"]) == ["b"]
+    assert {mgr.pick(["a", "b"]) for _ in range(20)} == {"b"}
+
+    clock.now += 61
+    assert not mgr.is_quarantined("a")
+    # segundo fallo seguido: cuarentena doble
+    mgr.record("a", PageStatus.CHALLENGE)
+    clock.now += 61
+    assert mgr.is_quarantined("a")
+    clock.now += 60
+    assert not mgr.is_quarantined("a")
+
+    snap = mgr.snapshot()["a"]
+    assert snap["blocks"] == {"denied": 1, "challenge": 1}
+    assert snap["strikes"] == 2
+
+
+def test_server_errors_do_not_quarantine(tmp_path):
+    mgr, _ = make_manager(tmp_path)
+    mgr.record("a", PageStatus.ERROR_5XX)
+    assert not mgr.is_quarantined("a")
+
+
+def test_all_quarantined_returns_soonest(tmp_path):
+    mgr, _ = make_manager(tmp_path)
+    mgr.record("a", PageStatus.DENIED)
+    mgr.record("a", PageStatus.DENIED)
+    mgr.record("b", PageStatus.DENIED)
+    assert mgr.pick(["a", "b"]) == "b"
+    assert mgr.pick([]) is None
+
+
+def test_pick_is_weighted_by_score(tmp_path):
+    mgr, clock = make_manager(tmp_path, quarantine_base=1.0)
+    for _ in range(5):
+        mgr.record("fast", PageStatus.OK, latency=0.5)
+        mgr.record("slow", PageStatus.OK, latency=20.0)
+    mgr.record("flaky", PageStatus.CONNECTION_LOST)
+    clock.now += 10
+    assert mgr.score("fast") > mgr.score("flaky")
+    assert mgr.score("fast") > mgr.score("slow")
+    picks = Counter(mgr.pick(["fast", "slow", "flaky"]) for _ in range(2000))
+    assert picks["fast"] > picks["slow"]
+    assert picks["fast"] > picks["flaky"]
+
+
+def test_health_persists_between_runs(tmp_path):
+    mgr, clock = make_manager(tmp_path)
+    mgr.record("a", PageStatus.DENIED)
+    mgr.record("b", PageStatus.OK, latency=1.0)
+    mgr.save()
+
+    again = ProxyManager(str(tmp_path / "health.json"), clock=clock)
+    assert again.is_quarantined("a")
+    assert again.snapshot()["b"]["ok"] == 1
+
+
+# ─── pre‑validación contra un proxy local ─────────────────────────────────────
+
+
+class TargetHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = b"<html><body><div class='col-md-12 data'>ok</div></body></html>" * 20
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ForwardProxyHandler(BaseHTTPRequestHandler):
+    """Proxy HTTP mínimo: reenvía las peticiones absolutas al destino."""
+
+    def do_GET(self):
+        with urllib.request.urlopen(self.path, timeout=5) as resp:
+            body = resp.read()
+            status = resp.status
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class DeniedProxyHandler(ForwardProxyHandler):
+    def do_GET(self):
+        body = b"<html><h1>Access Denied</h1></html>"
+        self.send_response(403)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def servers():
+    started = []
+
+    def start(handler):
+        srv = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        started.append(srv)
+        return srv.server_port
+
+    yield start
+    for srv in started:
+        srv.shutdown()
+
+
+def _closed_port() -> int:
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def test_validate_proxies_ranks_and_prunes(servers, tmp_path):
+    target = f"http://127.0.0.1:{servers(TargetHandler)}/business-directory.html"
+    good = f"127.0.0.1:{servers(ForwardProxyHandler)}"
+    denied = f"127.0.0.1:{servers(DeniedProxyHandler)}"
+    dead = f"127.0.0.1:{_closed_port()}"
+
+    results = validate_proxies([dead, denied, good], target=target, timeout=2, concurrency=3)
+    assert [r["proxy"] for r in results][0] == good
+    by_proxy = {r["proxy"]: r for r in results}
+    assert by_proxy[good]["ok"] and by_proxy[good]["bytes"] > 0
+    assert by_proxy[good]["connect_s"] is not None
+    assert by_proxy[good]["throughput_kbps"] > 0
+    assert by_proxy[denied]["page_status"] == "denied" and not by_proxy[denied]["ok"]
+    assert by_proxy[dead]["error"] and not by_proxy[dead]["ok"]
+
+    raw = tmp_path / "proxies.txt"
+    raw.write_text(f"{dead}\n{denied}\n{good}\n")
+    valid = tmp_path / "valid.txt"
+    viable = write_validated(results, str(valid), str(tmp_path / "stats.json"))
+    assert viable == [good]
+    assert load_proxies(str(raw), str(valid)) == [good]
+    assert len(json.loads((tmp_path / "stats.json").read_text())) == 3
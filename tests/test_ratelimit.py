@@ -0,0 +1,57 @@
+from scraper.extractor import PageStatus
+from scraper.ratelimit import AdaptiveScheduler
+
+URL = "https://www.dnb.com/business-directory/x.html"
+
+
+def make_scheduler(**kw):
+    slept = []
+    kw.setdefault("jitter", 0.0)
+    sched = AdaptiveScheduler(sleep=slept.append, **kw)
+    return sched, slept
+
+
+def test_aimd_increases_on_ok_and_backs_off_on_block():
+    sched, _ = make_scheduler(initial_delay=2.0, increase=0.1, block_decrease=0.25)
+    r0 = sched.rate("p1")
+    for _ in range(5):
+        sched.record("p1", URL, PageStatus.OK)
+    assert abs(sched.rate("p1") - (r0 + 0.5)) < 1e-9
+
+    before = sched.rate("p1")
+    sched.record("p1", URL, PageStatus.CHALLENGE)
+    assert abs(sched.rate("p1") - before * 0.25) < 1e-9
+    # el host también frena, pero otro proxy conserva su tasa
+    assert sched.rate(url=URL) < before
+    assert sched.rate("p2") == r0
+
+
+def test_rate_is_clamped_by_delay_limits():
+    sched, _ = make_scheduler(initial_delay=2.0, increase=10, proxy_delays=(1.0, 8.0))
+    sched.record("p1", URL, PageStatus.OK)
+    assert sched.rate("p1") == 1.0
+    for _ in range(10):
+        sched.record("p1", URL, PageStatus.DENIED)
+    assert sched.rate("p1") == 1 / 8.0
+
+
+def test_wait_spaces_requests_per_proxy_and_host():
+    sched, slept = make_scheduler(
+        initial_delay=1.0, proxy_delays=(1.0, 10.0), host_delays=(0.5, 10.0)
+    )
+    assert sched.wait("p1", URL) == 0
+    # mismo proxy y host: espera ~1s
+    assert 0.9 < sched.wait("p1", URL) <= 1.0
+    # otro proxy, mismo host: la espera la marca el host (reservado a ~2s)
+    assert sched.wait("p2", URL) > 1.0
+    assert len(slept) == 2
+    assert abs(sched.slept - sum(slept)) < 1e-9
+
+
+def test_snapshot_exposes_rates_and_counters():
+    sched, _ = make_scheduler()
+    sched.record("p1", URL, PageStatus.OK)
+    sched.record("p1", URL, PageStatus.ERROR_5XX)
+    snap = sched.snapshot()
+    assert snap["proxy:p1"]["ok"] == 1 and snap["proxy:p1"]["errors"] == 1
+    assert snap["host:www.dnb.com"]["rate"] > 0
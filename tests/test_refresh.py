@@ -0,0 +1,70 @@
+import json
+
+from scraper.fetcher import FetchResult
+from scraper.refresh import refresh_country
+from tests.test_cache import NO_COMPANIES, listing
+from tests.test_workers import scrape
+
+
+class FakeFetcher:
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+
+    def fetch(self, url):
+        if "?page=" not in url:
+            return FetchResult(url, "<html></html>")
+        page = int(url.rsplit("=", 1)[1])
+        self.calls.append(page)
+        return FetchResult(url, self.pages.get(page, NO_COMPANIES))
+
+
+def setup_country(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data" / "by_country").mkdir(parents=True)
+    rec = {"link": "/bd/retail.pe.html", "sub_industry": "retail", "country": "Peru"}
+    (tmp_path / "data" / "by_country" / "Peru.json").write_text(json.dumps([rec]))
+    pages = {p: listing([f"c{p}a", f"c{p}b"]) for p in range(1, 7)}
+    scrape("Peru", fetcher=FakeFetcher(pages))
+    out = tmp_path / "data" / "companies_by_sub_industry" / "Peru.json"
+    return pages, out
+
+
+def test_unchanged_vertical_is_carried_after_sampling(tmp_path, monkeypatch):
+    pages, out = setup_country(tmp_path, monkeypatch)
+    # la cola registra las páginas sondeadas al estimar antes que el resto
+    before = sorted(json.loads(out.read_text()), key=lambda c: c["page"])
+
+    fetcher = FakeFetcher(pages)
+    stats = refresh_country("Peru", fetcher=fetcher, sample=1, stop_after=2)
+    assert len(fetcher.calls) == 4  # 1, 6, 7 y una al azar
+    assert stats["verticals_unchanged"] == 1 and stats["pages_carried"] == 6
+    assert json.loads(out.read_text()) == before
+
+
+def test_changed_page_walks_until_stable_run(tmp_path, monkeypatch):
+    pages, out = setup_country(tmp_path, monkeypatch)
+    pages[1] = listing(["c1a", "new"])
+    pages[7] = listing(["c7a"])  # la vertical creció
+
+    fetcher = FakeFetcher(pages)
+    stats = refresh_country("Peru", fetcher=fetcher, sample=0, stop_after=2)
+    # muestra 1, 6, 7; el recorrido llega a 8 (sin empresas) sin cortar antes
+    assert stats["early_stops"] == 0 and stats["verticals_walked"] == 1
+    names = [c["company_name"] for c in json.loads(out.read_text())]
+    assert names[:2] == ["c1a", "new"] and names[-1] == "c7a" and "c1b" not in names
+
+    pages[2] = listing(["c2a", "c2b", "c2c"])
+    fetcher = FakeFetcher(pages)
+    stats = refresh_country("Peru", fetcher=fetcher, sample=0, stop_after=2)
+    # la muestra (1, 7, 8) no ve el cambio en la 2
+    assert stats["verticals_unchanged"] == 1 and "c2c" not in out.read_text()
+
+    pages[1] = listing(["c1a", "newer"])
+    fetcher = FakeFetcher(pages)
+    stats = refresh_country("Peru", fetcher=fetcher, sample=0, stop_after=2)
+    assert fetcher.calls == [1, 7, 8, 2, 3, 4]
+    assert stats["early_stops"] == 1 and stats["pages_carried"] == 3
+    recs = json.loads(out.read_text())
+    assert [c["company_name"] for c in recs][:5] == ["c1a", "newer", "c2a", "c2b", "c2c"]
+    assert [c["page"] for c in recs][-3:] == [6, 6, 7]
@@ -0,0 +1,124 @@
+import json
+from multiprocessing import get_context
+
+import pytest
+
+from scraper import store
+from scraper.core import CountryState, compact_results
+from scraper.diff import compute_diff
+from scraper.progress import read_progress, save_progress
+from scraper.store import Store, get_store
+from scraper.utils import load_json, save_json
+
+
+@pytest.fixture
+def sqlite_backend(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(store, "_backend", "sqlite")
+    return tmp_path
+
+
+def company(name, sub="retail", revenue="$1.0M"):
+    return {
+        "page": 1,
+        "sub_industry": sub,
+        "link": f"/bd/{sub}.pe.html",
+        "company_name": name,
+        "company_link": f"/business-directory/company-profiles.{name}.html",
+        "revenue": revenue,
+    }
+
+
+def test_json_files_stay_on_disk_and_progress_goes_to_store(sqlite_backend):
+    # solo progreso y resultados viven en el Store: informes, índices, etc. siguen en disco
+    save_json("reports/summary.json", {"a": 2})
+    assert json.loads((sqlite_backend / "reports" / "summary.json").read_text()) == {"a": 2}
+    assert load_json("reports/summary.json", {}) == {"a": 2}
+
+    save_progress("progress_step0.json", {"u1", "u2"}, {"u3"})
+    save_progress("progress_step0.json", {"u1", "u2", "u3"}, set())
+    assert read_progress("progress_step0.json") == ({"u1", "u2", "u3"}, set())
+    assert not (sqlite_backend / "progress_step0.json").exists()
+
+
+def test_page_commit_is_atomic_and_dedups(sqlite_backend):
+    st = CountryState("Peru")
+    entry = st.init_link("v1")
+    st.commit_page(entry, [company("a"), company("b")], current_page=2)
+    st.commit_page(entry, [company("a", sub="food"), company("a")], current_page=3)
+    # "crash": sin close()
+
+    st2 = CountryState("Peru")
+    assert st2.ckpt.enlaces["v1"]["current_page"] == 3
+    s = get_store()
+    assert s.count_companies("Peru") == 2 and s.has_company("Peru", company("a")["company_link"])
+    a, b = s.iter_companies("Peru")
+    assert a["memberships"] == [{"sub_industry": "food", "link": "/bd/food.pe.html", "page": 1}]
+    assert "memberships" not in b
+
+    st2.complete_base_link("/bd/retail.pe.html", [])
+    st2.close()
+    assert CountryState("Peru").ckpt.is_completed("/bd/retail.pe.html")
+    assert compact_results("Peru") == 2
+    out = json.loads(
+        (sqlite_backend / "data" / "companies_by_sub_industry" / "Peru.json").read_text()
+    )
+    assert [c["company_name"] for c in out] == ["a", "b"]
+
+
+def test_process_pools_keep_the_backend_under_spawn(sqlite_backend, monkeypatch):
+    pytest.importorskip("pyarrow")
+    from scraper import export
+
+    st = CountryState("Peru")
+    st.commit_page(st.init_link("v1"), [company("a"), company("b")], current_page=2)
+    st.close()
+    # con spawn los hijos reimportan config (STORAGE_BACKEND="json"): sin el
+    # initializer no verían el Store y exportarían 0 registros
+    monkeypatch.setattr(
+        export, "process_pool", lambda w: store.process_pool(w, get_context("spawn"))
+    )
+    out = export.export_countries(["Peru"], root=str(sqlite_backend / "parquet"), workers=2)
+    assert out == {"Peru": 2}
+
+
+def test_rollback_leaves_progress_untouched(tmp_path):
+    s = Store(str(tmp_path / "s.sqlite"))
+    with pytest.raises(KeyError):
+        s.commit_page(
+            "Peru",
+            [company("a"), {"no": "link"}],
+            {"v": {"start_page": 1, "end_page": 5, "current_page": 2}},
+        )
+    assert s.count_companies("Peru") == 0 and s.load_progress("Peru")["enlaces"] == {}
+
+
+def scrape_run(records, finish=True):
+    st = CountryState("Peru", reset=True)
+    entry = st.init_link("v1")
+    st.update_link(entry, end_page=1)
+    st.commit_page(entry, records, current_page=2)
+    if finish:
+        st.complete_base_link("/bd/retail.pe.html", ["v1"])
+    st.close()
+
+
+def test_diff_between_store_snapshots(sqlite_backend):
+    (sqlite_backend / "data" / "by_country").mkdir(parents=True)
+    (sqlite_backend / "data" / "by_country" / "Peru.json").write_text(
+        json.dumps([{"link": "/bd/retail.pe.html", "sub_industry": "retail"}])
+    )
+    scrape_run([company("x")])
+    scrape_run([company("y")])
+    scrape_run([company("a"), company("b")])
+    CountryState("Peru").close()  # ya completo: sin snapshot
+    scrape_run([company("c")], finish=False)  # interrumpida: sin snapshot
+    scrape_run([company("b", revenue="$3.0M"), company("c")])
+    assert len(get_store().snapshots("Peru")) == 3  # se podan los más antiguos
+
+    res = compute_diff("Peru", report_dir="rep")
+    assert res["engine"] == "store"
+    assert (res["added"], res["removed"], res["updated"]) == (1, 1, 1)
+    report = json.loads((sqlite_backend / "rep" / "Peru_changes.json").read_text())
+    assert report["updated"][0]["changes"] == {"revenue": ["$1.0M", "$3.0M"]}
+    assert res["top_movers"][0]["delta"] == 2e6
@@ -0,0 +1,116 @@
+import json
+
+import pytest
+
+from scraper.core import CountryState
+from scraper.fetcher import FetchResult
+from scraper.taskqueue import BASE, FAILED, PAGE, PENDING, PLAN, TaskQueue
+from scraper.workers import WorkerEngine
+from tests.test_cache import Clock, NO_COMPANIES, listing
+
+
+def test_lease_expiry_retries_and_failure(tmp_path):
+    clock = Clock()
+    q = TaskQueue(str(tmp_path / "q.sqlite"), lease=10, max_attempts=2, retry_delay=5, clock=clock)
+    assert q.add(PAGE, "Peru", "/b", "/b?alpha=A", range(1, 3)) == 2
+    assert q.add(PAGE, "Peru", "/b", "/b?alpha=A", range(1, 4)) == 1  # idempotente
+    q.add(BASE, "Peru", "/b")
+    base = q.lease("w1")
+    assert base.kind == BASE  # prioridad por tipo
+    q.done(base)
+
+    t1 = q.lease("w1")
+    assert (t1.page, t1.attempts) == (1, 1)
+    assert q.fail(t1, "Bloqueo: challenge") == PENDING
+    assert q.lease("w2").page == 2  # la página 1 espera su reintento
+    assert q.lease("w2").page == 3
+    assert q.lease("w2") is None and q.open_count(["Peru"]) == 3
+
+    clock.now += 11  # caducan las concesiones y el retraso de la página 1
+    t2, t3, t1 = q.lease("w3"), q.lease("w3"), q.lease("w3")
+    assert [(t.page, t.attempts) for t in (t2, t3, t1)] == [(2, 2), (3, 2), (1, 2)]
+    assert q.fail(t1, "otra vez") == FAILED
+    q.done(t2)
+    q.done(t3)
+    assert q.counts() == {"Peru": {"done": 3, "failed": 1}}
+    assert q.failures("Peru") == [("page", "/b?alpha=A", 1, 2, "otra vez")]
+    assert q.open_count(["Peru"]) == 0 and q.open_count(["Peru"], failed=True) == 1
+    assert q.retry_failed("Peru") == 1 and q.lease("w4").attempts == 1
+
+
+def test_renew_unsynced_and_atomic_transaction(tmp_path):
+    clock = Clock()
+    q = TaskQueue(str(tmp_path / "q.sqlite"), lease=10, clock=clock)
+    q.add(PAGE, "Peru", "/b", "/b?alpha=A", range(1, 3))
+    t1 = q.lease("w1")
+    clock.now += 8
+    assert q.renew(t1, "w1") and not q.renew(t1, "w2")
+    clock.now += 8  # sin renovar ya habría caducado
+    assert q.holder(t1.id) == "w1"
+
+    # hecha pero sin checkpoint escrito: vuelve a la cola tras un corte
+    q.done(t1, synced=False)
+    assert q.reopen_unsynced("Peru") == 1
+    t1 = q.lease("w1")
+    q.done(t1, synced=False)
+    assert q.mark_synced("Peru") == 1 and q.reopen_unsynced("Peru") == 0
+
+    # las tareas generadas y el done van juntos o no va ninguno
+    t2 = q.lease("w1")
+    with pytest.raises(RuntimeError):
+        with q.transaction():
+            q.add(PLAN, "Peru", "/b", "/b?alpha=B")
+            q.done(t2)
+            raise RuntimeError("corte")
+    assert q.counts() == {"Peru": {"done": 1, "in_flight": 1}}
+
+
+class FlakyFetcher:
+    """Vertical de 3 páginas (con contador) cuya página 2 falla la primera vez."""
+
+    def __init__(self, proxies=()):
+        self.calls = []
+        self.failed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def fetch(self, url):
+        if "?page=" not in url:
+            return FetchResult(url, "<html></html>")
+        page = int(url.rsplit("=", 1)[1])
+        self.calls.append(page)
+        if page == 2 and not self.failed:
+            self.failed = True
+            return FetchResult(url, "<html></html>", status=429)
+        if page > 3:
+            return FetchResult(url, NO_COMPANIES)
+        html = listing([f"c{page}a", f"c{page}b"])
+        count = '<div class="candidatesMatchedQuantity">6 companies</div>'
+        return FetchResult(url, html.replace("<body>", "<body>" + count))
+
+
+def test_engine_consumes_page_tasks_and_retries_later(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data" / "by_country").mkdir(parents=True)
+    rec = {"link": "/bd/retail.pe.html", "sub_industry": "retail"}
+    (tmp_path / "data" / "by_country" / "Peru.json").write_text(json.dumps([rec]))
+
+    fetcher = FlakyFetcher()
+    tasks = TaskQueue(str(tmp_path / "q.sqlite"), retry_delay=0)
+    engine = WorkerEngine(1, fetcher_factory=lambda proxies: fetcher, tasks=tasks, poll=0.01)
+    state = CountryState("Peru")
+    engine.submit_country(state)
+    engine.run()
+    state.close()
+
+    # la página 1 viene de la estimación; la 2 se reintenta después de la 3
+    assert fetcher.calls == [1, 2, 3, 2]
+    assert tasks.counts() == {"Peru": {"done": 5}}  # base, plan y 3 páginas
+    cfg = json.loads((tmp_path / "config_companies" / "Peru.json").read_text())
+    assert cfg["base_links_completados"] == ["/bd/retail.pe.html"]
+    out = json.loads((tmp_path / "data" / "companies_by_sub_industry" / "Peru.json").read_text())
+    assert sorted(c["company_name"] for c in out) == ["c1a", "c1b", "c2a", "c2b", "c3a", "c3b"]
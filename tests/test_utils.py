@@ -33,3 +33,44 @@ def test_load_and_save_json(tmp_path):
     # default when missing
     assert load_json(str(
         tmp_path / "no.json"), {"def": True}) == {"def": True}
+
+
+def test_jsonl_writer_recovery_and_compaction(tmp_path):
+    import json
+    from scraper.utils import JsonlWriter, read_jsonl, recover_jsonl, compact_jsonl
+
+    path = tmp_path / "out" / "c.jsonl"
+    recs = [{"a": 1, "loc": ["x", "ñ"]}, {"a": 2, "loc": []}]
+    with JsonlWriter(str(path), fsync_every=1) as w:
+        w.write(recs)
+    # simular corte a mitad de registro
+    with open(path, "ab") as f:
+        f.write(b'{"a": 3, "lo')
+    assert recover_jsonl(str(path)) == len(b'{"a": 3, "lo')
+    assert list(read_jsonl(str(path))) == recs
+
+    with JsonlWriter(str(path)) as w:  # reabrir sigue añadiendo
+        w.write([{"a": 3, "loc": ["y"]}])
+    out = tmp_path / "c.json"
+    assert compact_jsonl(str(path), str(out)) == 3
+    allrecs = recs + [{"a": 3, "loc": ["y"]}]
+    # mismo formato que save_json
+    expected = tmp_path / "expected.json"
+    save_json(str(expected), allrecs)
+    assert out.read_text(encoding="utf-8") == expected.read_text(encoding="utf-8")
+
+    compact_jsonl(str(tmp_path / "none.jsonl"), str(out))
+    assert json.loads(out.read_text()) == []
+
+
+def test_iter_json_array_small_chunks(tmp_path):
+    from scraper.utils import iter_json_array
+
+    data = [{"a": i, "s": "x" * (i * 7), "n": [1, {"b": "]"}]} for i in range(50)]
+    p = tmp_path / "arr.json"
+    save_json(str(p), data)
+    for chunk in (1, 3, 17, 1 << 20):
+        assert list(iter_json_array(str(p), chunk_size=chunk)) == data
+    (tmp_path / "empty.json").write_text("[]")
+    assert list(iter_json_array(str(tmp_path / "empty.json"))) == []
+    assert list(iter_json_array(str(tmp_path / "missing.json"))) == []
@@ -0,0 +1,82 @@
+import json
+import threading
+
+from scraper.driver_factory import BASE_URL
+from scraper.fetcher import FetchResult
+from scraper.taskqueue import TaskQueue
+from scraper.verticals import VerticalIndex, discover_verticals, resolve_verticals
+from scraper.workers import Dispatcher
+from tests.test_cache import Clock, NO_COMPANIES, listing
+from tests.test_workers import scrape
+
+ALPHA = (
+    '<html><body><div class="alpha-pagination">'
+    '<a href="?alpha=A">A</a><a href="?alpha=B">B</a></div></body></html>'
+)
+
+
+class BaseFetcher:
+    def __init__(self, blocked=()):
+        self.blocked = set(blocked)
+        self.bases = []
+        self.lock = threading.Lock()
+
+    def fetch(self, url):
+        if "?page=" in url:
+            return FetchResult(url, listing(["a"]) if url.endswith("=1") else NO_COMPANIES)
+        with self.lock:
+            self.bases.append(url)
+        return FetchResult(url, ALPHA, status=403 if url in self.blocked else 200)
+
+
+def test_index_ttl_and_failed_discovery_not_cached(tmp_path):
+    clock = Clock()
+    index = VerticalIndex("Peru", root=str(tmp_path), ttl=100, clock=clock)
+    fetcher = BaseFetcher(blocked={BASE_URL + "/bd/b.html"})
+    links = [f"/bd/{x}.html" for x in "abc"]
+
+    assert discover_verticals(index, links, fetcher, workers=3) == 2
+    assert index.get("/bd/a.html") == [BASE_URL + f"/bd/a.html?alpha={x}" for x in "AB"]
+    assert index.missing(links) == ["/bd/b.html"]
+    # sin verticales: se recorre el enlace base, pero no se indexa
+    assert resolve_verticals(index, "/bd/b.html", fetcher) == [BASE_URL + "/bd/b.html"]
+    assert index.get("/bd/b.html") is None
+
+    reloaded = VerticalIndex("Peru", root=str(tmp_path), ttl=100, clock=clock)
+    assert reloaded.missing(links) == ["/bd/b.html"]
+    clock.now += 101
+    assert reloaded.missing(links) == links
+
+
+def test_scrape_reuses_index_across_runs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data" / "by_country").mkdir(parents=True)
+    entries = [{"link": f"/bd/{x}.html", "sub_industry": x} for x in "ab"]
+    (tmp_path / "data" / "by_country" / "Peru.json").write_text(json.dumps(entries))
+
+    fetcher = BaseFetcher()
+    scrape("Peru", fetcher=fetcher)
+    assert sorted(fetcher.bases) == [BASE_URL + "/bd/a.html", BASE_URL + "/bd/b.html"]
+
+    fetcher = BaseFetcher()
+    scrape("Peru", reset=True, fetcher=fetcher)
+    assert fetcher.bases == []
+    cfg = json.loads((tmp_path / "config_companies" / "Peru.json").read_text())
+    assert len(cfg["enlaces"]) == 4 and len(cfg["base_links_completados"]) == 2
+
+
+def test_open_countries_discovers_verticals_before_leasing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data" / "by_country").mkdir(parents=True)
+    entries = [{"link": f"/bd/{x}.html", "sub_industry": x} for x in "abc"]
+    (tmp_path / "data" / "by_country" / "Peru.json").write_text(json.dumps(entries))
+
+    fetcher = BaseFetcher()
+    tasks = TaskQueue(str(tmp_path / "tasks.sqlite"))
+    dispatcher = Dispatcher(tasks)
+    dispatcher.open_countries(["Peru"], fetcher=fetcher)
+    assert len(fetcher.bases) == 3
+    task, payload = dispatcher.lease("w")
+    assert payload["verticals"] == [BASE_URL + f"{task.base_link}?alpha={x}" for x in "AB"]
+    dispatcher.close()
+    tasks.close()
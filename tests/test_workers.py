@@ -0,0 +1,103 @@
+import json
+import threading
+from contextlib import nullcontext
+
+import scraper.workers as w
+from scraper.core import CountryState
+from scraper.taskqueue import BASE, TaskQueue
+from tests.test_cache import Clock
+
+
+def scrape(country, fetcher, reset=False, cache=None):
+    """Scraping completo de un país con un worker, como run_workers, con `fetcher`."""
+    tasks = TaskQueue(retry_delay=0)
+    dispatcher = w.Dispatcher(tasks)
+    engine = w.WorkerEngine(
+        1,
+        fetcher_factory=lambda proxies: nullcontext(fetcher),
+        dispatcher=dispatcher,
+        cache=cache,
+        poll=0.01,
+    )
+    try:
+        dispatcher.open_countries([country], reset=reset, cache=cache, fetcher=fetcher)
+        engine.run()
+    finally:
+        dispatcher.close()
+        tasks.close()
+
+
+class FakeFetcher:
+    def __init__(self, proxies):
+        self.proxies = proxies
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+def test_split_proxies_disjoint():
+    groups = w.split_proxies(["a", "b", "c", "d", "e"], 2)
+    assert groups == [["a", "c", "e"], ["b", "d"]]
+
+
+def test_engine_spreads_verticals_and_completes_base_links(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data" / "by_country").mkdir(parents=True)
+    entries = [
+        {"link": "/bd/a.html", "sub_industry": "a"},
+        {"link": "/bd/b.html", "sub_industry": "b"},
+    ]
+    (tmp_path / "data" / "by_country" / "Peru.json").write_text(json.dumps(entries))
+
+    seen = []
+    lock = threading.Lock()
+
+    def fake_verticals(base_link, fetcher):
+        return [f"{base_link}?alpha={x}" for x in "AB"]
+
+    def fake_walk(rec, vlink, start, end, fetcher, **kw):
+        with lock:
+            seen.append((vlink, tuple(fetcher.proxies)))
+        if vlink.startswith("/bd/b"):  # la sub‑industria b falla
+            return {"pages": {}, "end_page": None, "error": "bloqueo"}
+        return {"pages": {}, "end_page": None}
+
+    monkeypatch.setattr(w, "discover", fake_verticals)
+    monkeypatch.setattr(w, "walk_vertical", fake_walk)
+
+    tasks = TaskQueue(str(tmp_path / "tasks.sqlite"), max_attempts=1)
+    engine = w.WorkerEngine(2, ["p1", "p2", "p3"], fetcher_factory=FakeFetcher, tasks=tasks)
+    engine.submit_country(CountryState("Peru"))
+    engine.run()
+
+    assert len(seen) == 4
+    assert {p for _, p in seen} <= {("p1", "p3"), ("p2",)}
+    cfg = json.loads((tmp_path / "config_companies" / "Peru.json").read_text())
+    assert cfg["base_links_completados"] == ["/bd/a.html"]
+
+
+def test_result_of_a_lost_lease_is_discarded(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data" / "by_country").mkdir(parents=True)
+    rec = {"link": "/bd/a.html", "sub_industry": "a"}
+    (tmp_path / "data" / "by_country" / "Peru.json").write_text(json.dumps([rec]))
+
+    clock = Clock()
+    tasks = TaskQueue(str(tmp_path / "tasks.sqlite"), lease=10, clock=clock)
+    dispatcher = w.Dispatcher(tasks)
+    dispatcher.open_countries(["Peru"])
+    slow, _ = dispatcher.lease("slow")
+    clock.now += 11  # su concesión caduca y la tarea se reparte de nuevo
+    fast, _ = dispatcher.lease("fast")
+    assert slow.id == fast.id and slow.kind == BASE
+
+    assert not dispatcher.complete(slow, {"verticals": ["/bd/a.html?alpha=A"]}, "slow")
+    assert tasks.verticals("Peru", "/bd/a.html") == []
+    assert not dispatcher.renew(slow, "slow") and dispatcher.renew(fast, "fast")
+    assert dispatcher.complete(fast, {"verticals": ["/bd/a.html?alpha=B"]}, "fast")
+    assert tasks.verticals("Peru", "/bd/a.html") == ["/bd/a.html?alpha=B"]
+    dispatcher.close()
+    tasks.close()